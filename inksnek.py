@@ -11,15 +11,69 @@ Angles are in degrees turned clockwise from 12 O'Clock
 
 '''
 
+import bisect
+import json
+import os
+import re
+import struct
 import sys
+from array import array
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from math import *
 import inkex
+import numpy as np  # inkex needs it anyway
 from inkex import PathElement,Circle,Group,TextElement
 
+# what designs get from "from inksnek import *": the API, and the math, sys & inkex names they always have
+__all__ = ["Inksnek", "inksnek", "new_inksnek", "InksnekTransform", "InksnekStyle", "PathBuilder",
+           "SceneGroup", "ScenePath", "SceneCircle", "SceneText",
+           "sys", "inkex", "PathElement", "Circle", "Group", "TextElement"] + [name for name in dir(sys.modules["math"]) if not name.startswith("_")]
+
 class Inksnek:
     def __init__(self):
         self.template_number = 0
         self.top_group = None
+        self._uu_scales = {}     # unit -> user-unit-to-document (from, to) factors, reset when the document changes, see _uu_factors
+        self._units = None
+        self._unit_factors = None  # the (from, to) factors for the current units
+        self._styles = {}        # style string -> InksnekStyle, see intern_style
+        self._finished = False
+        self.mode_override = None  # if set, used instead of the mode passed to setup(), see inksnek_render.py
+        self.recording = False     # if set before setup(), the design is recorded, to emit() in any mode(s), see SceneGroup
+        self.retained = False      # if set before setup(), add_* build the scene and finish() makes the elements in one pass, see _materialise
+        self.output = None         # if retained, finish() writes the document here (a file name or binary stream), rather than making the elements
+        self.streaming = False     # if set before setup(), with an output, the design is written to it as it's added, see group()
+        self.instancing = None     # True/False: repeated circles, shapes & perfboards become <use>s of a prototype in <defs> or not, None for the mode's default, see _instancing
+        self.flattening = False    # if set, finish() flattens the design, see flatten()
+        self.flattened = None      # (nodes, bytes) flatten() saved, when finish() did it
+        self._flat = None          # the group _run_passes has flattened, so the passes after don't again, see _flatten
+        self.ordering = False      # if set, finish() reorders the cuts, in FINAL mode, see order_cuts()
+        self.ordered = None        # the (before, after) travel order_cuts() gave, when finish() did it
+        self.deduplicating = False # if set, finish() removes the cuts drawn twice, in FINAL mode, see remove_duplicate_cuts()
+        self.deduplicated = None   # the (segments, length) remove_duplicate_cuts() removed, when finish() did it
+        self.duplicate_tolerance = 0.01  # how close cuts are to count as the same, in mm
+        self.stitching = False     # if set, finish() joins up the paths which meet, in FINAL mode, see stitch_paths()
+        self.stitched = None       # the (before, after) pierces stitch_paths() gave, when finish() did it
+        self.stitch_tolerance = 0.01  # how close the ends of paths are to be joined, in mm
+        self.compensating = False  # if set, finish() offsets the closed cuts by half the kerf, in FINAL mode, see compensate_kerf()
+        self.compensated = None    # the (outlines, holes) compensate_kerf() offset, when finish() did it
+        self.kerf = 0.0            # the width the laser cuts away, in document units, set by setup(), see material_kerf
+        self.hatching = False      # if set, finish() hatches the fills, in FINAL mode, see hatch_fills()
+        self.hatched = None        # the (fills, lines) hatch_fills() made, when finish() did it
+        self.hatch_angle = 45.0    # the hatch lines' angle, in degrees clockwise from 12 O'Clock
+        self.hatch_pitch = {"light_fill":0.4, "medium_fill":0.25, "heavy_fill":0.1}  # the distance between hatch lines, by fill, in mm
+        self.estimating = False    # if set, finish() estimates the job's time, in FINAL mode, see estimate_job()
+        self.estimate = None       # what estimate_job() gave, when finish() did it
+        self.minimising = False    # if set, the paths are written as briefly as they can be, see minimise_path()
+        self.path_precision = None # the decimal places minimise_path() keeps, if not the material's, see material_precision
+        self._scene = None
+        self._stream_output = None
+        self._stream_part = None   # the file a streamed design is written to, then renamed to the output, see _stream_write
+        self._stream_head = self._stream_tail = None  # the document before and after the design, see _start_stream
+        self._design_group = None
+        self._group_transforms = {}  # group -> its absolute transform, see group_transform()
 
     # CONSTANTS 
     # mode
@@ -34,13 +88,37 @@ class Inksnek:
 
     # materials
     ACRYLIC, STYRENE, CARD, WOOD = 0,1,2,3
+    # the decimal places (of a mm) a minimised path keeps, by material.  Card & wood don't cut to a micron
+    material_precision = {ACRYLIC:3, STYRENE:3, CARD:2, WOOD:2}
+    # the laser's (speed in mm/s, power in %) for each pass, by material, for 3mm (the cut's speed is scaled by the thickness),
+    # with its speed moving between cuts, the seconds a pierce takes and the lines per mm it fills with, see estimate_job.
+    # A guess at a 40W CO2 laser's, set your own
+    material_profiles = {
+        ACRYLIC:{"cut":(8.0, 100), "light_etch":(300.0, 15), "medium_etch":(200.0, 25), "heavy_etch":(100.0, 35),
+                 "light_fill":(400.0, 15), "medium_fill":(300.0, 25), "heavy_fill":(200.0, 35), "travel":500.0, "pierce":0.3, "lines":10.0},
+        STYRENE:{"cut":(15.0, 60), "light_etch":(400.0, 10), "medium_etch":(300.0, 15), "heavy_etch":(200.0, 20),
+                 "light_fill":(500.0, 10), "medium_fill":(400.0, 15), "heavy_fill":(300.0, 20), "travel":500.0, "pierce":0.1, "lines":10.0},
+        CARD:   {"cut":(30.0, 40), "light_etch":(500.0, 8), "medium_etch":(400.0, 12), "heavy_etch":(300.0, 16),
+                 "light_fill":(500.0, 8), "medium_fill":(400.0, 12), "heavy_fill":(300.0, 16), "travel":500.0, "pierce":0.05, "lines":8.0},
+        WOOD:   {"cut":(10.0, 90), "light_etch":(300.0, 20), "medium_etch":(200.0, 30), "heavy_etch":(100.0, 40),
+                 "light_fill":(400.0, 20), "medium_fill":(300.0, 30), "heavy_fill":(200.0, 40), "travel":500.0, "pierce":0.3, "lines":10.0}}
+    material_names = {ACRYLIC:"ACRYLIC", STYRENE:"STYRENE", CARD:"CARD", WOOD:"WOOD"}
+    # the width (in mm) the laser's beam cuts away, by material, see setup() & compensate_kerf.  A guess too, measure your own
+    material_kerf = {ACRYLIC:0.15, STYRENE:0.1, CARD:0.1, WOOD:0.2}
     
     # annotation alignments, can be added. 3 in the x-direction, 3 in the y.
     LEFT_ALIGN, CENTRE_ALIGN, RIGHT_ALIGN,  BASE_ALIGN, TOP_ALIGN, MID_ALIGN = 0x00,0x02,0x04,0x00,0x08,0x10
     
     
-    def setup(self, effect, template_number, material, thickness, units, mode):
+    @staticmethod
+    def current():
+        # the Inksnek for this thread (or asyncio task): the global inksnek, or the one new_inksnek() made.  A design which
+        # may be rendered alongside others binds it once, at the start of effect(): ink = inksnek.current()
+        return _current_inksnek.get(inksnek)
+        
+    def setup(self, effect, template_number, material, thickness, units, mode, kerf = None):
         self._Effect = effect
+        self._uu_scales = {}
         self.template_number = template_number
         if self.template_number == self.A3:
             self.template_height = 420.0
@@ -55,9 +133,34 @@ class Inksnek:
         self.units = "mm"
         self.material = material
         self.material_thickness = thickness
-        self.line_width = self._length(0.01, "mm")
         self._last_xy = (0, 0)
+        self._finished = False
+        self._set_mode(mode if self.mode_override is None else self.mode_override)
+        
+        origin_x = 0
+        origin_y = 0
+        if self.template_number != 0:
+            # adjust absolute coords for template area.  other coords are relative
+            origin_x += self.template_margin
+            origin_y -= self.template_height+self.template_margin
+        self._set_top_group(self.translate_group(origin_x, origin_y))
+        self.units = units
+        self.kerf = self._length(self.material_kerf.get(material, 0.0), "mm") if kerf is None else self._length(kerf)  # in the document's units
+        self._thickness_mm = self._length(thickness)/self._uu_scale("mm")  # for estimate_job, whose speeds are in mm/s
+        
+    def _set_mode(self, mode):
+        # the mode-dependent state: palette, line width & styles
         self.mode = mode
+        self.line_width = self._length(0.01, "mm")
+        self._omit_ignore = not self.recording and (self.mode == Inksnek.FINAL or self.mode == Inksnek.REAL or self.mode == Inksnek.PROTO)
+        self._styles = {}  # the colours depend on the mode
+        self._role_styles = {}
+        self._instances = {}  # see _add_instance
+        self._origin = (self._x_coord(0), self._y_coord(0))  # where prototypes are made
+        
+        # the palette is per-instance, the mode changes it below, starting from the defaults
+        for name, value in Inksnek._default_palette.items():
+            setattr(self, name, value)
         
         # * Cut  = Blue
         # * Etch = Red
@@ -67,73 +170,77 @@ class Inksnek:
           # thicker (more visible) lines when developing
           self.line_width = self._length(0.1, "mm")
           # and use transparency for fills
-          Inksnek._light_fill_colour  = "#000000"
-          Inksnek._medium_fill_colour = "#000000"
-          Inksnek._heavy_fill_colour  = "#000000"
-          Inksnek._light_fill_opacity = "0.25"
-          Inksnek._medium_fill_opacity= "0.50"
-          Inksnek._heavy_fill_opacity = "0.75"
+          self._light_fill_colour  = "#000000"
+          self._medium_fill_colour = "#000000"
+          self._heavy_fill_colour  = "#000000"
+          self._light_fill_opacity = "0.25"
+          self._medium_fill_opacity= "0.50"
+          self._heavy_fill_opacity = "0.75"
           
         if self.mode == Inksnek.REAL:
           # cuts are black
-          Inksnek._cut_colour        = "#000000"
+          self._cut_colour        = "#000000"
           # grays for intensity of etch
-          Inksnek._light_etch_colour  = "#AAAAAA"
-          Inksnek._medium_etch_colour = "#555555"
-          Inksnek._heavy_etch_colour  = "#000000"
+          self._light_etch_colour  = "#AAAAAA"
+          self._medium_etch_colour = "#555555"
+          self._heavy_etch_colour  = "#000000"
           # make the colour show
           self.line_width = self._length(0.2, "mm")
         elif self.mode == Inksnek.PRINT:
           # everything is black
-          Inksnek._cut_colour        = "#000000"
+          self._cut_colour        = "#000000"
           # gray for etch
-          Inksnek._light_etch_colour  = "#000000"
-          Inksnek._medium_etch_colour = "#000000"
-          Inksnek._heavy_etch_colour  = "#000000"
-          Inksnek._ignore_colour     = "#000000"
+          self._light_etch_colour  = "#000000"
+          self._medium_etch_colour = "#000000"
+          self._heavy_etch_colour  = "#000000"
+          self._ignore_colour     = "#000000"
           # no fills
-          Inksnek._light_fill_opacity = Inksnek._medium_fill_opacity = Inksnek._heavy_fill_opacity  = "0"
+          self._light_fill_opacity = self._medium_fill_opacity = self._heavy_fill_opacity  = "0"
         elif self.mode == Inksnek.PROTO:
           # everything is black
-          Inksnek._cut_colour        = "#000000"
+          self._cut_colour        = "#000000"
           # gray for etch
-          Inksnek._light_etch_colour  = "#000000"
-          Inksnek._medium_etch_colour = "#000000"
-          Inksnek._heavy_etch_colour  = "#000000"
+          self._light_etch_colour  = "#000000"
+          self._medium_etch_colour = "#000000"
+          self._heavy_etch_colour  = "#000000"
           # no fills
-          Inksnek._light_fill_opacity = Inksnek._medium_fill_opacity = Inksnek._heavy_fill_opacity  = "0"
+          self._light_fill_opacity = self._medium_fill_opacity = self._heavy_fill_opacity  = "0"
 
         
         # cut-through linestyle 
-        self.cut_style        = str(inkex.Style({"stroke":Inksnek._cut_colour,        "stroke-width":self.line_width, "fill":"none"}))
+        self.cut_style        = self.intern_style(inkex.Style({"stroke":self._cut_colour,        "stroke-width":self.line_width, "fill":"none"}), "cut")
         
         # etch-into linestyle(s)
-        self.light_etch_style  = str(inkex.Style({"stroke":Inksnek._light_etch_colour,  "stroke-width":self.line_width, "fill":"none"}))
-        self.medium_etch_style = str(inkex.Style({"stroke":Inksnek._medium_etch_colour, "stroke-width":self.line_width, "fill":"none"}))
-        self.heavy_etch_style  = str(inkex.Style({"stroke":Inksnek._heavy_etch_colour,  "stroke-width":self.line_width, "fill":"none"}))
+        self.light_etch_style  = self.intern_style(inkex.Style({"stroke":self._light_etch_colour,  "stroke-width":self.line_width, "fill":"none"}), "light_etch")
+        self.medium_etch_style = self.intern_style(inkex.Style({"stroke":self._medium_etch_colour, "stroke-width":self.line_width, "fill":"none"}), "medium_etch")
+        self.heavy_etch_style  = self.intern_style(inkex.Style({"stroke":self._heavy_etch_colour,  "stroke-width":self.line_width, "fill":"none"}), "heavy_etch")
         self.etch_style = self.heavy_etch_style
         
         # area-etch fillstyle(s)
-        self.light_fill_style  = str(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":Inksnek._light_fill_colour, "opacity":Inksnek._light_fill_opacity}))
-        self.medium_fill_style = str(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":Inksnek._medium_fill_colour, "opacity":Inksnek._medium_fill_opacity}))
-        self.heavy_fill_style  = str(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":Inksnek._heavy_fill_colour, "opacity":Inksnek._heavy_fill_opacity}))
+        self.light_fill_style  = self.intern_style(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":self._light_fill_colour, "opacity":self._light_fill_opacity}), "light_fill")
+        self.medium_fill_style = self.intern_style(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":self._medium_fill_colour, "opacity":self._medium_fill_opacity}), "medium_fill")
+        self.heavy_fill_style  = self.intern_style(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":self._heavy_fill_colour, "opacity":self._heavy_fill_opacity}), "heavy_fill")
         self.fill_style = self.heavy_fill_style
         
         # visible in design, but N/A for laser (but see _Ignore)
-        self.ignore_style     = str(inkex.Style({"stroke":Inksnek._ignore_colour,     "stroke-width":self.line_width, "fill":"none"}))
+        self.ignore_style     = self.intern_style(inkex.Style({"stroke":self._ignore_colour,     "stroke-width":self.line_width, "fill":"none"}), "ignore")
         
-        origin_x = 0
-        origin_y = 0
-        if self.template_number != 0:
-            # adjust absolute coords for template area.  other coords are relative
-            origin_x += self.template_margin
-            origin_y -= self.template_height+self.template_margin
-        self.top_group = Group("design")
-        self.top_group.set("transform", self.translate_group(origin_x, origin_y))
-        self._Effect.svg.get_current_layer().add(self.top_group)
-        self.units = units
+    def _set_top_group(self, transform):
+        self._design_group = None  # the design's element in the document, if it's made now
+        transform = InksnekTransform(transform)
+        if self.streaming:
+            self._start_stream(transform)
+        elif self.recording or self.retained:
+            self.top_group = self._scene = SceneGroup(transform)
+        else:
+            self.top_group = self._design_group = Group("design")
+            self.top_group.set("transform", transform)
+            self._Effect.svg.get_current_layer().add(self.top_group)
+        self._group_transforms = {self.top_group: InksnekTransform(self._Effect.svg.get_current_layer().composed_transform() @ transform)}
     
     def set_custom_template(self, width, height, margin):
+        self._uu_scales = {}
+        self.units = self.units  # refresh the cached scale
         self.template_number = self.CUSTOM
         self.template_width  = width
         self.template_height = height
@@ -142,41 +249,84 @@ class Inksnek:
         origin_y = -(self.template_height - self.template_margin)
         self.template_width  -= 2*margin
         self.template_height -= 2*margin
-        self.top_group = Group("design")
-        self.top_group.set("transform", self.translate_group(origin_x, origin_y))
-        self._Effect.svg.get_current_layer().add(self.top_group)
+        if self._design_group is not None and len(self._design_group) == 0:  # setup()'s, replaced
+            self._design_group.getparent().remove(self._design_group)
+        self._set_top_group(self.translate_group(origin_x, origin_y))
         
     def debug(self, thing): # will show in an "Inkscape has received additional data from the script executed." window
       inkex.utils.debug(thing)
 
-    # transformations to pass to addGroup, can be added together
+    # transformations to pass to addGroup, can be added together (see InksnekTransform)
     def translate_group(self, delta_x, delta_y):
-        return " translate(" + str(self._x_coord(delta_x)) + "," + str(self._y_coord(delta_y)) + ") "
+        return InksnekTransform.identity().add_translate(self._x_coord(delta_x), self._y_coord(delta_y))
         
     def rotate_group(self, angle_degrees):  # angle is clockwise DEGREES
-        return " rotate(" + str(angle_degrees) + ") "
+        return InksnekTransform.identity().add_rotate(float(angle_degrees))
 
     def scale_group(self, scale_x, scale_y = None):
         if scale_y is None:
-            return " scale(" + str(scale_x) + "," + str(scale_x) + ") "
+            return InksnekTransform.identity().add_scale(float(scale_x))
         else:
-            return " scale(" + str(scale_x) + "," + str(scale_y) + ") "
+            return InksnekTransform.identity().add_scale(float(scale_x), float(scale_y))
     
-    def add_group(self, parent, transform):
-        g = Group()
-        g.set("transform", transform)
-        return parent.add(g)
+    def add_group(self, parent, transform, label = None):
+        # transform is from translate_group etc, or an SVG transform string.  A label names the group in Inkscape, and flatten() keeps it
+        if not isinstance(transform, InksnekTransform):
+            transform = InksnekTransform(transform)
+        group = self._add_node(parent, SceneGroup(transform, label = label))
+        self._group_transforms[group] = (parent, transform)
+        return group
+        
+    def group_transform(self, group):
+        # the group's absolute transform, from its coordinates to the document's.  Worked out from the transforms
+        # add_group keeps (not the SVG), once
+        transform = self._group_transforms.get(group)
+        if isinstance(transform, tuple):
+            parent, transform = transform
+            transform = self._group_transforms[group] = InksnekTransform.of(self.group_transform(parent) @ transform)
+        elif transform is None and isinstance(group, SceneGroup) and self.streaming:  # forgotten, see _forget_groups
+            raise ValueError("the group has been written already, see Inksnek.group()")
+        elif transform is None:  # a group not from add_group
+            transform = self._group_transforms[group] = InksnekTransform(group.composed_transform() if isinstance(group, inkex.BaseElement) else group.transform)
+        return transform
+        
+    @contextmanager
+    def group(self, parent, transform, label = None):
+        # add_group, as a context manager.  When streaming, the group is written once it's closed, at the end of the with,
+        # or when something is next added to one of its ancestors
+        group = self.add_group(parent, transform, label)
+        yield group
+        if self.streaming and group in self._open_groups:
+            self._close_groups(parent)
         
     def create_stroke_style(self, colour, width, opacity = 1.0):
-        return str(inkex.Style({"stroke":colour, "stroke-width":width, "fill":"none", "opacity":opacity}))
+        return self.intern_style(inkex.Style({"stroke":colour, "stroke-width":width, "fill":"none", "opacity":opacity}))
         
     def create_fill_style(self, colour, opacity = 1.0):
-        return str(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":colour, "opacity":opacity}))
+        return self.intern_style(inkex.Style({"stroke":"none", "stroke-width":"none", "fill":colour, "opacity":opacity}))
         
     def create_style(self, line_colour, line_width, fill_colour, opacity = 1.0):
-        return str(inkex.Style({"stroke":line_colour, "stroke-width":line_width, "fill":fill_colour, "opacity":opacity}))
+        return self.intern_style(inkex.Style({"stroke":line_colour, "stroke-width":line_width, "fill":fill_colour, "opacity":opacity}))
+        
+    def intern_style(self, style, role = None):
+        # return the InksnekStyle for the style (a string or inkex.Style), the same object for the same style.
+        # role is for the predefined styles, "cut", "heavy_etch" etc, so a recorded design can be emitted in any mode
+        if role is not None:
+            self._role_styles[role] = InksnekStyle(str(style), self._ignore_colour, self._cut_colour, role)
+            return self._role_styles[role]
+        if isinstance(style, InksnekStyle):
+            return style
+        key = style if isinstance(style, str) else str(style)
+        interned = self._styles.get(key)
+        if interned is None:
+            # when recording, the colour is the default ignore colour, which is the one omitted
+            interned = InksnekStyle(key, Inksnek._ignore_colour if self.recording else self._ignore_colour, self._cut_colour)
+            self._styles[key] = self._styles[interned] = interned  # as given, and as inkex writes it
+        return interned
         
     def path_start(self): return ""  # for completeness
+    
+    def path_builder(self): return PathBuilder(self)  # for long paths, see PathBuilder
     # x and y or a tuple with (x, y)
     def path_move_to(self, x, y = None):  return "M"+Inksnek._coord_format_str % self._xy_coord(x, y)
     def path_line_to(self, x, y = None):  return "L"+Inksnek._coord_format_str % self._xy_coord(x, y)
@@ -212,53 +362,85 @@ class Inksnek:
     
     def path_close(self): return "z"
     
+    def minimise_path(self, path, precision = None):
+        # the path as briefly as it can be written: each command absolute or relative, whichever is shorter, H/V for level or
+        # upright lines, lines merged where they go on in the same direction, no draws to nowhere, no repeated letters,
+        # numbers rounded to precision decimal places without trailing 0's.  precision defaults to path_precision, or the material's
+        if precision is None:
+            precision = self.material_precision.get(self.material, 3) if self.path_precision is None else self.path_precision
+        return Inksnek._minimised(str(path), precision)
+        
     def add_path(self, group, path, style):
-        # add the path with the style to the group
-        if path != "" and not self._ignore(style):  # Avoid SVG with an empty path
-            p = PathElement()
-            p.style = style
-            p.path = path
-            return group.add(p)
+        # add the path (a string, a PathBuilder or an inkex.Path) with the style to the group
+        if self._ignore(style):  return None
+        if isinstance(path, PathBuilder):
+            path = path.d()
+        elif isinstance(path, inkex.Path):
+            path = str(path)
+        if self.minimising:
+            path = self.minimise_path(path)
+        if path != "":  # Avoid SVG with an empty path
+            return self._add_node(group, ScenePath(path, self.intern_style(style)))
         else:
             return None;
 
     def add_line_by(self, group, x, y, delta_x, delta_y, style):
+      if self._ignore(style):  return None
       return self.add_path(group, "M"+Inksnek._coord_format_str % self._xy_coord(x, y) + "l"+Inksnek._coord_format_str % self._xy_coord(delta_x, delta_y), style)
     
     def add_line_to(self, group, x1, y1, x2, y2, style):
+      if self._ignore(style):  return None
       return self.add_path(group, "M"+Inksnek._coord_format_str % self._xy_coord(x1, y1) + "L"+Inksnek._coord_format_str % self._xy_coord(x2, y2), style)
       
     def add_rect(self, group, x, y, width, height, style, sides="TLRB"):
         # add the rectangle with the style to the group
         # sides can be a string consisting of the characters "TLRB" to draw the Top, Left, Right and/or Bottom sides
-        path  = self.path_move_to(x, y)
-        path += self.path_horz_by(+width)      if "B" in sides else self.path_move_by(+width, 0)
-        path += self.path_vert_by(+height)     if "R" in sides else self.path_move_by(0,      +height)
-        path += self.path_horz_by(-width)      if "T" in sides else self.path_move_by(-width, 0)
+        if self._ignore(style):  return None
+        path = self.path_builder().move_to(x, y)
+        path.horz_by(+width)      if "B" in sides else path.move_by(+width, 0)
+        path.vert_by(+height)     if "R" in sides else path.move_by(0,      +height)
+        path.horz_by(-width)      if "T" in sides else path.move_by(-width, 0)
         if sides != "TLRB":
-            path += self.path_vert_by(-height) if "L" in sides else self.path_move_by(0,      -height)
+            path.vert_by(-height) if "L" in sides else path.move_by(0,      -height)
         else:
-            path += self.path_close()
+            path.close()
         return self.add_path(group, path, style)
         
     def add_round_rect(self, group, x, y, width, height, radius, style):
         # add the rectangle with rounded corners, and with the style, to the group
-        path  = self.path_move_to(x + width - radius, y)  + self.path_round_by(+radius, +radius, -radius)
-        path += self.path_vert_by(height - 2.0*radius)    + self.path_round_by(-radius, +radius, -radius)
-        path += self.path_horz_by(-(width - 2.0*radius))  + self.path_round_by(-radius, -radius, -radius)
-        path += self.path_vert_by(-(height - 2.0*radius)) + self.path_round_by(+radius, -radius, -radius)
-        path += self.path_close()
+        if self._ignore(style):  return None
+        path = self.path_builder()
+        path.move_to(x + width - radius, y).round_by(+radius, +radius, -radius)
+        path.vert_by(height - 2.0*radius).round_by(-radius, +radius, -radius)
+        path.horz_by(-(width - 2.0*radius)).round_by(-radius, -radius, -radius)
+        path.vert_by(-(height - 2.0*radius)).round_by(+radius, -radius, -radius)
+        path.close()
         return self.add_path(group, path, style)
         
     def add_circle(self, group, x, y, radius, style):
         # add a circle
         if self._ignore(style):  return None
-        c = Circle()
-        c.style = style
-        c.radius = self._length(radius)
-        c.center = (self._x_coord(x), self._y_coord(y))
-        return group.add(c)
+        return self._add_node(group, SceneCircle(self._x_coord(x), self._y_coord(y), self._length(radius), self.intern_style(style)))
         
+    def add_circles(self, group, xs, ys, radii, style, compound = False):
+        # add a circle at each (xs[i], ys[i]), sequences or numpy arrays, radii is one radius or one for each.
+        # the same as add_circle for each, but the conversion is done on the arrays and the elements are made in one pass.
+        # if compound, they're a single path instead, which is returned
+        if self._ignore(style):  return None
+        style = self.intern_style(style)
+        if compound:
+            xs, ys, radii = self._circle_arrays(xs, ys, radii)
+            if len(xs) == 0:  return None
+            path = self._circles_path(xs, ys, radii)
+            return self._add_node(group, ScenePath(self.minimise_path(path) if self.minimising else path, style))
+        nodes = self._circle_nodes(xs, ys, radii, style)
+        if isinstance(group, SceneGroup):
+            for node in nodes:
+                self._add_node(group, node)
+        else:
+            self._emit_circles(group, nodes)
+        
+
     def add_arc(self, group, cx, cy, radius, start_angle_deg, end_angle_deg, style, large = None):
         # arc is clockwise from startAngle to endAngle, anticlockwise if radius < 0, large is deduced unless specified
         # https://developer.mozilla.org/en-US/docs/Web/SVG/Attribute/d
@@ -268,6 +450,7 @@ class Inksnek:
         #  which indicates how the ellipse as a whole is rotated relative to the current coordinate system. 
         #  The center (cx, cy) of the ellipse is calculated automatically to satisfy the constraints imposed by the other parameters. 
         #  large-arc-flag (1=large) and sweep-flag (1=clockwise) contribute to the automatic calculations and help determine how the arc is drawn."
+        if self._ignore(style):  return None
         if large == None:
             start_angle_deg = self.normalise_angle(start_angle_deg)
             end_angle_deg = self.normalise_angle(end_angle_deg)
@@ -279,23 +462,29 @@ class Inksnek:
         abs_r = self._length(abs(radius))
         s = self.polar_to_rectangular(abs_r, start_angle_deg)
         e = self.polar_to_rectangular(abs_r, end_angle_deg)
-        path = self.path_move_to(cx + s[0], cy + s[1]) + "A %.3f %.3f 0 %i %i" % (abs_r, abs_r, large, radius > 0) + " %.3f %.3f" % self._xy_coord((cx + e[0], cy + e[1]))
+        path = self.path_builder().move_to(cx + s[0], cy + s[1])
+        path._append('A', (abs_r, abs_r, large, radius > 0) + self._xy_coord((cx + e[0], cy + e[1])))
         return self.add_path(group, path, style)
 
     def add_X_marker(self, group, x, y, size = 2.0, style = None):
         # add an 'X'
         if style is None:  style = self.ignore_style
+        if self._ignore(style):  return None
         g = self.add_group(group, self.translate_group(x, y))
-        path =  self.path_move_to(-size, -size)
-        path += self.path_line_to(+size, +size)
-        path += self.path_move_to(-size, +size)
-        path += self.path_line_to(+size, -size)
+        path = self.path_builder()
+        path.move_to(-size, -size).line_to(+size, +size)
+        path.move_to(-size, +size).line_to(+size, -size)
         return self.add_path(g, path, style)
         
     def add_hole(self, group, x, y, radius, style = None):
         # add a circle, cut by default
         if style is None:  style = self.cut_style
         self.add_circle(group, x, y, radius, style)
+        
+    def add_holes(self, group, xs, ys, radii, style = None, compound = False):
+        # add_circles, cut by default
+        if style is None:  style = self.cut_style
+        return self.add_circles(group, xs, ys, radii, style, compound)
     
     def add_text(self, group, x, y, size, family, text, spacing = 0, align = "center", anchor = "middle", style = None):
         # add text. This is rudimentary!
@@ -303,37 +492,32 @@ class Inksnek:
         if style is None:  style = self.fill_style
         if self._ignore(style):  return None
         tstyle = {'text-align' : align, 'text-anchor': anchor, 'font-size':self._length(size), 'font-family':family, 'letter-spacing':self._length(spacing)}
-        tstyle.update(inkex.Style.parse_str( style ))
-        txt = inkex.TextElement()
-        txt.set("x", str(self._x_coord(x)))
-        txt.set("y", str(self._y_coord(y)))
-        txt.set("style", str(inkex.Style(tstyle)))
-        txt.text = text
-        group.add(txt)
+        self._add_node(group, SceneText(self._x_coord(x), self._y_coord(y), tstyle, text, self.intern_style(style)))
         
     def shape_to_path(self, x, y, scale_x, scale_y, shape):
         # shape is [[x1,y1], [x2,y2], ...]. draw-to's are [x,y], moves are [[x,y]], a close is [].
         # nodes are at (x + xN*scaleX, y + yN*scaleY)
-        path = self.path_start()
-        for idx in range(len(shape)):
-          node = shape[idx]
-          if len(node) == 2:
-            path += self.path_line_to(x + node[0]*scale_x, y + node[1]*scale_y)
-          elif len(node) == 1:
-            path += self.path_move_to(x + node[0][0]*scale_x, y + node[0][1]*scale_y)
-          elif len(node) == 0:
-            path += self.path_close()
-        return path
+        return self._shape_builder(x, y, scale_x, scale_y, shape).d()
     
     def add_shape(self, group, x, y, scale_x, scale_y, shape, style):
         # shape is [[x1,y1], [x2,y2], ...]. draw-to's are [x,y], moves are [[x,y]], a close is [].
         # nodes are at (x + xN*scaleX, y + yN*scaleY)
-        self.add_path(group, self.shape_to_path(x, y, scale_x, scale_y, shape), style)
+        if self._ignore(style):  return None
+        if self._instancing() or self.recording:  # as a <use>, made at the origin, if there are others
+            origin = self._shape_builder(0, 0, scale_x, scale_y, shape).d()
+            if self.minimising:
+                origin = self.minimise_path(origin)
+            if origin != "":
+                path = self._shape_builder(x, y, scale_x, scale_y, shape).d()
+                node = ScenePath(self.minimise_path(path) if self.minimising else path, self.intern_style(style), (origin, self._x_coord(x), self._y_coord(y)))
+                return self._add_node(group, node)
+        return self.add_path(group, self._shape_builder(x, y, scale_x, scale_y, shape), style)
 
     def add_annotation(self, group, x, y, text, size = 2.0, style = None, align = 0):
         # add text using a simple stroked "font", see annotationPath
         if style is None:  style = self.ignore_style
-        self.add_path(group, self.annotation_path(x, y, text, size, align), style)
+        if self._ignore(style):  return None
+        self.add_path(group, self._annotation_builder(x, y, text, size, align), style)
         
     def annotation_path(self, x, y, text, size, align = 0):
         # return a path of the text stroked using a simple "font"
@@ -341,6 +525,12 @@ class Inksnek:
         # additional control characters:  \n (\x0D) line feed; \x08 backspace; \x11,\x10 lower, higher; 
         #       \x0F,\x0E narrower, wider; \x1F,\x1E shorter, taller; \x1B underline toggle; 0xFn italic n=0 none, n=F max
         if text == "":  return None;
+        return self._annotation_builder(x, y, text, size, align).d()
+        
+    def _annotation_builder(self, x, y, text, size, align = 0):
+        # annotation_path, as a PathBuilder
+        path = self.path_builder()
+        if text == "":  return path
         linestext = maxlinelen = linelen = 0
         for ch in text: 
             if ch == '\n':
@@ -362,7 +552,6 @@ class Inksnek:
         x = x_origin
         underline = False
         italic = 0.0
-        path = ""
         for ch in text:
             if ch == '\n': x_origin = x; y_origin -= 3.0*y_scale; continue # basic newline
             elif ch == chr(0x11): y_origin -= 0.25*y_scale;  continue    # lower
@@ -374,39 +563,30 @@ class Inksnek:
             elif ch == chr(0x08): x_origin -= 3.0*x_scale;   continue    # backspace
             elif ch == chr(0x1B): underline = not underline; continue # underline
             elif ch >= chr(0xF0) and ch <= chr(0xFF): italic = (ord(ch) - 0xF0)/15.0; continue # italic
-            strokes = self._strokes[ (31, ord(ch) - 32)[' ' <= ch and ch <= self._strokes_last_char] ]   # use '?' if not defined 
-            box, prev, scale_y, shift_y = False, None, 1.0, 0.0
-            if (strokes & 0x0F) <= 0x07:  # ends with a move, special values
-                if (strokes & 0x03) == 0x01:
-                    scale_y = 0.5 # half vertical scale
-                elif (strokes & 0x03) == 0x02:
-                    shift_y = -y_scale # drop half height
-                elif (strokes & 0x03) == 0x03:
-                    shift_y = -y_scale/2.0 # drop quarter height
-                if (strokes & 0x04) == 0x04: # middle dot
-                    path += self.path_move_to(x_origin + x_scale + (y_scale + x_scale/2.0)*italic, y_origin + y_scale + x_scale/2.0)
-                    box = True
-                strokes &= 0xFFFFFFF0 # clear it
-            for cmd in range(8):
-                if box:
-                    path += self.path_horz_by(x_scale/2.0) + self.path_vert_by(x_scale/2.0) + self.path_horz_by(-x_scale/2.0) + self.path_vert_by(-x_scale/2.0)
-                    box = False
-                nibble = (strokes & 0xF0000000) >> 28
-                strokes <<= 4
-                node_idx = nibble & 0x07
-                y_ord = ((0x22211000 >> node_idx*4) & 0x0F)*y_scale*scale_y + shift_y
-                y = y_origin + y_ord
-                x = x_origin + ((0x21020210 >> node_idx*4) & 0x0F)*x_scale + y_ord*italic
-                if nibble & 0x08:  # high bit=draw
-                    if cmd == 0:  path += self.path_move_to(x_origin + shift_y*italic, y_origin + shift_y)  # start with a draw: insert a move 0
-                    path += self.path_line_to(x, y)
-                    box = not prev is None and node_idx == (prev & 0x07)
-                else:
-                    if prev == nibble and nibble == 0:  x, y = x_origin + x_scale + (y_scale*scale_y + shift_y)*italic, y_origin + y_scale*scale_y + shift_y # 0,0=centre
-                    if strokes == 0:  break # ignore *trailing* 0's
-                    path += self.path_move_to(x, y)
-                prev = nibble
-            if underline: path += self.path_move_to(x_origin, y_origin - y_scale/2.0) + self.path_line_by(3.0*x_scale, 0)
+            # the glyph is decoded once (see _glyph), the size, position & italic are applied here
+            scale_y, shift, ops, last = Inksnek._glyph(self._strokes[ (31, ord(ch) - 32)[' ' <= ch and ch <= self._strokes_last_char] ])   # use '?' if not defined 
+            shift_y = (0.0, -y_scale, -y_scale/2.0)[shift]
+            for op in ops:
+                cmd = op[0]
+                if cmd == "L" or cmd == "M":  # draw/move to a node
+                    y_ord = op[2]*y_scale*scale_y + shift_y
+                    if cmd == "L":
+                        path.line_to(x_origin + op[1]*x_scale + y_ord*italic, y_origin + y_ord)
+                    else:
+                        path.move_to(x_origin + op[1]*x_scale + y_ord*italic, y_origin + y_ord)
+                elif cmd == "0":  # start with a draw: insert a move 0
+                    path.move_to(x_origin + shift_y*italic, y_origin + shift_y)
+                elif cmd == "C":  # 0,0=centre
+                    path.move_to(x_origin + x_scale + (y_scale*scale_y + shift_y)*italic, y_origin + y_scale*scale_y + shift_y)
+                elif cmd == "D":  # middle dot
+                    path.move_to(x_origin + x_scale + (y_scale + x_scale/2.0)*italic, y_origin + y_scale + x_scale/2.0)
+                else:  # box/dot
+                    path.horz_by(x_scale/2.0).vert_by(x_scale/2.0).horz_by(-x_scale/2.0).vert_by(-x_scale/2.0)
+            if last is None:  # the last node visited, where a newline starts
+                x = x_origin + x_scale + (y_scale*scale_y + shift_y)*italic
+            else:
+                x = x_origin + last[0]*x_scale + (last[1]*y_scale*scale_y + shift_y)*italic
+            if underline: path.move_to(x_origin, y_origin - y_scale/2.0).line_by(3.0*x_scale, 0)
             x_origin += 3.0*x_scale
         return path
         
@@ -417,10 +597,13 @@ class Inksnek:
     
     def add_perf_board(self, group, x, y, cols, rows, style = None): # grid of cols x rows holes, 2.54mm apart, 1mm diameter
       if style is None:  style = self.ignore_style
-      board = self.add_group(group, self.translate_group(x, y))
-      for col in range(cols):
-        for row in range(rows):
-          self.add_circle(board, self.on_perf_board(col), self.on_perf_board(row), 0.5, style)
+      if self._ignore(style):  return None
+      style = self.intern_style(style)
+      # the board is a group of circles, as a <use> if there are others like it
+      board = SceneGroup(self.translate_group(x, y), (("perf", cols, rows, self.perf_board_pitch), self._x_coord(x), self._y_coord(y), style))
+      cols, rows = max(int(cols), 0), max(int(rows), 0)
+      board.children = self._circle_nodes(np.repeat(np.arange(cols)*self.perf_board_pitch, rows), np.tile(np.arange(rows)*self.perf_board_pitch, cols), 0.5, style)
+      return self._add_node(group, board)
             
     def degrees_to_radians(self, angle_degrees):
         # angleDegrees is degrees clockwise from 12 O'clock, returns radians anti-clockwise from 3 O'Clock
@@ -430,11 +613,47 @@ class Inksnek:
         # angleRadians is radians anti-clockwise from 3 O'Clock, returns degrees clockwise from 12 O'clock
         return 90.0 - (180.0*angle_radians/pi)
         
-    def polar_to_rectangular(self, radius, angle_degrees): # polar to rectangular
+    def polar_to_rectangular(self, radius, angle_degrees): # polar to rectangular, radius and/or angle_degrees can be arrays (or lists), then x & y are arrays
+        if np.ndim(radius) or np.ndim(angle_degrees):
+            radians = pi*(90.0 - np.asarray(angle_degrees, dtype=float))/180.0  # as degrees_to_radians
+            radius = np.asarray(radius, dtype=float)
+            return (radius*np.cos(radians), radius*np.sin(radians))
         x = radius * cos(self.degrees_to_radians(angle_degrees))
         y = radius * sin(self.degrees_to_radians(angle_degrees))
         return (x, y)
         
+    def add_polar_array(self, group, radius, angles, builder):
+        # call builder(g, angle) for each of the angles (degrees clockwise from 12 O'clock), with a group g at the radius, rotated by the angle.
+        # so the builder draws at the origin, "up" is away from the centre.  It should draw with add_* etc., into g or groups it adds to g.
+        # if what it draws is the same at every angle, it's a <use> of one prototype (except in FINAL mode), see add_perf_board.
+        # returns the groups
+        angles = np.atleast_1d(np.asarray(angles, dtype=float))
+        xs, ys = self.polar_to_rectangular(radius, angles)
+        scale_from, scale_to = self._unit_factors
+        xs, ys = np.broadcast_to(xs*scale_from/scale_to, angles.shape).tolist(), np.broadcast_to(-(ys*scale_from/scale_to), angles.shape).tolist()
+        arms = []
+        streaming, self.streaming = self.streaming, False  # the builder's nodes are kept, whatever the mode, to compare
+        try:
+            for x, y, angle in zip(xs, ys, angles.tolist()):
+                arm = SceneGroup(InksnekTransform.identity().add_translate(x, y) + self.rotate_group(angle))
+                self._group_transforms[arm] = (group, arm.transform)
+                builder(arm, angle)
+                arms.append(arm)
+        finally:
+            self.streaming = streaming
+        styles = set()
+        key = self._scene_key(arms[0].children, styles) if arms and (self._instancing() or self.recording) else ()
+        if key and all(self._scene_key(arm.children, set()) == key for arm in arms[1:]):
+            instance = (("polar", key), 0.0, 0.0, styles.pop() if len(styles) == 1 else None)  # all in one style, it's left out when that is
+            for index, arm in enumerate(arms):  # the <use> is inside the rotated group
+                arms[index] = SceneGroup(arm.transform)
+                arms[index].children.append(arm)
+                self._group_transforms[arms[index]] = (group, arm.transform)
+                arm.transform, arm.instance = None, instance
+        for arm in arms:
+            self._add_node(group, arm)
+        return arms
+        
     def normalise_angle(self, degrees):
         while degrees > 360.0:
             degrees = degrees - 360
@@ -442,35 +661,2299 @@ class Inksnek:
             degrees = degrees + 360
         return degrees
         
+    def finish(self):
+        # call at the end of effect(), tidies up the design: removes the groups left empty, by ignored children for example
+        if self._finished or self.recording:  return  # emit() finishes each mode
+        self._finished = True
+        if self.streaming:
+            self._end_stream()
+        elif isinstance(self.top_group, SceneGroup):  # retained, the empty groups are left out as the elements are made
+            self._materialise(self.top_group)
+        else:
+            self._prune_groups(self.top_group)
+            self._run_passes()
+        
+    def abandon(self):
+        # call rather than finish() if the design fails: a streamed design's file, part written, is removed, and the output
+        # left as it was (unless it's a stream)
+        if self._finished:  return
+        self._finished = True
+        if self._stream_head is not None:
+            self._close_stream(False)
+        
+    def emit(self, mode):
+        # add the recorded design (see recording) to the effect's document, in the mode.  Call once per document,
+        # for several modes, load a new document (and set the effect's svg) for each one, see inksnek_render.render_modes
+        self.recording = False
+        try:
+            self._uu_scales = {}  # a new document
+            self.units = self.units
+            self._set_mode(mode)
+            self._materialise(self._scene)
+            self._finished = True
+        finally:
+            self.recording = True
+        return self.top_group
+        
+    def save_geometry(self, out, dtype = np.float64):
+        # write the recorded (or retained, before finish()) design to out, a file name or binary stream, as the numbers, one
+        # flat array of dtype (float64, or float32 for half the size), after an index of the nodes: each node's kind, parent
+        # group, style and where its numbers are.  See read_geometry, and load_geometry to emit() it again without the design
+        if self._scene is None:
+            raise ValueError("save_geometry() needs the design's nodes, set recording (or retained) before setup()")
+        styles, skeletons, entries, numbers = {}, {}, [], []
+        self._geometry_entries(self._scene, -1, styles, skeletons, entries, numbers)
+        coords = np.asarray(numbers, dtype=dtype)
+        index = {"format":1, "dtype":coords.dtype.str, "count":len(coords),
+                 "setup":{name:getattr(self, name, None) for name in Inksnek._geometry_setup},
+                 "styles":[[str(style), role] for style, role in styles], "skeletons":list(skeletons), "entries":entries}
+        header = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        header += b" "*(-(len(Inksnek._geometry_magic) + 8 + len(header)) % 8)  # so the numbers are aligned, to map them
+        output = open(out, "wb") if isinstance(out, str) else out
+        try:
+            output.write(Inksnek._geometry_magic + struct.pack("<Q", len(header)) + header)
+            output.write(coords.tobytes())
+        finally:
+            if output is not out:
+                output.close()
+        
+    @staticmethod
+    def read_geometry(source):
+        # the (index, numbers) save_geometry wrote to source, a file name (the numbers are memory-mapped) or binary stream.
+        # Two designs' numbers can be compared directly, for regression tests, if their indexes are equal
+        stream = open(source, "rb") if isinstance(source, str) else source
+        try:
+            magic, size = stream.read(len(Inksnek._geometry_magic)), stream.read(8)
+            if magic != Inksnek._geometry_magic or len(size) != 8:
+                raise ValueError("not an inksnek geometry file")
+            index = json.loads(stream.read(struct.unpack("<Q", size)[0]))
+            offset = len(magic) + 8 + struct.unpack("<Q", size)[0]
+            if isinstance(source, str):
+                coords = np.memmap(source, index["dtype"], "r", offset, (index["count"],)) if index["count"] else np.zeros(0, index["dtype"])
+            else:
+                coords = np.frombuffer(stream.read(), index["dtype"], index["count"])
+        finally:
+            if stream is not source:
+                stream.close()
+        return index, coords
+        
+    def load_geometry(self, effect, source):
+        # set up for the effect (whose document is loaded) as the design was when save_geometry wrote source, with its nodes
+        # recorded, to emit() in any mode(s), see inksnek_render.render_geometry.  Returns the top group
+        index, coords = Inksnek.read_geometry(source)
+        setup = index["setup"]
+        self.recording = True
+        self.setup(effect, setup["template_number"], setup["material"], setup["material_thickness"], setup["units"], setup["mode"])
+        for name, value in setup.items():  # the template's size etc, in case it was custom
+            if value is not None:
+                setattr(self, name, value)
+        styles = [InksnekStyle(style, Inksnek._ignore_colour, self._cut_colour, role) if role else self.intern_style(style) for style, role in index["styles"]]
+        skeletons = index["skeletons"]
+        coords = coords.tolist()
+        nodes = []
+        for entry in index["entries"]:
+            kind, parent = entry[0], entry[1]
+            if kind == "g":
+                offset, label, instance = entry[2:]
+                transform = None if offset is None else InksnekTransform(tuple(coords[offset:offset + 6]))
+                if instance is not None:
+                    key, x, y, style = instance
+                    instance = (Inksnek._tuples(key), x, y, None if style is None else styles[style])
+                node = SceneGroup(transform, instance, label)
+            else:
+                style, offset = styles[entry[2]], entry[3]
+                if kind == "p":
+                    skeleton, origin = entry[4:]
+                    d, offset = Inksnek._skeleton_d(skeletons[skeleton], coords, offset)
+                    if origin is not None:
+                        origin, offset = Inksnek._skeleton_d(skeletons[origin], coords, offset)
+                        origin = (origin, coords[offset], coords[offset + 1])
+                    node = ScenePath(d, style, origin)
+                elif kind == "c":
+                    node = SceneCircle(coords[offset], coords[offset + 1], coords[offset + 2], style)
+                else:
+                    node = SceneText(coords[offset], coords[offset + 1], entry[4], entry[5], style)
+            if parent >= 0:
+                nodes[parent].children.append(node)
+            nodes.append(node)
+        self.top_group = self._scene = nodes[0]
+        return self.top_group
+        
+    def flatten(self, group = None):
+        # bake the transforms of the groups in the group (top_group by default) into the coordinates of their elements,
+        # and replace the groups with what's in them, except those with a label (see add_group), which are flattened themselves.
+        # Empty groups are removed.  Call after finish(), or set flattening.  Returns the (nodes, bytes) saved, bytes may be
+        # negative, the coordinates being the document's
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("flatten() needs the design's elements, call it after finish()")
+        nodes, size = sum(1 for _ in group.iter()), len(inkex.etree.tostring(group))
+        group[:] = self._flattened(group, inkex.Transform())  # not inkex's methods, which keep the id cache, per element
+        return nodes - sum(1 for _ in group.iter()), size - len(inkex.etree.tostring(group))
+        
+    def order_cuts(self, group = None):
+        # reorder the elements in the group (top_group by default) so the laser head travels less between them: the etches
+        # (everything not cut) first, then the cuts, each nearest first then improved by 2-opt, with anything inside a
+        # closed outline before the outline.  A closed path may start at any of its nodes, an open one may be drawn backwards.
+        # Etches, or cuts, already in a better order are left in it.
+        # The group is flattened first, a labelled group is ordered within itself.  Call after finish(), or set ordering.
+        # Returns the (before, after) travel, in document units, from the top left corner
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("order_cuts() needs the design's elements, call it after finish()")
+        before = self._travel(group)
+        self._flatten(group)
+        return before, self._order_group(group, np.zeros(2))[1]
+        
+    def remove_duplicate_cuts(self, group = None):
+        # remove what's cut twice in the group (top_group by default), as where two parts share an edge: the parts of lines
+        # along a line, and of arcs (and circles) around a circle, earlier cuts have drawn, to within duplicate_tolerance.
+        # Other curves are removed if they're drawn again whole.  What's left of a path is joined up where its pieces meet.
+        # The group is flattened first, so cuts in different (labelled) groups are compared.  Call after finish(), or set deduplicating.
+        # Returns the (segments, length) removed, segments being those cut shorter or out, length in document units
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("remove_duplicate_cuts() needs the design's elements, call it after finish()")
+        self._flatten(group)
+        tolerance = self._length(self.duplicate_tolerance, "mm")  # in document units
+        drawn = ({}, {}, set())  # the lines, by angle & offset, the circles, by centre & radius, and the other curves
+        segments, length = 0, 0.0
+        for parent, elem in list(self._cut_elems(group)):
+            pieces, changed = [], False
+            for segment in self._cut_segments(elem):
+                left = Inksnek._undrawn(segment, drawn, tolerance)
+                if left is None:
+                    pieces.append(segment)
+                    continue
+                segments += 1
+                length += Inksnek._segment_length(segment) - sum(Inksnek._segment_length(piece) for piece in left)
+                pieces += left
+                changed = True
+            if not changed:
+                continue
+            if not pieces:
+                parent.remove(elem)
+                continue
+            if isinstance(elem, Circle):
+                style, circle, elem = elem.attrib.get("style"), elem, PathElement()
+                if style is not None:
+                    elem.attrib["style"] = style
+                parent.replace(circle, elem)
+            self._set_d(elem, Inksnek._segments_path(pieces, tolerance))
+        self._prune_groups(group)  # any labelled group left empty
+        return segments, length
+        
+    def stitch_paths(self, group = None):
+        # join up the open paths in the group (top_group by default) which meet, end to end (to within stitch_tolerance),
+        # so each chain of them is cut in one go, with one pierce, rather than one per path: the lines add_line_to draws,
+        # the sides of add_rect, a path left in pieces by remove_duplicate_cuts ...  Paths may be drawn backwards to join.
+        # Only paths of the same style in the same group are joined, a closed path is left alone.  The group is flattened
+        # first.  Call after finish(), or set stitching.  Returns the (before, after) pierces, the starts of what the laser draws
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("stitch_paths() needs the design's elements, call it after finish()")
+        self._flatten(group)
+        return self._stitch_group(group)
+        
+    def hatch_fills(self, group = None):
+        # replace the filled paths & circles in the group (top_group by default), which a laser rasters a line at a time, with
+        # lines across them, hatch_pitch apart at the hatch_angle, which it draws as vectors.  The lines are in the
+        # etch of the same weight, light_fill's in light_etch_style etc (a fill of the design's own in heavy_etch_style), and
+        # go back and forth.  The lines are on one grid, so they line up from one fill to the next.  The fill-rule (nonzero,
+        # or evenodd) is kept.  The group is flattened first.  Call after finish(), or set hatching.  Returns the (fills, lines)
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("hatch_fills() needs the design's elements, call it after finish()")
+        self._flatten(group)
+        roles = {str(style):role for role, style in self._role_styles.items()}
+        fills, evenodd = [], []
+        for parent, elem, style in self._fill_elems(group):
+            role = roles.get(style)
+            fills.append((parent, elem, role if role in self.hatch_pitch else "heavy_fill"))
+            evenodd.append(("fill-rule", "evenodd") in style.attrs)
+        if not fills:
+            return 0, 0
+        # the edges of every fill, in (along, across) the lines, across being in pitches, tagged with their fill
+        angle = radians(self.hatch_angle)
+        along, across = np.array([sin(angle), -cos(angle)]), np.array([cos(angle), sin(angle)])  # y is down
+        rings, owners, flatness = [np.zeros((0, 2))], [0], self._length(Inksnek._flatness, "mm")
+        for index, (parent, elem, role) in enumerate(fills):
+            for ring in Inksnek._fill_rings(elem, flatness):
+                rings.append(ring)
+                owners.append(index)
+        sizes = np.array([len(ring) for ring in rings])
+        owners = np.repeat(np.array(owners), sizes)
+        points = np.concatenate(rings)
+        pitches = np.array([self._length(self.hatch_pitch[role], "mm") for parent, elem, role in fills])  # in document units
+        u, v = points @ along, points @ across/pitches[owners]
+        after = np.arange(1, len(points) + 1)  # each edge is from a point to the next, the last in its ring to the first
+        after[np.cumsum(sizes)[1:] - 1] = np.cumsum(sizes)[:-1]
+        u0, v0, u1, v1 = u, v, u[after], v[after]
+        # each edge crosses the lines from ceil(its lower end) up to, not including, its upper end, so a line through a node is crossed once
+        first, last = np.ceil(np.minimum(v0, v1)).astype(np.int64), np.ceil(np.maximum(v0, v1)).astype(np.int64)
+        counts = np.maximum(last - first, 0)
+        edge = np.repeat(np.arange(len(points)), counts)
+        line = first[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = (line - v0[edge])/(v1[edge] - v0[edge])
+        at = u0[edge] + t*(u1[edge] - u0[edge])
+        winding = np.where(v1[edge] > v0[edge], 1, -1)
+        owner = owners[edge]
+        order = np.lexsort((at, line, owner))
+        at, line, owner, winding = at[order], line[order], owner[order], winding[order]
+        # inside after each crossing, by the running winding (or count) along its line
+        starts = np.ones(len(at), dtype=bool)
+        starts[1:] = (line[1:] != line[:-1]) | (owner[1:] != owner[:-1])
+        runs = np.cumsum(winding)
+        runs -= (runs - winding)[np.nonzero(starts)[0]][np.cumsum(starts) - 1]  # from the start of its line
+        inside = np.where(np.asarray(evenodd)[owner], runs % 2 == 1, runs != 0)
+        span = np.nonzero(inside[:-1] & ~starts[1:] & (at[1:] - at[:-1] > 1e-9))[0]
+        lines = np.column_stack((at[span], at[span + 1], line[span], owner[span]))
+        # each fill's lines in order, every other one backwards, then back into document coordinates
+        backwards = lines[:, 2] % 2 == 1
+        lines[backwards, :2] = lines[backwards, 1::-1]
+        lines = lines[np.lexsort((np.where(backwards, -lines[:, 0], lines[:, 0]), lines[:, 2], lines[:, 3]))]
+        offsets = (lines[:, 2]*pitches[lines[:, 3].astype(np.int64)])[:, None]*across
+        ends = np.hstack((lines[:, [0]]*along + offsets, lines[:, [1]]*along + offsets))
+        bounds = np.searchsorted(lines[:, 3], np.arange(len(fills) + 1))
+        line_d = "M" + Inksnek._coord_format_str + "L" + Inksnek._coord_format_str
+        for index, (parent, elem, role) in enumerate(fills):
+            mine = ends[bounds[index]:bounds[index + 1]]
+            if len(mine):
+                hatch = PathElement()
+                hatch.attrib["style"] = str(self.heavy_etch_style if role == "heavy_fill" else getattr(self, role.replace("fill", "etch") + "_style"))
+                d = (line_d*len(mine)) % tuple(mine.ravel().tolist())
+                hatch.set("d", self.minimise_path(d) if self.minimising else d)
+                parent.replace(elem, hatch)
+            else:
+                parent.remove(elem)
+        self._prune_groups(group)
+        return len(fills), len(lines)
+        
+    def compensate_kerf(self, group = None):
+        # offset the closed cuts in the group (top_group by default) by half the kerf, so the parts come out the size they're
+        # drawn: an outline (inside an even number of others) outwards, a hole (inside an odd number) inwards.  Each closed
+        # part of a path, and each circle, is a contour.  Circles & circular arcs (add_arc, add_round_rect ...) stay circular,
+        # other curves are made lines first, outside corners are rounded & inside ones meet.  A contour too small to be offset
+        # is left alone, as are open paths & etches.  The group is flattened first.  Call after finish(), or set compensating.
+        # Returns the (outlines, holes) offset
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("compensate_kerf() needs the design's elements, call it after finish()")
+        self._flatten(group)
+        distance, flatness = self.kerf/2.0, self._length(Inksnek._flatness, "mm")
+        if distance <= 0:
+            return 0, 0
+        # the contours, as (elem, cut, kind, points, box, outline) items for _insides (which only needs the last three), and
+        # the outlines in pieces, as a box's side is (its shared edges drawn by the next side), which aren't offset but have
+        # holes in them: the paths with open parts which go most of the way round
+        elems, contours, items, outlines = [], [], [], []
+        for parent, elem in self._cut_elems(group):
+            pieces = []
+            subpaths = Inksnek._subpaths(self._cut_segments(elem))
+            for segments in subpaths:
+                start, end = Inksnek._segment_ends(segments[0])[0], Inksnek._segment_ends(segments[-1])[1]
+                if hypot(end[0] - start[0], end[1] - start[1]) > 1e-6:
+                    pieces.append(segments)  # open, as it is
+                    continue
+                if len(segments) == 1 and segments[0][0] == "A":  # a circle
+                    cx, cy, radius = segments[0][1:4]
+                    outline = (np.array([cx, cy]), radius)
+                    points, box = np.array([[cx + radius*cos(segments[0][4]), cy + radius*sin(segments[0][4])]]), np.array([cx - radius, cy - radius, cx + radius, cy + radius])
+                else:
+                    segments = [line for segment in segments for line in Inksnek._offsettable(segment, flatness)]
+                    points = outline = np.array([point for segment in segments for point in Inksnek._segment_points(segment)])
+                    box = np.concatenate((outline.min(axis=0), outline.max(axis=0)))
+                pieces.append(len(contours))
+                contours.append(segments)
+                items.append((elem, 1, "closed", points, box, outline))
+            if any(not isinstance(piece, int) for piece in pieces):
+                outline = np.array([point for segments in subpaths for point in
+                                    [point for segment in segments for line in Inksnek._offsettable(segment, flatness) for point in Inksnek._segment_points(line)] +
+                                    [Inksnek._segment_ends(segments[-1])[1]]])
+                box = np.concatenate((outline.min(axis=0), outline.max(axis=0)))
+                area = abs(np.dot(outline[:, 0], np.roll(outline[:, 1], -1)) - np.dot(outline[:, 1], np.roll(outline[:, 0], -1)))/2
+                if area > (box[2] - box[0])*(box[3] - box[1])/2:  # it goes most of the way round
+                    outlines.append((elem, 1, "fixed", outline, box, outline))
+            elems.append((parent, elem, pieces))
+        if not contours:
+            return 0, 0
+        # outwards, or in, by how many contours (or outlines in pieces) each is inside
+        outward = [len(outers) % 2 == 0 for outers in self._insides(items + outlines)[:len(items)]]
+        offsets = [Inksnek._offset_contour(contour, distance if out else -distance) for contour, out in zip(contours, outward)]
+        outlines = holes = 0
+        for parent, elem, pieces in elems:
+            segments, changed = [], False
+            for piece in pieces:
+                if isinstance(piece, int):
+                    if offsets[piece] is not None:
+                        changed = True
+                        outlines, holes = (outlines + 1, holes) if outward[piece] else (outlines, holes + 1)
+                    piece = contours[piece] if offsets[piece] is None else offsets[piece]
+                segments += piece
+            if not changed:
+                continue
+            if isinstance(elem, Circle):
+                elem.radius = segments[0][3]
+            else:
+                self._set_d(elem, Inksnek._segments_path(segments, 1e-9))
+        return outlines, holes
+        
+    def estimate_job(self, group = None):
+        # how long the laser will take over the group (top_group by default), with what it draws, for each pass: the fills
+        # (rastered), then the etches, light to heavy, then the cuts, each in the order they're in, from the top left corner.
+        # The times are from material_profiles.  Call after finish(), or set estimating.  Doesn't change the group.
+        # Returns {"material", "thickness", "passes":[{"pass", "speed", "power", "length", "pierces", "travel", "area", "seconds"}],
+        # "length", "pierces", "travel", "area", "seconds"}, in mm (whatever the document's units) and seconds, as JSON can write it
+        if group is None:  group = self.top_group
+        if isinstance(group, SceneGroup):
+            raise ValueError("estimate_job() needs the design's elements, call it after finish()")
+        profile = self.material_profiles[self.material]
+        roles = {str(style):role for role, style in self._role_styles.items()}
+        passes = {}
+        for elem, transform in self._laser_elems(group, group.composed_transform()):
+            style = elem.attrib.get("style", "")
+            name = roles.get(style)
+            if name is None:
+                style = self.intern_style(style)
+                name = "cut" if style.is_cut else "fill" if style.is_fill else "etch"  # a style of the design's own
+            passes.setdefault(name, []).append(Inksnek._measure(elem, transform, name.endswith("fill")))
+        estimate, head, totals = [], (0.0, 0.0), dict(length=0.0, pierces=0, travel=0.0, area=0.0, seconds=0.0)
+        to_mm = 1.0/self._uu_scale("mm")  # from document units, as the speeds are
+        for name in sorted(passes, key=lambda name: Inksnek._pass_order.index(name)):
+            speed, power = profile.get(name) or profile["heavy_" + name]  # the design's own etches & fills, as heavy
+            if name == "cut":
+                speed *= 3.0/self._thickness_mm
+            length, area, pierces, travel = 0.0, 0.0, 0, 0.0
+            for drawn, enclosed, starts, ends in passes[name]:
+                length, area, pierces = length + drawn*to_mm, area + enclosed*to_mm*to_mm, pierces + len(starts)
+                for start, end in zip(starts, ends):
+                    travel += hypot(start[0] - head[0], start[1] - head[1])*to_mm
+                    head = end
+            if name.endswith("fill"):  # rastered, a line at a time, the outline isn't drawn
+                length, pierces = 0.0, 0
+                seconds = area*profile["lines"]/speed
+            else:
+                seconds = length/speed + pierces*profile["pierce"]
+            seconds += travel/profile["travel"]
+            step = dict(length=length, pierces=pierces, travel=travel, area=area, seconds=seconds)
+            for key in totals:
+                totals[key] += step[key]
+            estimate.append(dict([("pass", name), ("speed", round(speed, 3)), ("power", power)] + [(key, round(value, 3)) for key, value in step.items()]))
+        return dict([("material", self.material_names.get(self.material, self.material)), ("thickness", round(self._thickness_mm, 3)), ("passes", estimate)]
+                    + [(key, round(value, 3)) for key, value in totals.items()])
+        
     def ignore_colour(self):
         # return the no-laser colour
         return self._ignore_colour
+        
+    def expand_instances(self, group = None):
+        # replace the <use>s of instanced geometry in the group (top_group by default) with copies, for cutters that don't understand <use>
+        if group is None:  group = self.top_group
+        protos = {}
+        for proto in self._instances.values():
+            if not isinstance(proto, tuple):
+                protos["#" + proto.get("id")] = proto
+        self._expand_uses(group, protos)
+        for proto in protos.values():
+            proto.getparent().remove(proto)
+        self._instances = {}
      
     ################ PRIVATE
+    def _add_node(self, group, node):
+        # add the node to the group: record/retain it, or make the element for it now
+        if isinstance(group, SceneGroup):
+            if self.streaming:
+                return self._stream(group, node)
+            group.children.append(node)
+            return node
+        return self._emit(group, node)
+        
+    def _circle_arrays(self, xs, ys, radii):
+        # the centres & radii as arrays, converted to document units, see _x_coord etc
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        if xs.shape != ys.shape:
+            raise ValueError("xs and ys must be the same length")
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), xs.shape)
+        scale_from, scale_to = self._unit_factors
+        return xs*scale_from/scale_to, -(ys*scale_from/scale_to), radii*scale_from/scale_to
+        
+    def _circle_nodes(self, xs, ys, radii, style):
+        xs, ys, radii = self._circle_arrays(xs, ys, radii)
+        return [SceneCircle(x, y, radius, style) for x, y, radius in zip(xs.tolist(), ys.tolist(), radii.tolist())]
+        
+    def _circles_path(self, xs, ys, radii):
+        # each circle as two half arcs, from its right-most point
+        return "".join(["M%.3f,%.3fa%.3f,%.3f 0 1 0 %.3f,0a%.3f,%.3f 0 1 0 %.3f,0z" % circle
+                        for circle in zip((xs + radii).tolist(), ys.tolist(), radii.tolist(), radii.tolist(), (-2.0*radii).tolist(), radii.tolist(), radii.tolist(), (2.0*radii).tolist())])
+        
+    def _emit_circles(self, group, nodes):
+        # _emit for each of the circles, with their markup parsed in one go.  Except for the first two of each instance, which
+        # make its prototype, see _add_instance
+        parts = []
+        proto_ids = {}
+        for node in nodes:
+            if self._instancing():
+                key = ("circle", node.radius, self._mode_style(node.style))
+                proto_id = proto_ids.get(key)
+                if proto_id is None:
+                    proto = self._instances.get(key)
+                    if proto is None or isinstance(proto, tuple):
+                        if parts:
+                            self._extend(group, self._parse_markup(parts))
+                            parts = []
+                        self._emit(group, node)
+                        continue
+                    proto_id = proto_ids[key] = proto.get("id")
+                parts.append(self._use_markup(proto_id, node.x, node.y))
+            else:
+                parts.append('<circle style="%s" r="%s" cx="%s" cy="%s"/>' % (self._xml_attr(node.style), node.radius, node.x, node.y))
+        if parts:
+            self._extend(group, self._parse_markup(parts))
+        
+    def _emit(self, parent, node):
+        # make the element(s) for the node, in the current mode, and add them to parent. returns the element
+        if isinstance(node, SceneGroup):
+            if node.instance is not None and self._instancing():
+                key, x, y, style = node.instance
+                if style is not None:
+                    style = self._mode_style(style)
+                    if self._omit_ignore and style.is_ignore:
+                        return None
+                return self._add_instance(parent, key + (style,), x, y, lambda gx, gy: self._group(node, " translate(" + str(gx) + "," + str(gy) + ") "))
+            if node.transform is None:  # just its children, see add_polar_array
+                for child in node.children:
+                    self._emit(parent, child)
+                return parent
+            return parent.add(self._group(node, node.transform))
+        style = self._mode_style(node.style)
+        if self._omit_ignore and style.is_ignore:
+            return None
+        if isinstance(node, ScenePath):
+            if node.instance is not None and self._instancing():
+                origin, x, y = node.instance
+                d = node.d
+                return self._add_instance(parent, ("shape", origin, style), x, y, lambda px, py: self._path(d if (px, py) == (x, y) else origin, style))
+            return parent.add(self._path(node.d, style))
+        if isinstance(node, SceneCircle):
+            radius = node.radius
+            if self._instancing():
+                return self._add_instance(parent, ("circle", radius, style), node.x, node.y, lambda cx, cy: self._circle(cx, cy, radius, style))
+            return parent.add(self._circle(node.x, node.y, radius, style))
+        tstyle = dict(node.tstyle)
+        tstyle.update(self.intern_style(style).attrs)
+        txt = inkex.TextElement()
+        txt.set("x", str(node.x))
+        txt.set("y", str(node.y))
+        txt.set("style", str(inkex.Style(tstyle)))
+        txt.text = node.text
+        return parent.add(txt)
+        
+    def _mode_style(self, style):
+        # the predefined styles are recorded by role, and emitted in the current mode's colours etc.
+        # other styles are as recorded, except the ignore colour (from ignore_colour()) is this mode's
+        if style.role is not None:
+            return self._role_styles[style.role]
+        if style.is_ignore and self._ignore_colour != Inksnek._ignore_colour:
+            return self.intern_style(style.replace(Inksnek._ignore_colour, self._ignore_colour))
+        return style
+        
+    def _group(self, node, transform):
+        g = Group()
+        if isinstance(transform, inkex.Transform):  # set() would copy it, & compare it with the identity
+            attr = str(transform)
+            if attr:
+                g.attrib["transform"] = attr
+        else:
+            g.set("transform", transform)
+        if node.label is not None:
+            g.label = node.label
+        for child in node.children:
+            self._emit(g, child)
+        return g
+        
+    def _materialise(self, scene):
+        # make the elements for the scene (recorded or retained), in the current mode, as _emit & finish() would.  In one pass:
+        # the markup is built as strings then parsed at once, much cheaper than an inkex element per node.
+        # If there's an output (see retained), the markup is written around the serialised document instead, no elements at all
+        svg = self._Effect.svg
+        self.top_group = Group("design")
+        self.top_group.set("transform", scene.transform)
+        svg.get_current_layer().add(self.top_group)
+        self._marks = {}       # instance key -> (parts, index, x, y) of the first, or the prototype's id, see _markup_instance
+        self._protos = {}      # id -> markup of the prototypes, for <defs>
+        parts = []
+        for child in scene.children:
+            self._markup(parts, child)
+        protos = self._join(list(self._protos.values()), [], False)
+        if protos:
+            self._declare_xlink(svg)
+        if self.output is not None and svg.nsmap.get(None) == Inksnek._svg_ns and not self._working_on_elements():  # so the markup needs no xmlns
+            self._declare_namespace(svg, "inkscape", Inksnek._inkscape_ns, "label")  # for any labels
+            self._write_around(svg, protos, parts)
+            self._instances = {}
+        else:
+            if protos:
+                for proto in list(self._parse_markup(protos)):
+                    svg.defs.append(proto)
+                    svg.ids[proto.get("id")] = proto
+            self._instances = {key:svg.getElementById(mark) for key, mark in self._marks.items() if not isinstance(mark, tuple)}
+            design = self._join(parts, [], True)
+            if design:
+                self._extend(self.top_group, self._parse_markup(design))
+            self._run_passes()
+            if self.output is not None:
+                self._write_output([svg.tostring()])
+        self._marks = self._protos = None
+        
+    def _parse_markup(self, parts):
+        # the elements for the markup, as the children of a <g>
+        return inkex.load_svg("".join(['<g xmlns="%s" xmlns:xlink="%s" xmlns:inkscape="%s">' % (Inksnek._svg_ns, Inksnek._xlink_ns, Inksnek._inkscape_ns)] + parts + ["</g>"])).getroot()
+        
+    def _extend(self, group, parsed):
+        # move the parsed elements into group.  Not with inkex's extend, which keeps the id cache, per element, they have no ids
+        inkex.etree.ElementBase.extend(group, list(parsed))
+        
+    def _write_around(self, svg, protos, parts):
+        # write the document to the output, with the prototypes at the end of <defs> and the design's parts in top_group
+        marker = "inksnek:materialise"
+        groups = (svg.defs, self.top_group) if protos else (self.top_group,)
+        for group in groups:
+            group.append(inkex.etree.Comment(marker))
+        *head, tail = svg.tostring().split(b"<!--" + marker.encode("ascii") + b"-->")
+        for group in groups:
+            group.remove(group[-1])
+        def chunks():
+            yield head[0]
+            if protos:
+                yield "".join(protos).encode("ascii", "xmlcharrefreplace")
+                yield head[1]
+            for part in parts:  # a top-level group at a time, rather than the whole design as one string
+                yield "".join(self._join([part], [], True)).encode("ascii", "xmlcharrefreplace")
+            yield tail
+        self._write_output(chunks())
+        
+    def _write_output(self, chunks):
+        output = open(self.output, "wb") if isinstance(self.output, str) else self.output
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not self.output:
+                output.close()
+        
+    def _start_stream(self, transform):
+        # the document up to the (empty) design group is written to the output first, the rest as the design is added, then by finish()
+        svg = self._Effect.svg
+        if self._stream_output is not None:
+            raise ValueError("the design is being written already")
+        if svg.nsmap.get(None) != Inksnek._svg_ns:
+            raise ValueError("streaming needs a template with SVG as its default namespace")
+        if self.output is None:
+            raise ValueError("streaming needs an output")
+        passes = self._active_passes()
+        if passes:
+            raise ValueError("%s needs the design's elements, it can't be streamed" % passes[0][5])
+        if self._instancing():
+            self._declare_xlink(svg)  # before the head is written, in case there are <use>s
+        self._declare_namespace(svg, "inkscape", Inksnek._inkscape_ns, "label")  # and labels
+        design = self._design_group = Group("design")
+        design.set("transform", transform)
+        svg.get_current_layer().add(design)
+        marker = inkex.etree.Comment("inksnek:stream")
+        design.append(marker)
+        self._stream_head, self._stream_tail = svg.tostring().split(b"<!--inksnek:stream-->")
+        design.remove(marker)
+        self.top_group = self._scene = SceneGroup(transform)
+        self._open_groups = [self.top_group]  # the groups that can still be added to, innermost last
+        self._written_groups = 1              # how many of them have their <g> written, outermost first
+        self._marks = {}                      # see _materialise, the first of several instances stays as it is though
+        self._protos = {}
+        
+    def _stream(self, group, node):
+        # write the node, as it's added to the group. a group is kept open, and only written if something is added to it
+        self._close_groups(group)
+        if isinstance(node, SceneGroup) and node.instance is None and not node.children:  # add_group
+            self._open_groups.append(node)
+            return node
+        parts = []
+        self._markup(parts, node)
+        self._forget_groups(node)
+        markup = "".join(self._join(parts, [], True))
+        if markup:
+            if self._written_groups < len(self._open_groups):
+                self._write_groups()
+            self._stream_write(markup.encode("ascii", "xmlcharrefreplace"))
+        return node
+        
+    def _stream_write(self, data):
+        if self._stream_output is None:  # not until now, in case of set_custom_template()
+            if isinstance(self.output, str):  # alongside it, renamed to it by finish(), so a design that fails leaves no half a file
+                self._stream_part = self.output + ".part"
+                self._stream_output = open(self._stream_part, "wb")
+            else:
+                self._stream_output = self.output
+            self._stream_output.write(self._stream_head)
+        self._stream_output.write(data)
+        
+    def _close_groups(self, group):
+        # close the open groups inside group, which is then the innermost
+        open_groups = self._open_groups
+        while open_groups and open_groups[-1] is not group:
+            self._forget_groups(open_groups.pop())
+            if self._written_groups > len(open_groups):
+                self._stream_write(b"</g>")
+                self._written_groups -= 1
+        if not open_groups:
+            raise ValueError("the group has been written already, see Inksnek.group()")
+        
+    def _forget_groups(self, node):
+        # drop the transforms group_transform kept for the node & the groups in it, once they're written, so streaming keeps
+        # only the open groups'
+        if isinstance(node, SceneGroup):
+            self._group_transforms.pop(node, None)
+            for child in node.children:
+                self._forget_groups(child)
+        
+    def _write_groups(self):
+        # write the <g>s of the open groups which haven't been yet
+        for group in self._open_groups[self._written_groups:]:
+            self._stream_write(self._group_start(group, group.transform).encode("ascii", "xmlcharrefreplace"))
+        self._written_groups = len(self._open_groups)
+        
+    def _end_stream(self):
+        # close the groups, write the prototypes for the <use>s (at the end of the design) and the rest of the document
+        try:
+            self._close_groups(self.top_group)
+            if self._protos:
+                self._stream_write(("<defs>" + "".join(self._join(list(self._protos.values()), [], False)) + "</defs>").encode("ascii", "xmlcharrefreplace"))
+            self._stream_write(self._stream_tail)
+        except BaseException:
+            self._close_stream(False)
+            raise
+        self._close_stream(True)
+        
+    def _close_stream(self, written):
+        # close the file the design was streamed to, if inksnek opened it, and rename it to the output if it's written, or remove it
+        output, part = self._stream_output, self._stream_part
+        self._stream_output = self._stream_part = self._stream_head = self._stream_tail = self._open_groups = None
+        self._marks = self._protos = None
+        if part is not None:
+            output.close()
+            if written:
+                os.replace(part, self.output)
+            else:
+                os.remove(part)
+        
+    def _markup(self, parts, node):
+        # as _emit, but the node's markup is appended to parts, groups are nested lists of parts
+        if isinstance(node, SceneGroup):
+            if node.instance is not None and self._instancing():
+                key, x, y, style = node.instance
+                if style is not None:
+                    style = self._mode_style(style)
+                    if self._omit_ignore and style.is_ignore:
+                        return
+                return self._markup_instance(parts, key + (style,), x, y, lambda gx, gy: self._group_markup(node, " translate(" + str(gx) + "," + str(gy) + ") "))
+            if node.transform is None:
+                for child in node.children:
+                    self._markup(parts, child)
+                return
+            parts.append(self._group_markup(node, node.transform))
+            return
+        style = self._mode_style(node.style)
+        if self._omit_ignore and style.is_ignore:
+            return
+        if isinstance(node, ScenePath):
+            if node.instance is not None and self._instancing():
+                origin, x, y = node.instance
+                d = node.d
+                return self._markup_instance(parts, ("shape", origin, style), x, y, lambda px, py: '<path style="%s" d="%s"/>' % (self._xml_attr(style), self._xml_attr(d if (px, py) == (x, y) else origin)))
+            parts.append('<path style="%s" d="%s"/>' % (self._xml_attr(style), self._xml_attr(node.d)))
+        elif isinstance(node, SceneCircle):
+            radius = node.radius
+            if self._instancing():
+                return self._markup_instance(parts, ("circle", radius, style), node.x, node.y, lambda cx, cy: '<circle style="%s" r="%s" cx="%s" cy="%s"/>' % (self._xml_attr(style), float(radius), float(cx), float(cy)))
+            parts.append('<circle style="%s" r="%s" cx="%s" cy="%s"/>' % (self._xml_attr(style), float(radius), float(node.x), float(node.y)))
+        else:
+            tstyle = dict(node.tstyle)
+            tstyle.update(style.attrs)
+            text = node.text or ""
+            parts.append('<text x="%s" y="%s" style="%s">%s</text>' % (node.x, node.y, self._xml_attr(str(inkex.Style(tstyle))), text.translate(Inksnek._xml_text_escapes)))
+        
+    def _markup_instance(self, parts, key, x, y, make):
+        # as _add_instance, for _markup: make(x, y) returns the markup, the first is replaced in its parts by a <use> of the prototype
+        mark = self._marks.get(key)
+        if mark is None:
+            parts.append(make(x, y))
+            self._marks[key] = (parts, len(parts) - 1, x, y)
+            return
+        if isinstance(mark, tuple):
+            first_parts, index, first_x, first_y = mark
+            proto = make(*self._origin)
+            mark = "inksnek%i" % (len(self._Effect.svg.defs) + len(self._protos))
+            while mark in self._protos or self._Effect.svg.getElementById(mark) is not None:
+                mark += "_"
+            if isinstance(proto, list):  # a group
+                proto[0] = proto[0][:-1] + ' id="%s">' % mark
+            else:
+                proto = proto[:-2] + ' id="%s"/>' % mark
+            self._protos[mark] = proto
+            self._marks[key] = mark
+            first_parts[index] = self._use_markup(mark, first_x, first_y)
+        parts.append(self._use_markup(mark, x, y))
+        
+    def _use_markup(self, proto_id, x, y):
+        return '<use xlink:href="#%s" x="%s" y="%s"/>' % (proto_id, Inksnek._ord_format_str % x, Inksnek._ord_format_str % y)
+        
+    def _group_markup(self, node, transform):
+        parts = [self._group_start(node, transform)]
+        for child in node.children:
+            self._markup(parts, child)
+        parts.append("</g>")
+        return parts
+        
+    def _group_start(self, node, transform):
+        if node.label is None:
+            return "<g" + self._transform_attr(transform) + ">"
+        return '<g%s inkscape:label="%s">' % (self._transform_attr(transform), self._xml_attr(node.label))
+        
+    def _transform_attr(self, transform):
+        if isinstance(transform, inkex.Transform):  # as inkex writes it, nothing if it's the identity
+            attr = str(transform)
+            return ' transform="%s"' % attr if attr else ""
+        return Inksnek._transform_string_attr(transform)
+        
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _transform_string_attr(transform):
+        # the attribute for an SVG transform string, as inkex writes it, nothing if it's the identity.  A bounded cache,
+        # not one per design, so streaming many groups doesn't keep them all
+        parsed = inkex.Transform(transform)
+        return ' transform="%s"' % Inksnek._xml_attr(str(parsed)) if parsed else ""
+        
+    def _join(self, parts, out, prune):
+        # flatten the nested parts into out, leaving out the empty groups if prune, as _prune_groups does
+        for part in parts:
+            if isinstance(part, list):
+                size = len(out)
+                self._join(part, out, prune)
+                if prune and len(out) == size + 2:  # just <g> & </g>
+                    del out[size:]
+            else:
+                out.append(part)
+        return out
+        
+    @staticmethod
+    def _xml_attr(value):
+        # value escaped for a (double-quoted) attribute
+        return value.translate(Inksnek._xml_attr_escapes) if Inksnek._xml_attr_special(value) else value
+        
+    def _scene_key(self, nodes, styles):
+        # the nodes as a tuple, equal if they make the same elements.  Adds their styles to styles
+        key = []
+        for node in nodes:
+            if isinstance(node, SceneGroup):
+                if node.instance is not None:
+                    styles.add(node.instance[3])
+                key.append((str(node.transform), node.instance, node.label, self._scene_key(node.children, styles)))  # as it's written
+            elif isinstance(node, SceneText):
+                styles.add(node.style)
+                key.append((node.x, node.y, tuple(node.tstyle.items()), node.text, node.style))
+            else:
+                styles.add(node.style)
+                key.append(tuple(getattr(node, slot) for slot in node.__slots__))
+        return tuple(key)
+        
+    def _geometry_entries(self, node, parent, styles, skeletons, entries, numbers):
+        # add the node, and its children, to the index entries & their numbers, see save_geometry
+        def style_index(style):
+            return styles.setdefault((style, style.role), len(styles))  # the role too, a predefined style is emitted by it
+        if isinstance(node, SceneGroup):
+            offset, instance = None, node.instance
+            if node.transform is not None:
+                offset = len(numbers)
+                numbers.extend(node.transform.to_hexad())
+            if instance is not None:
+                instance = [instance[0], instance[1], instance[2], None if instance[3] is None else style_index(instance[3])]
+            group = len(entries)
+            entries.append(["g", parent, offset, node.label, instance])
+            for child in node.children:
+                self._geometry_entries(child, group, styles, skeletons, entries, numbers)
+        elif isinstance(node, ScenePath):
+            entry = ["p", parent, style_index(node.style), len(numbers), Inksnek._skeleton(node.d, skeletons, numbers), None]
+            if node.instance is not None:
+                origin, x, y = node.instance
+                entry[5] = Inksnek._skeleton(origin, skeletons, numbers)
+                numbers.extend((x, y))
+            entries.append(entry)
+        elif isinstance(node, SceneCircle):
+            entries.append(["c", parent, style_index(node.style), len(numbers)])
+            numbers.extend((node.x, node.y, node.radius))
+        else:
+            entries.append(["t", parent, style_index(node.style), len(numbers), node.tstyle, node.text])
+            numbers.extend((node.x, node.y))
+        
+    @staticmethod
+    def _skeleton(d, skeletons, numbers):
+        # the d string's numbers are added to numbers, returns the index of the rest (its "skeleton") in skeletons.
+        # A skeleton is the d string with each number replaced by how it was written: its decimal places (a digit), then "."
+        # if without the leading 0 (as minimise_path writes them), or "r" if in some other form.  There are no digits between
+        parts = Inksnek._path_number_re.split(d)
+        for i in range(1, len(parts), 2):
+            number = parts[i]
+            numbers.append(float(number))
+            whole, point, fraction = number.partition(".")
+            if "e" in number or "E" in number or len(fraction) > 9:
+                parts[i] = "r"
+            else:
+                parts[i] = "%i%s" % (len(fraction), "." if point and whole in ("", "-", "+") else "")
+        return skeletons.setdefault("".join(parts), len(skeletons))
+        
+    @staticmethod
+    def _skeleton_d(skeleton, coords, offset):
+        # the d string for the skeleton, with the numbers from coords[offset:], and the offset after them
+        d = Inksnek._skeleton_code_re.split(skeleton)
+        for i in range(1, len(d), 2):
+            code = d[i]
+            if code == "r":
+                d[i] = repr(coords[offset])
+            else:
+                d[i] = "%.*f" % (int(code[0]), coords[offset])
+                if code[1:]:
+                    d[i] = d[i].replace("0.", ".", 1)
+            offset += 1
+        return "".join(d), offset
+        
+    @staticmethod
+    def _tuples(value):
+        # the lists (from JSON) in value as tuples, as a key was
+        return tuple(Inksnek._tuples(item) for item in value) if isinstance(value, list) else value
+        
+    def _circle(self, x, y, radius, style):
+        c = Circle()
+        c.attrib["style"] = self.intern_style(style)  # already as inkex writes it, the style setter would parse it again
+        c.radius = radius
+        c.center = (x, y)
+        return c
+        
+    def _path(self, path, style):
+        p = PathElement()  # d is set directly, p.path would parse the string back into segments and re-format it
+        p.attrib["style"] = self.intern_style(style)
+        p.set("d", path)
+        return p
+        
+    def _flatten(self, group):
+        # flatten the group for one of the passes, unless _run_passes has already, without measuring what it saves
+        if group is not self._flat:
+            group[:] = self._flattened(group, inkex.Transform())
+        
+    def _flattened(self, group, transform):
+        # the group's elements, with the transform baked into them, for flatten()
+        elems = []
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                child_transform = transform @ child.transform
+                if child.label is None:
+                    elems += self._flattened(child, child_transform)
+                else:
+                    content = self._flattened(child, child_transform)
+                    if content:
+                        child.attrib.pop("transform", None)
+                        child[:] = content
+                        elems.append(child)
+            elif not isinstance(child.tag, str):  # a comment
+                continue
+            elif transform:
+                elems.append(self._bake(child, transform))
+            else:
+                elems.append(child)
+        return elems
+        
+    def _bake(self, elem, transform):
+        # the element with the transform applied to its coordinates, if it can be, otherwise as its transform.  may be a new element
+        transform = transform @ elem.transform
+        elem.attrib.pop("transform", None)
+        if isinstance(elem, Circle) and abs(transform.a - transform.d) < 1e-9 and abs(transform.b + transform.c) < 1e-9:  # no skew/stretch
+            elem.center = transform.apply_to_point(elem.center)
+            elem.radius = elem.radius*hypot(transform.a, transform.b)
+            return elem
+        if isinstance(elem, (PathElement, Circle)):
+            path = self._path_d(self._bake_path(elem.path, transform))
+            if self.minimising:
+                path = self.minimise_path(path)
+            if isinstance(elem, Circle):
+                style, elem = elem.attrib.get("style"), PathElement()
+                if style is not None:
+                    elem.attrib["style"] = style
+            elem.set("d", path)
+            return elem
+        if isinstance(elem, inkex.Use):
+            transform = transform @ inkex.Transform(translate=(float(elem.get("x", 0)), float(elem.get("y", 0))))
+            if transform.is_translate():
+                elem.set("x", Inksnek._ord_format_str % transform.e)
+                elem.set("y", Inksnek._ord_format_str % transform.f)
+                return elem
+            elem.attrib.pop("x", None)
+            elem.attrib.pop("y", None)
+        elem.transform = transform
+        return elem
+        
+    def _bake_path(self, path, transform):
+        # the inkex.Path's (letter, args), transformed.  Moves & scales keep any H, V & relative commands, inkex would make them L
+        a, b, c, d, e, f = transform.to_hexad()
+        if abs(b) > 1e-9 or abs(c) > 1e-9:
+            return [(segment.letter, segment.args) for segment in path.transform(transform)]
+        baked = []
+        for segment in path:
+            letter, args = segment.letter, segment.args
+            dx, dy = (e, f) if letter.isupper() or not baked else (0.0, 0.0)  # a path's first m is absolute
+            if letter in "Hh":
+                args = (a*args[0] + dx,)
+            elif letter in "Vv":
+                args = (d*args[0] + dy,)
+            elif letter in "Aa":
+                rx, ry, rotation, large, sweep, x, y = args
+                if rx != ry and abs(a) != abs(d) and rotation % 90.0 != 0.0:  # a skewed ellipse
+                    return [(segment.letter, segment.args) for segment in path.transform(transform)]
+                if rotation % 180.0 != 0.0:  # on its side
+                    a, d = d, a
+                args = (rx*abs(a), ry*abs(d), rotation, large, (not sweep) if a*d < 0 else sweep, a*x + dx, d*y + dy)
+                a, d = transform.a, transform.d
+            else:
+                args = tuple([a*value + dx if i % 2 == 0 else d*value + dy for i, value in enumerate(args)])
+            baked.append((letter, args))
+        return baked
+        
+    def _path_d(self, path):
+        # (letter, args) as a d string, the numbers as the path_* functions format them
+        d = []
+        for letter, args in path:
+            if letter in "Aa":
+                d.append(letter + "%.3f,%.3f %.3f %i %i " % args[:5] + Inksnek._coord_format_str % args[5:])
+            elif letter in "HhVv":
+                d.append(letter + Inksnek._ord_format_str % args)
+            else:
+                d.append(letter + " ".join([Inksnek._coord_format_str % args[i:i + 2] for i in range(0, len(args), 2)]))
+        return "".join(d)
+        
+    _path_token_re = re.compile(r"([MmLlHhVvZzAaCcSsQqTt])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+    _path_arg_counts = {"M":2, "L":2, "H":1, "V":1, "Z":0, "A":7, "C":6, "S":4, "Q":4, "T":2}
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _minimised(path, precision):
+        # see minimise_path.  the numbers are rounded to integers of 10^-precision first, so the relative ones are exact
+        scale = 10**precision
+        commands, letter = [], None
+        for command, number in Inksnek._path_token_re.findall(path):
+            if command:
+                if not commands and command not in "Mm":  return path  # not a path this can make sense of
+                letter = command
+                commands.append([letter])
+            elif letter is None or len(commands[-1]) > Inksnek._path_arg_counts[letter.upper()]:  # an implicit repeat
+                if letter is None or letter in "Zz":  return path
+                letter = "l" if letter == "m" else "L" if letter == "M" else letter
+                commands.append([letter, float(number)])
+            else:
+                commands[-1].append(float(number))
+        # as absolute (letter, ints), dropping the draws that go nowhere & merging the lines that go on in the same direction
+        smooth = any(c[0] in "SsTt" for c in commands)  # a zero-length line or merge would change their reflected control point
+        segs, x, y, start_x, start_y = [], 0, 0, 0, 0
+        for c in commands:
+            letter, args = c[0], c[1:]
+            upper = letter.upper()
+            if len(args) != Inksnek._path_arg_counts[upper]:  return path
+            if upper == "Z":
+                segs.append(("Z", (), x, y))
+                x, y = start_x, start_y
+                continue
+            if upper == "A":
+                rx, ry, rotation, large, sweep, px, py = args
+                nums = [round(px*scale), round(py*scale)]
+            else:
+                nums = [round(value*scale) for value in args]
+                if upper == "H":  nums = [nums[0], 0 if letter == "h" else y]
+                elif upper == "V":  nums = [0 if letter == "v" else x, nums[0]]
+            if letter != upper and not (letter == "m" and not segs):
+                nums = [value + (x if i % 2 == 0 else y) for i, value in enumerate(nums)]
+            px, py = nums[-2:]
+            if upper == "M":
+                from_x, from_y = x, y
+                while segs and segs[-1][0] == "M":  # a move that is moved on from
+                    from_x, from_y = segs.pop()[2:]
+                segs.append(("M", nums, from_x, from_y))
+                x, y = start_x, start_y = px, py
+                continue
+            if upper in "HV":  upper = "L"
+            if upper == "A":
+                if (px, py) == (x, y):  # draws nothing
+                    continue
+                nums = [round(rx*scale), round(ry*scale), round(rotation*scale), int(large)*scale, int(sweep)*scale] + nums  # the flags come out as 0/1
+            elif upper == "L" and not smooth:
+                if (px, py) == (x, y):
+                    continue
+                prev = segs[-1] if segs else None
+                if prev and prev[0] == "L":
+                    dx0, dy0, dx1, dy1 = x - prev[2], y - prev[3], px - x, py - y
+                    if dx0*dy1 == dy0*dx1 and dx0*dx1 + dy0*dy1 > 0:  # on in the same direction
+                        segs[-1] = ("L", nums, prev[2], prev[3])
+                        x, y = px, py
+                        continue
+            segs.append((upper, nums, x, y))
+            x, y = px, py
+        while segs and segs[-1][0] == "M":
+            segs.pop()
+        # a line back to the start before a close is drawn by the close
+        for i in range(1, len(segs)):
+            if segs[i][0] == "Z" and segs[i - 1][0] == "L":
+                begin = next((seg for seg in reversed(segs[:i]) if seg is not None and seg[0] == "M"), None)
+                if begin is not None and segs[i - 1][1] == begin[1] and segs[i - 2][0] != "M":
+                    segs[i] = ("Z", (), segs[i - 1][2], segs[i - 1][3])
+                    segs[i - 1] = None
+        segs = [seg for seg in segs if seg is not None]
+        # written out, each the shorter of absolute & relative, each number as short as it can be
+        def number(value):
+            sign, value = "-" if value < 0 else "", abs(value)
+            whole, fraction = divmod(value, scale)
+            fraction = ("%0*i" % (precision, fraction)).rstrip("0") if fraction else ""
+            return sign + (str(whole) if whole or not fraction else "") + ("." + fraction if fraction else "")
+        def numbers(values):
+            text = ""
+            for value in values:
+                value = number(value)
+                text += value if not text or value[0] == "-" else "," + value
+            return text
+        d, last = [], None
+        for upper, nums, x, y in segs:
+            if upper == "Z":
+                d.append("z")
+                last = "z"
+                continue
+            if upper == "L" and nums[1] == y:
+                upper, nums, offsets = "H", nums[:1], (x,)
+            elif upper == "L" and nums[0] == x:
+                upper, nums, offsets = "V", nums[1:], (y,)
+            elif upper == "A":
+                offsets = (0, 0, 0, 0, 0, x, y)
+            else:
+                offsets = (x, y)*(len(nums)//2)
+            relative = [value - offset for value, offset in zip(nums, offsets)] if upper != "A" else nums[:5] + [nums[5] - x, nums[6] - y]
+            candidates = []
+            for letter, values in ((upper, nums), (upper.lower(), relative)):
+                text = numbers(values)
+                implicit = {"M":"L", "m":"l"}.get(last, last)
+                if letter == implicit and letter not in "Mm":
+                    text = (text if text[0] == "-" else "," + text)
+                else:
+                    text = letter + text
+                candidates.append((len(text), -(letter == upper), text, letter))
+            length, absolute, text, last = min(candidates)
+            d.append(text)
+        return "".join(d)
+        
+    # the passes finish() (or emit()) makes over the design's elements once they're made, in order: (the attribute which
+    # turns it on, if it's for FINAL mode only, the method, if it flattens the group, the attribute its result is kept in,
+    # what it does, for errors, and how debug() reports the result, formatted with it and self, or None for _report_<result>)
+    _passes = (
+        ("flattening",    False, "flatten",               True,  "flattened",    "flattening",                None),
+        ("hatching",      True,  "hatch_fills",           True,  "hatched",      "hatching the fills",        "hatched fills: {0} fills, {1} lines"),
+        ("compensating",  True,  "compensate_kerf",       True,  "compensated",  "compensating for the kerf", "compensated kerf {self.kerf:.3f}: {0} outlines out, {1} holes in"),
+        ("deduplicating", True,  "remove_duplicate_cuts", True,  "deduplicated", "removing duplicate cuts",   "removed duplicate cuts: {0} segments, {1:.1f} long"),
+        ("stitching",     True,  "stitch_paths",          True,  "stitched",     "stitching the paths",       "stitched paths: {0} pierces -> {1}"),
+        ("ordering",      True,  "order_cuts",            True,  "ordered",      "ordering the cuts",         "ordered cuts: travel {0:.1f} -> {1:.1f}"),
+        ("estimating",    True,  "estimate_job",          False, "estimate",     "estimating the job",        None),
+    )
+    
+    def _active_passes(self):
+        # the _passes which are on, in this mode
+        return [step for step in Inksnek._passes if getattr(self, step[0]) and (not step[1] or self.mode == Inksnek.FINAL)]
+        
+    def _working_on_elements(self):
+        # if finish() works on the design's elements after they're made (flatten, order_cuts etc), so they have to be made
+        return bool(self._active_passes())
+        
+    def _run_passes(self):
+        # make the _passes which are on over the design's elements, flattening it once for them all, keep their results
+        # and report them
+        try:
+            for flag, final, method, flattens, result, does, report in self._active_passes():
+                value = getattr(self, method)()
+                setattr(self, result, value)
+                if report is None:
+                    getattr(self, "_report_" + result)(value)
+                else:
+                    self.debug(report.format(*value, self=self))
+                if flattens:
+                    self._flat = self.top_group
+        finally:
+            self._flat = None
+        
+    def _report_flattened(self, flattened):
+        nodes, saved = flattened
+        if saved < 0:
+            self.debug("flattened: %i nodes, %i bytes longer, the coordinates being the document's" % (nodes, -saved))
+        else:
+            self.debug("flattened: %i nodes, %i bytes saved" % flattened)
+        
+    def _report_estimate(self, estimate):
+        for step in estimate["passes"]:
+            self.debug("%s: %.0f mm, %i pierces, %.0f mm travel, %.0f mm2, %.1f s" % tuple(step[key] for key in ("pass", "length", "pierces", "travel", "area", "seconds")))
+        self.debug("job: %.1f minutes" % (estimate["seconds"]/60.0))
+        
+    def _cut_items(self, group, transform):
+        # the _cut_item for each element in the group, in order
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                yield from self._cut_items(child, transform @ child.transform)
+            elif isinstance(child.tag, str):  # not a comment
+                yield self._cut_item(child, transform)
+        
+    def _cut_item(self, elem, transform):
+        # (elem, pass, kind, points, box, outline) for order_cuts, in document coordinates.  pass is 0 for an etch, 1 for a cut.
+        # kind is "closed", when points are its nodes, any of which it can start & end at, "open", when points are its ends,
+        # it can be drawn either way, or "fixed", from the first point to the last.  box is (min x, min y, max x, max y) and
+        # outline, for a closed path or a circle, is the polygon (or the centre & radius) something inside it is inside
+        if "transform" in elem.attrib:  # rarely, once flattened
+            transform = transform @ elem.transform
+        style = self.intern_style(elem.attrib.get("style", ""))  # the string, inkex would parse it
+        cut = 1 if style.is_cut else 0
+        a, b, c, d, e, f = transform.to_hexad()
+        def document(points):
+            points = np.asarray(points, dtype=float).reshape(-1, 2)
+            return np.column_stack((a*points[:, 0] + c*points[:, 1] + e, b*points[:, 0] + d*points[:, 1] + f))
+        if isinstance(elem, Circle):  # the attributes, inkex's center makes a path
+            x, y, radius = float(elem.attrib.get("cx", 0)), float(elem.attrib.get("cy", 0)), float(elem.attrib.get("r", 0))
+            center, point = document([(x, y), (x + radius, y)])  # a circle is drawn from its right
+            radius *= hypot(a, b)
+            point = point[None]
+            return elem, cut, "fixed", point, np.concatenate((center - radius, center + radius)), (center, radius)
+        if isinstance(elem, PathElement):
+            segments = Inksnek._drawn(elem.path)
+            ends = document([tuple(point) for point in segments.end_points])
+            if len(ends) == 0:
+                return elem, cut, "fixed", document([(0, 0)]), np.zeros(4), None
+            box = np.concatenate((ends.min(axis=0), ends.max(axis=0)))
+            letters = "".join(segment.letter for segment in segments)
+            if letters.count("M") == 1 and not any(letter in letters for letter in "ST"):
+                close = letters.endswith("Z")
+                nodes = ends[:-1] if close else ends  # the close's end is the start
+                if close or (len(nodes) > 2 and np.allclose(nodes[0], nodes[-1])):
+                    if len(nodes) > 1 and np.allclose(nodes[0], nodes[-1]):
+                        nodes = nodes[:-1]  # a draw back to the start
+                    outline = document([tuple(node[1]) for subpath in segments.to_superpath() for node in subpath])  # curves as their nodes
+                    return elem, cut, "closed", nodes, box, outline
+                return elem, cut, "open", ends[[0, -1]], box, None
+            outline = None
+            if np.allclose(ends[0], ends[-1]):  # an outline in pieces, as a box's side is
+                outline = document([tuple(node[1]) for subpath in segments.to_superpath() for node in subpath])
+            return elem, cut, "fixed", ends[[0, -1]], box, outline
+        point = document([(float(elem.get("x", 0)), float(elem.get("y", 0)))])  # text, a <use> ...
+        return elem, cut, "fixed", point, np.concatenate((point[0], point[0])), None
+        
+    def _travel(self, group):
+        # how far the laser head moves, not cutting, from the top left corner through the group's elements in order
+        head, travel = np.zeros(2), 0.0
+        for elem, cut, kind, points, box, outline in self._cut_items(group, group.composed_transform()):
+            travel += hypot(*(points[0] - head))
+            head = points[0] if kind == "closed" else points[-1]
+        return travel
+        
+    def _order_group(self, group, head):
+        # order the group's elements, then its (labelled) groups', see order_cuts.  Returns where the head ends up, and the travel
+        transform = group.composed_transform()
+        elems, groups = [], []
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                groups.append(child)
+            elif isinstance(child.tag, str):
+                elems.append(child)
+        items = [self._cut_item(elem, transform) for elem in elems]
+        ordered, travel = [], 0.0
+        for cut in (0, 1):
+            passed = [item for item in items if item[1] == cut]
+            if passed:
+                order, head, distance = self._order_items(passed, head)
+                ordered += order
+                travel += distance
+        comments = [child for child in group if not isinstance(child.tag, str)]
+        group[:] = ordered + groups + comments  # not inkex's methods, which keep the id cache, per element
+        for child in groups:
+            head, distance = self._order_group(child, head)
+            travel += distance
+        return head, travel
+        
+    def _order_items(self, items, head):
+        # the items' elements in the order the head can get through them quickest, near enough, starting at head (see order_cuts),
+        # changed to start at the node chosen (or drawn backwards).  Returns them, where the head ends up and the travel
+        count = len(items)
+        inside = self._insides(items)  # the items each is inside, which it goes before
+        # each way into each item: its entry point, where it leaves, and which node (or backwards, for open paths)
+        entries, exits, owners, ways = [], [], [], []
+        for index, (elem, cut, kind, points, box, outline) in enumerate(items):
+            if kind == "closed":
+                entries.append(points), exits.append(points), ways.extend(range(len(points)))
+            elif kind == "open":
+                entries.append(points), exits.append(points[::-1]), ways.extend((0, -1))
+            else:
+                entries.append(points[:1]), exits.append(points[-1:]), ways.append(0)
+            owners.extend([index]*len(entries[-1]))
+        entries, exits, owners = np.concatenate(entries), np.concatenate(exits), np.asarray(owners)
+        # nearest first, of those with nothing left inside them
+        waiting = np.zeros(count, dtype=int)
+        for outers in inside:
+            waiting[outers] += 1
+        done = np.zeros(count, dtype=bool)
+        sequence, start = [], head
+        for _ in range(count):
+            distances = np.hypot(*(entries - head).T)
+            distances[done[owners] | (waiting[owners] > 0)] = np.inf
+            way = int(np.argmin(distances))
+            index = owners[way]
+            sequence.append([index, entries[way], exits[way], ways[way]])
+            done[index] = True
+            waiting[inside[index]] -= 1
+            head = exits[way]
+        sequence = self._two_opt(sequence, start, items, inside)
+        # unless they were in a better order already (anything inside before what it's inside), each started as it is
+        firsts = np.searchsorted(owners, np.arange(count))
+        given = [[index, entries[way], exits[way], 0] for index, way in enumerate(firsts.tolist())]
+        if all((outers > index).all() for index, outers in enumerate(inside)) and self._sequence_travel(given, start) < self._sequence_travel(sequence, start):
+            sequence = given
+        # then as ordered, started/drawn as chosen
+        order, travel = [], 0.0
+        for index, entry, exit, way in sequence:
+            travel += hypot(*(entry - start))
+            start = exit
+            elem, cut, kind, points, box, outline = items[index]
+            if kind == "closed" and way != 0:
+                self._start_path_at(elem, way)
+            elif kind == "open" and way != 0:
+                self._set_d(elem, [(segment.letter, segment.args) for segment in Inksnek._drawn(elem.path).reverse()])
+            order.append(elem)
+        return order, start, travel
+        
+    @staticmethod
+    def _sequence_travel(sequence, start):
+        # how far the head moves, from start, through the sequence of [index, entry, exit, way]
+        entries, exits = np.array([step[1] for step in sequence]), np.array([step[2] for step in sequence])
+        return float(np.hypot(*(entries - np.vstack(([start], exits[:-1]))).T).sum())
+        
+    def _insides(self, items):
+        # for each item, the indexes of the closed items (or circles) it is inside: its box is within theirs, and its first point inside their outline
+        boxes = np.array([item[4] for item in items])
+        inside = []
+        for index, item in enumerate(items):
+            box, point = item[4], item[3][0]
+            candidates = np.nonzero((boxes[:, 0] < box[0]) & (boxes[:, 1] < box[1]) & (boxes[:, 2] > box[2]) & (boxes[:, 3] > box[3]))[0]
+            outers = []
+            for candidate in candidates.tolist():
+                outline = items[candidate][5]
+                if outline is None:
+                    continue
+                if isinstance(outline, tuple):
+                    if hypot(*(point - outline[0])) < outline[1]:
+                        outers.append(candidate)
+                elif Inksnek._point_in_polygon(point, outline):
+                    outers.append(candidate)
+            inside.append(np.asarray(outers, dtype=int))
+        return inside
+        
+    @staticmethod
+    def _point_in_polygon(point, polygon):
+        # even-odd, by the crossings of a ray to the right of the point
+        x, y = point
+        x0, y0 = polygon[:, 0], polygon[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        crosses = (y0 > y) != (y1 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            at = x0 + (y - y0)*(x1 - x0)/(y1 - y0)
+        return bool(np.count_nonzero(crosses & (at > x)) % 2)
+        
+    def _two_opt(self, sequence, start, items, inside):
+        # improve the sequence of [index, entry, exit, way] by reversing runs of it, while that shortens the travel.
+        # Only runs of items which can be drawn backwards, and with nothing in them inside something else in them
+        count = len(sequence)
+        if count < 3:
+            return sequence
+        reversible = np.array([items[index][2] != "fixed" or np.allclose(entry, exit) for index, entry, exit, way in sequence])
+        entries = np.array([step[1] for step in sequence])
+        exits = np.array([step[2] for step in sequence])
+        for sweep in range(10):
+            improved = False
+            for i in range(count):
+                before = start if i == 0 else exits[i - 1]
+                # reversing i..j: before -> exit j ... entry i -> entry j+1, rather than before -> entry i ... exit j -> entry j+1
+                after = np.vstack((entries[i + 1:], [np.full(2, np.nan)]))
+                old = hypot(*(before - entries[i])) + np.nan_to_num(np.hypot(*(exits[i:] - after).T))
+                new = np.hypot(*(before - exits[i:]).T) + np.nan_to_num(np.hypot(*(entries[i] - after).T))
+                gain = old - new
+                gain[np.cumsum(~reversible[i:]) > 0] = 0
+                for j in np.argsort(-gain)[:8].tolist():
+                    if gain[j] <= 1e-9:
+                        break
+                    run = [step[0] for step in sequence[i:i + j + 1]]
+                    members = set(run)
+                    if any(outer in members for index in run for outer in inside[index].tolist()):
+                        continue
+                    sequence[i:i + j + 1] = [[index, exit, entry, -1 - way if items[index][2] == "open" else way] for index, entry, exit, way in reversed(sequence[i:i + j + 1])]
+                    reversible[i:i + j + 1] = reversible[i:i + j + 1][::-1].copy()
+                    entries[i:i + j + 1], exits[i:i + j + 1] = exits[i:i + j + 1][::-1].copy(), entries[i:i + j + 1][::-1].copy()
+                    improved = True
+                    break
+            if not improved:
+                break
+        return sequence
+        
+    def _start_path_at(self, elem, node):
+        # the closed path started (and ended) at its node'th node, see _cut_item
+        path = Inksnek._drawn(elem.path)
+        segments = [(segment.letter, segment.args) for segment in path]
+        ends = [tuple(point) for point in path.end_points]
+        close = segments[-1][0] == "Z"
+        draws, start = segments[1:-1] if close else segments[1:], ends[0]
+        if close:
+            ends.pop()
+        if close and not np.allclose(ends[-1], start):
+            draws.append(("L", start))  # the close draws a line, which now comes before the end
+            ends.append(start)
+        path = [("M", ends[node])] + draws[node:] + draws[:node]
+        self._set_d(elem, path + [("z", ())] if close else path)
+        
+    @staticmethod
+    def _drawn(path):
+        # the inkex.Path, absolute, without any moves at the end, which draw nothing
+        path = path.to_absolute()
+        while len(path) > 1 and path[-1].letter == "M":
+            path.pop()
+        return path
+        
+    def _set_d(self, elem, path):
+        d = self._path_d(path)
+        elem.set("d", self.minimise_path(d) if self.minimising else d)
+        
+    def _cut_elems(self, group):
+        # (parent, elem) for the cut paths & circles in the flattened group, in order
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                yield from self._cut_elems(child)
+            elif isinstance(child, (PathElement, Circle)) and "transform" not in child.attrib and self.intern_style(child.attrib.get("style", "")).is_cut:
+                yield group, child
+        
+    def _cut_segments(self, elem):
+        # the element's segments, for remove_duplicate_cuts: ("L", x0, y0, x1, y1), ("A", cx, cy, r, start angle, sweep angle)
+        # for circular arcs, otherwise the letter, the start and the args, an elliptical arc as "E"
+        if isinstance(elem, Circle):
+            x, y, radius = float(elem.attrib.get("cx", 0)), float(elem.attrib.get("cy", 0)), float(elem.attrib.get("r", 0))
+            return [("A", x, y, radius, 0.0, 2*pi)] if radius > 0 else []
+        segments, at, start = [], (0.0, 0.0), (0.0, 0.0)
+        commands = Inksnek._absolute_commands(elem.get("d", ""))
+        if commands is None:  # inkex makes sense of it
+            commands = [(segment.letter, tuple(segment.args)) for segment in elem.path.to_absolute().to_non_shorthand()]
+        for letter, args in commands:
+            if letter == "M":
+                at = start = args
+                continue
+            end = start if letter == "Z" else (args[0], at[1]) if letter == "H" else (at[0], args[0]) if letter == "V" else args[-2:]
+            if letter in "LHVZ":
+                if end != at:
+                    segments.append(("L",) + at + end)
+            elif letter == "A":
+                if end != at:
+                    rx, ry, rotation, large, sweep = args[:5]
+                    segments.append(Inksnek._arc_segment(at, rx, large, sweep, end) if rx == ry else ("E",) + at + args)
+            else:
+                segments.append((letter,) + at + args)
+            at = end
+        return segments
+        
+    @staticmethod
+    def _absolute_commands(d):
+        # the (letter, args) in a d string of absolute moves, lines & arcs (& closes), as flatten writes them, quicker than
+        # inkex.  None if it has anything else
+        commands, letter = [], None
+        for command, number in Inksnek._path_token_re.findall(d):
+            if command:
+                if command not in "MLHVAZ":
+                    return None
+                letter = command
+                commands.append((letter, []))
+            elif letter is None or letter == "Z":
+                return None
+            else:
+                if len(commands[-1][1]) == Inksnek._path_arg_counts[letter]:  # an implicit repeat
+                    letter = "L" if letter == "M" else letter
+                    commands.append((letter, []))
+                commands[-1][1].append(float(number))
+        if any(len(args) != Inksnek._path_arg_counts[letter] for letter, args in commands):
+            return None
+        return [(letter, tuple(args)) for letter, args in commands]
+        
+    @staticmethod
+    def _arc_segment(start, radius, large, sweep, end):
+        # the ("A", ...) segment for the circular arc, its centre found as SVG does (the radius scaled up if it's too small)
+        (x0, y0), (x1, y1) = start, end
+        dx, dy = (x0 - x1)/2.0, (y0 - y1)/2.0
+        chord = dx*dx + dy*dy
+        radius = max(abs(radius), sqrt(chord))
+        scale = sqrt(max(radius*radius - chord, 0.0)/chord)*(-1 if bool(large) == bool(sweep) else 1)
+        cx, cy = scale*dy + (x0 + x1)/2.0, -scale*dx + (y0 + y1)/2.0
+        angle = atan2(y0 - cy, x0 - cx)
+        delta = atan2(y1 - cy, x1 - cx) - angle
+        if sweep and delta < 0:
+            delta += 2*pi
+        elif not sweep and delta > 0:
+            delta -= 2*pi
+        return ("A", cx, cy, radius, angle, delta)
+        
+    @staticmethod
+    def _segment_ends(segment):
+        if segment[0] == "A":
+            cx, cy, radius, angle, delta = segment[1:]
+            return (cx + radius*cos(angle), cy + radius*sin(angle)), (cx + radius*cos(angle + delta), cy + radius*sin(angle + delta))
+        return segment[1:3], segment[-2:]
+        
+    @staticmethod
+    def _segment_length(segment):
+        kind = segment[0]
+        if kind == "A":
+            return segment[3]*abs(segment[5])
+        if kind in "CQ":  # near enough, along 16 steps
+            points = np.array(segment[1:]).reshape(-1, 2)
+            t = np.linspace(0.0, 1.0, 17)[:, None]
+            if kind == "Q":
+                curve = (1 - t)**2*points[0] + 2*(1 - t)*t*points[1] + t**2*points[2]
+            else:
+                curve = (1 - t)**3*points[0] + 3*(1 - t)**2*t*points[1] + 3*(1 - t)*t**2*points[2] + t**3*points[3]
+            return float(np.hypot(*np.diff(curve, axis=0).T).sum())
+        (x0, y0), (x1, y1) = Inksnek._segment_ends(segment)
+        return hypot(x1 - x0, y1 - y0)  # an elliptical arc's chord, they're rare
+        
+    _duplicate_angle = 1e-3  # the angle, in radians, lines are hashed by
+        
+    @staticmethod
+    def _undrawn(segment, drawn, tolerance):
+        # the pieces of the segment not drawn already, which are then drawn (see remove_duplicate_cuts), or None if none of it was
+        lines, circles, curves = drawn
+        kind = segment[0]
+        if kind == "L":
+            return Inksnek._undrawn_line(segment, lines, tolerance)
+        if kind == "A":
+            return Inksnek._undrawn_arc(segment, circles, tolerance)
+        key = tuple(round(value/tolerance) for value in segment[1:])  # as drawn, and backwards
+        if kind == "E":
+            backwards = key[7:9] + key[2:6] + (round((1 - segment[7])/tolerance),) + key[:2]
+        else:
+            backwards = sum(reversed([key[i:i + 2] for i in range(0, len(key), 2)]), ())
+        if (kind, key) in curves or (kind, backwards) in curves:
+            return []
+        curves.add((kind, key))
+        return None
+        
+    @staticmethod
+    def _undrawn_line(segment, lines, tolerance):
+        # see _undrawn.  Lines are hashed by their angle (0 to 180 degrees) & offset from the origin, each as drawn along it
+        x0, y0, x1, y1 = segment[1:]
+        length = hypot(x1 - x0, y1 - y0)
+        ux, uy = (x1 - x0)/length, (y1 - y0)/length
+        if ux < 0 or (ux == 0 and uy < 0):
+            ux, uy = -ux, -uy
+        angle, offset = atan2(uy, ux), ux*y0 - uy*x0
+        keys = [(round(angle/Inksnek._duplicate_angle), round(offset/tolerance))]
+        if abs(angle) > pi/2 - 2*Inksnek._duplicate_angle:  # near vertical, it may be hashed the other way up
+            keys.append((round((angle - copysign(pi, angle))/Inksnek._duplicate_angle), round(-offset/tolerance)))
+        line = None
+        for a, o in keys:
+            for key in ((a + i, o + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+                for candidate in lines.get(key, ()):
+                    cx, cy, cux, cuy = candidate[:4]
+                    if abs(cux*(y0 - cy) - cuy*(x0 - cx)) <= tolerance and abs(cux*(y1 - cy) - cuy*(x1 - cx)) <= tolerance:
+                        line = candidate
+                        break
+                if line is not None:  break
+            if line is not None:  break
+        if line is None:
+            line = [x0, y0, ux, uy, [], []]
+            lines.setdefault(keys[0], []).append(line)
+        cx, cy, cux, cuy, starts, ends = line
+        t0, t1 = cux*(x0 - cx) + cuy*(y0 - cy), cux*(x1 - cx) + cuy*(y1 - cy)
+        low, high = min(t0, t1), max(t0, t1)
+        gaps = Inksnek._draw_interval(starts, ends, low, high, tolerance)
+        if gaps == [(low, high)]:
+            return None
+        def point(t):
+            return (x0, y0) if t == t0 else (x1, y1) if t == t1 else (cx + t*cux, cy + t*cuy)
+        if t0 < t1:
+            return [("L",) + point(start) + point(end) for start, end in gaps]
+        return [("L",) + point(end) + point(start) for start, end in reversed(gaps)]
+        
+    @staticmethod
+    def _undrawn_arc(segment, circles, tolerance):
+        # see _undrawn.  Circles are hashed by their centre & radius, each as drawn around it, in angles from 0 to 2 pi
+        x, y, radius, angle, delta = segment[1:]
+        key = (round(x/tolerance), round(y/tolerance), round(radius/tolerance))
+        circle = None
+        for near in ((key[0] + i, key[1] + j, key[2] + k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)):
+            for candidate in circles.get(near, ()):
+                if hypot(candidate[0] - x, candidate[1] - y) <= tolerance and abs(candidate[2] - radius) <= tolerance:
+                    circle = candidate
+                    break
+            if circle is not None:  break
+        if circle is None:
+            circle = [x, y, radius, [], []]
+            circles.setdefault(key, []).append(circle)
+        starts, ends = circle[3:]
+        tolerance /= radius  # as an angle
+        low = (angle if delta > 0 else angle + delta) % (2*pi)
+        high = low + abs(delta)
+        parts = [(low, min(high, 2*pi))] + ([(0.0, high - 2*pi)] if high - 2*pi > tolerance else [])
+        gaps, drawn = [], False
+        for start, end in parts:
+            left = Inksnek._draw_interval(starts, ends, start, end, tolerance)
+            drawn = drawn or left != [(start, end)]
+            if gaps and left and left[0][0] == 0.0 and gaps[-1][1] == 2*pi:  # across 0
+                left[0] = (gaps.pop()[0], 2*pi + left[0][1])
+            gaps += left
+        if not drawn:
+            return None
+        if delta > 0:
+            return [("A", x, y, radius, start, end - start) for start, end in gaps]
+        return [("A", x, y, radius, end, start - end) for start, end in reversed(gaps)]
+        
+    @staticmethod
+    def _draw_interval(starts, ends, low, high, tolerance):
+        # the parts of low..high not in the intervals starts[i]..ends[i] (sorted, apart), longer than the tolerance, and
+        # reaching low (or high) if they're that close.  Then low..high is added to the intervals
+        i = bisect.bisect_right(starts, low) - 1
+        if i < 0 or ends[i] < low - tolerance:
+            i += 1
+        gaps, at, j = [], low, i
+        while j < len(starts) and starts[j] <= high + tolerance:
+            if starts[j] - at > tolerance:
+                gaps.append((at, starts[j]))
+            at = max(at, ends[j])
+            j += 1
+        if high - at > tolerance:
+            gaps.append((at, high))
+        if gaps and gaps[0][0] - low <= tolerance:
+            gaps[0] = (low, gaps[0][1])
+        if gaps and high - gaps[-1][1] <= tolerance:
+            gaps[-1] = (gaps[-1][0], high)
+        if j > i:
+            low, high = min(low, starts[i]), max(high, ends[j - 1])
+        starts[i:j], ends[i:j] = [low], [high]
+        return gaps
+        
+    @staticmethod
+    def _segments_path(segments, tolerance):
+        # the (letter, args) path through the segments, moving only where one doesn't start (near enough) where the last ended.
+        # If they end where they started, the path starts after the last move instead, so it's drawn round in one go.  Each
+        # contour which ends where it started is closed
+        def near(a, b):
+            return hypot(a[0] - b[0], a[1] - b[1]) <= tolerance
+        runs = []
+        for segment in segments:
+            start, end = Inksnek._segment_ends(segment)
+            if not runs or not near(start, runs[-1][-1][2]):
+                runs.append([])
+            runs[-1].append((segment, start, end))
+        if len(runs) > 1 and near(runs[-1][-1][2], runs[0][0][1]):
+            runs[0] = runs.pop() + runs[0]
+        path = []
+        for run in runs:
+            closed = near(run[-1][2], run[0][1])
+            path.append(("M", run[0][1]))
+            for segment, start, end in run:
+                kind = segment[0]
+                if kind == "L":
+                    path.append(("L", end))
+                elif kind == "A":
+                    x, y, radius, angle, delta = segment[1:]
+                    # in pieces of up to 3/8 of a turn: rounding the ends of one nearer a half circle moves its centre too far
+                    pieces = max(1, int(ceil(abs(delta)/(0.75*pi) - 1e-9)))
+                    for piece in range(1, pieces + 1):
+                        to = angle + delta*piece/pieces
+                        path.append(("A", (radius, radius, 0, 0, int(delta > 0), x + radius*cos(to), y + radius*sin(to))))
+                elif kind == "E":
+                    path.append(("A", segment[3:]))
+                else:
+                    path.append((kind, segment[3:]))
+            if closed:
+                path.append(("z", ()))
+        return path
+        
+    def _stitch_group(self, group):
+        # stitch_paths, for the paths of each style in the group, then in its (labelled) groups.  Returns the (before, after)
+        # pierces: each drawn subpath, each circle (or anything else) not ignored
+        paths, before, after = {}, 0, 0
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                pierces = self._stitch_group(child)
+                before, after = before + pierces[0], after + pierces[1]
+            elif isinstance(child.tag, str) and not self.intern_style(child.attrib.get("style", "")).is_ignore:
+                if isinstance(child, PathElement) and "transform" not in child.attrib:
+                    paths.setdefault(child.attrib.get("style", ""), []).append(child)
+                else:
+                    before, after = before + 1, after + 1
+        for elems in paths.values():
+            pierces = self._stitch(group, elems)
+            before, after = before + pierces[0], after + pierces[1]
+        return before, after
+        
+    def _stitch(self, group, elems):
+        # chain the open subpaths of the elements, see stitch_paths.  Each chain goes in the element of its first subpath,
+        # its closed subpaths stay where they are.  Returns the (before, after) subpaths
+        tolerance = self._length(self.stitch_tolerance, "mm")  # in document units
+        subpaths, nodes, owners, closed = [], [], [], []  # each subpath's [(letter, args)], its segments' ends, element index, if it's closed
+        for index, elem in enumerate(elems):
+            path = Inksnek._drawn(elem.path)
+            if len(path) < 2 or path[0].letter != "M":  # nothing drawn, or no move first (not from inksnek)
+                continue
+            for segment, point in zip(path, path.end_points):
+                if segment.letter == "M":
+                    if subpaths and len(subpaths[-1]) == 1:  # a move to a move
+                        subpaths.pop(), nodes.pop(), owners.pop(), closed.pop()
+                    subpaths.append([]), nodes.append([]), owners.append(index), closed.append(False)
+                subpaths[-1].append((segment.letter, segment.args))
+                nodes[-1].append(tuple(point))
+                closed[-1] = closed[-1] or segment.letter == "Z"
+        ends = [(points[0], points[-1]) for points in nodes]
+        cells = {}  # (x, y) in tolerances -> [(subpath, 0 for its start or 1 for its end)]
+        for index, (start, end) in enumerate(ends):
+            if not closed[index]:
+                for which, (x, y) in enumerate((start, end)):
+                    cells.setdefault((round(x/tolerance), round(y/tolerance)), []).append((index, which))
+        used = closed[:]
+        def joining(point):  # the first unused subpath with an end at the point, and which end
+            x, y = point
+            cx, cy = round(x/tolerance), round(y/tolerance)
+            found = None
+            for cell in ((cx + i, cy + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+                for index, which in cells.get(cell, ()):
+                    if not used[index] and (found is None or index < found[0]) and hypot(ends[index][which][0] - x, ends[index][which][1] - y) <= tolerance:
+                        found = (index, which)
+            return found
+        def reversed_subpath(index):
+            segments, points = subpaths[index], nodes[index]
+            if any(letter in "ST" for letter, args in segments):
+                return [(segment.letter, segment.args) for segment in inkex.Path(segments).to_non_shorthand().reverse()]
+            path = [("M", points[-1])]
+            for (letter, args), to in zip(segments[:0:-1], points[-2::-1]):
+                if letter == "A":
+                    path.append(("A", tuple(args[:4]) + (int(not args[4]),) + to))
+                elif letter == "C":
+                    path.append(("C", tuple(args[2:4]) + tuple(args[:2]) + to))
+                elif letter == "Q":
+                    path.append(("Q", tuple(args[:2]) + to))
+                else:
+                    path.append(("L", to))
+            return path
+        chains, changed = [], set()
+        for index in range(len(subpaths)):
+            if used[index]:
+                continue
+            used[index] = True
+            chain, head, tail = list(subpaths[index]), ends[index][0], ends[index][1]
+            members, back = [index], []  # back is what goes before the chain, last first
+            while True:  # on from the end
+                found = joining(tail)
+                if found is None:  break
+                other, which = found
+                used[other] = True
+                chain += (subpaths[other] if which == 0 else reversed_subpath(other))[1:]
+                tail = ends[other][1 - which]
+                members.append(other)
+            while True:  # back from the start
+                found = joining(head)
+                if found is None:  break
+                other, which = found
+                used[other] = True
+                back.append(subpaths[other] if which == 1 else reversed_subpath(other))
+                head = ends[other][1 - which]
+                members.append(other)
+            if back:
+                chain = back[-1] + [segment for subpath in back[-2::-1] + [chain] for segment in subpath[1:]]
+            if len(members) > 1:
+                changed.update(owners[member] for member in members)
+            chains.append((min(members), chain))
+        pierces = len(subpaths), len(chains) + sum(closed)
+        if not changed:
+            return pierces
+        content = [[] for _ in elems]
+        for index in range(len(subpaths)):  # the closed subpaths, in order
+            if closed[index] and owners[index] in changed:
+                content[owners[index]].append((index, subpaths[index]))
+        for first, chain in chains:
+            content[owners[first]].append((first, chain))
+        for index in sorted(changed):
+            if content[index]:
+                self._set_d(elems[index], [segment for first, subpath in sorted(content[index], key=lambda item: item[0]) for segment in subpath])
+            else:
+                group.remove(elems[index])
+        return pierces
+        
+    def _fill_elems(self, group):
+        # (parent, elem, style) for the filled paths & circles in the flattened group, in order
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                yield from self._fill_elems(child)
+            elif isinstance(child, (PathElement, Circle)) and "transform" not in child.attrib:
+                style = self.intern_style(child.attrib.get("style", ""))
+                if style.is_fill and not style.is_ignore:
+                    yield group, child, style
+        
+    _flatness = 0.01  # how far, in mm, a curve may be from the lines it's made into, the helpers taking it in document units
+        
+    @staticmethod
+    def _fill_rings(elem, flatness):
+        # the path's (or circle's) subpaths as closed polygons, each an array of its points, within flatness, for hatch_fills
+        if isinstance(elem, Circle):
+            x, y, radius = float(elem.attrib.get("cx", 0)), float(elem.attrib.get("cy", 0)), float(elem.attrib.get("r", 0))
+            if radius <= 0:
+                return []
+            steps = max(8, int(ceil(pi/acos(max(-1.0, 1 - flatness/radius)))))
+            angles = np.linspace(0.0, 2*pi, steps, endpoint=False)
+            return [np.column_stack((x + radius*np.cos(angles), y + radius*np.sin(angles)))]
+        rings = Inksnek._polyline_rings(elem.get("d", ""))
+        if rings is not None:
+            return rings
+        rings, points, at, start = [], [], None, None
+        path = elem.path.to_absolute()
+        for segment, point in zip(path.to_non_shorthand(), path.end_points):
+            letter, point = segment.letter, (point[0], point[1]) if segment.letter != "Z" else start
+            if letter == "M" or at is None:  # a path without a move first starts where that ends, as inkex has it
+                if len(points) > 2:
+                    rings.append(np.array(points))
+                at = start = point
+                points = [point]
+                continue
+            if letter == "A" and point == at:  # draws nothing
+                continue
+            if letter == "A" and segment.args[0] == segment.args[1]:  # circular, in steps as fine as a circle's
+                cx, cy, radius, angle, delta = Inksnek._arc_segment(at, segment.args[0], segment.args[3], segment.args[4], point)[1:]
+                steps = max(1, int(ceil(abs(delta)/2/acos(max(-1.0, 1 - flatness/radius)))))
+                angles = angle + delta*np.arange(1, steps + 1)/steps
+                points += list(zip((cx + radius*np.cos(angles)).tolist(), (cy + radius*np.sin(angles)).tolist()))
+            elif letter == "A":
+                points += Inksnek._ellipse_points(at, *segment.args[:5], point, flatness)[1:]
+            elif letter in "CQ":
+                points += Inksnek._curve_points(at + tuple(segment.args), flatness)[1:]
+            else:  # a line, or the close's
+                points.append(point)
+            at = point
+        if len(points) > 2:
+            rings.append(np.array(points))
+        return rings
+        
+    @staticmethod
+    def _polyline_rings(d):
+        # _fill_rings for a d string of only absolute moves & lines (& closes), as flatten writes them, quicker. None if it has more
+        rings, ring, letter, x = [], [], None, None
+        for command, number in Inksnek._path_token_re.findall(d):
+            if command:
+                if command not in "MLZz":
+                    return None
+                if command != "L":
+                    if len(ring) > 2:
+                        rings.append(np.array(ring))
+                    ring = ring[:1] if command != "M" else []  # after a close, it goes on from the start
+                letter = command
+            elif letter in "Zz":
+                return None
+            elif x is None:
+                x = float(number)
+            else:
+                ring.append((x, float(number)))
+                x = None
+        if len(ring) > 2:
+            rings.append(np.array(ring))
+        return rings
+        
+    @staticmethod
+    def _subpaths(segments):
+        # the _cut_segments in runs, each starting where the last ended
+        subpaths = []
+        for segment in segments:
+            start = Inksnek._segment_ends(segment)[0]
+            if not subpaths or hypot(start[0] - subpaths[-1][1][0], start[1] - subpaths[-1][1][1]) > 1e-9:
+                subpaths.append(([], None))
+            subpaths[-1] = (subpaths[-1][0] + [segment], Inksnek._segment_ends(segment)[1])
+        return [segments for segments, end in subpaths]
+        
+    @staticmethod
+    def _offsettable(segment, flatness):
+        # the _cut_segment as lines & circular arcs, which compensate_kerf can offset, curves as lines, to within flatness
+        if segment[0] in "LA":
+            return [segment]
+        at = tuple(segment[1:3])
+        polyline = Inksnek._ellipse_points(at, *segment[3:8], tuple(segment[8:]), flatness) if segment[0] == "E" else Inksnek._curve_points(at + segment[3:], flatness)
+        return [("L",) + a + b for a, b in zip(polyline, polyline[1:]) if a != b]
+        
+    @staticmethod
+    def _curve_points(control, flatness):
+        # points along the quadratic or cubic bezier (its flat control points, from its start), close enough to be within
+        # flatness of it as lines, by the bound on its control points' second differences
+        control = np.array(control, dtype=float).reshape(-1, 2)
+        bend = np.hypot(*np.diff(control, 2, axis=0).T).max()*(len(control) - 1)*(len(control) - 2)/8
+        t = np.linspace(0.0, 1.0, max(2, int(ceil(sqrt(bend/flatness)))) + 1)[:, None]
+        if len(control) == 3:
+            polyline = (1 - t)**2*control[0] + 2*(1 - t)*t*control[1] + t**2*control[2]
+        else:
+            polyline = (1 - t)**3*control[0] + 3*(1 - t)**2*t*control[1] + 3*(1 - t)*t**2*control[2] + t**3*control[3]
+        return list(map(tuple, polyline.tolist()))
+        
+    @staticmethod
+    def _ellipse_points(start, rx, ry, rotation, large, sweep, end, flatness):
+        # points along the elliptical arc, from start to end, within flatness of it, its centre found as SVG does (the radii
+        # scaled up if they're too small).  Not by inkex's curves, which miss the end when they are
+        (x0, y0), (x1, y1) = start, end
+        rx, ry = abs(rx), abs(ry)
+        if rx == 0 or ry == 0 or start == end:
+            return [start, end]
+        cosine, sine = cos(radians(rotation)), sin(radians(rotation))
+        dx, dy = (x0 - x1)/2.0, (y0 - y1)/2.0
+        px, py = cosine*dx + sine*dy, -sine*dx + cosine*dy
+        scale = (px/rx)**2 + (py/ry)**2
+        if scale > 1:
+            rx, ry = rx*sqrt(scale), ry*sqrt(scale)
+        factor = sqrt(max(rx*rx*ry*ry - rx*rx*py*py - ry*ry*px*px, 0.0)/(rx*rx*py*py + ry*ry*px*px))
+        factor *= -1 if bool(large) == bool(sweep) else 1
+        qx, qy = factor*rx*py/ry, -factor*ry*px/rx
+        cx, cy = cosine*qx - sine*qy + (x0 + x1)/2.0, sine*qx + cosine*qy + (y0 + y1)/2.0
+        angle = atan2((py - qy)/ry, (px - qx)/rx)
+        delta = atan2((-py - qy)/ry, (-px - qx)/rx) - angle
+        if sweep and delta < 0:
+            delta += 2*pi
+        elif not sweep and delta > 0:
+            delta -= 2*pi
+        steps = max(1, int(ceil(abs(delta)/2/acos(max(-1.0, 1 - flatness/max(rx, ry))))))
+        angles = angle + delta*np.arange(1, steps)/steps
+        x, y = rx*np.cos(angles), ry*np.sin(angles)
+        return [start] + list(zip((cx + cosine*x - sine*y).tolist(), (cy + sine*x + cosine*y).tolist())) + [end]
+        
+    @staticmethod
+    def _segment_points(segment):
+        # points along the line or arc, from its start, for a polygon of the contour it's in
+        if segment[0] == "L":
+            return [segment[1:3]]
+        cx, cy, radius, angle, delta = segment[1:]
+        return [(cx + radius*cos(angle + delta*step/4), cy + radius*sin(angle + delta*step/4)) for step in range(4)]
+        
+    @staticmethod
+    def _contour_area(segments):
+        # the area the closed lines & arcs enclose, > 0 if they go anti-clockwise (with y up, clockwise on the page)
+        area = 0.0
+        for segment in segments:
+            (x0, y0), (x1, y1) = Inksnek._segment_ends(segment)
+            if segment[0] == "A":
+                cx, cy, radius, angle, delta = segment[1:]
+                area += cx*(y1 - y0) - cy*(x1 - x0) + radius*radius*delta
+            else:
+                area += x0*y1 - x1*y0
+        return area/2
+        
+    @staticmethod
+    def _offset_contour(segments, distance):
+        # the closed contour of lines & arcs, offset by distance: out of what it encloses if > 0, in if < 0.  Each segment is
+        # moved along its normal (an arc's radius changes), then meets the next: where they cross, if they overlap, or by an arc
+        # round the corner, if they part.  A segment the offset turns back on itself is dropped, and its neighbours meet instead.
+        # None if it can't be done: too little is left, or it comes out the wrong size
+        area = Inksnek._contour_area(segments)
+        if abs(area) < 1e-12:
+            return None
+        offset = distance if area > 0 else -distance  # to the right of the way it goes
+        moved = []
+        for segment in segments:
+            if segment[0] == "L":
+                x0, y0, x1, y1 = segment[1:]
+                length = hypot(x1 - x0, y1 - y0)
+                dx, dy = offset*(y1 - y0)/length, -offset*(x1 - x0)/length
+                moved.append(("L", x0 + dx, y0 + dy, x1 + dx, y1 + dy))
+            else:
+                cx, cy, radius, angle, delta = segment[1:]
+                radius += offset if delta > 0 else -offset
+                moved.append(("A", cx, cy, radius, angle, delta) if radius > 1e-9 else None)
+        corners = [Inksnek._segment_ends(segment)[1] for segment in segments]  # the corner after each
+        keep = [index for index, segment in enumerate(moved) if segment is not None]
+        while keep:
+            if len(keep) == 1:
+                if moved[keep[0]][0] != "A" or abs(moved[keep[0]][5]) < 2*pi - 1e-9:
+                    return None
+                offsetted = [moved[keep[0]]]  # a circle
+                break
+            joins = [Inksnek._offset_join(moved[index], moved[after], corners[index], offset, after == (index + 1) % len(moved))
+                     for index, after in zip(keep, keep[1:] + keep[:1])]
+            trimmed, dropped = [], []
+            if None in joins:  # two that overlap without crossing, as the sides of a slot narrower than the offset, go
+                position = joins.index(None)
+                dropped += [keep[position], keep[(position + 1) % len(keep)]]
+            for position, index in enumerate(keep):
+                if dropped:
+                    break
+                segment = Inksnek._trimmed(moved[index], joins[position - 1][1], joins[position][0])
+                if segment is None:
+                    dropped.append(index)
+                trimmed.append(segment)
+            if not dropped:
+                offsetted = []
+                for segment, (end, start, corner) in zip(trimmed, joins):
+                    offsetted.append(segment)
+                    if corner is not None:
+                        offsetted.append(corner)
+                break
+            keep = [index for index in keep if index not in dropped]
+        else:
+            return None
+        after = Inksnek._contour_area(offsetted)
+        if after*area <= 0 or (abs(after) > abs(area)) != (distance > 0):
+            return None
+        if Inksnek._convex(segments):  # it can't have crossed itself
+            return offsetted
+        if Inksnek._clearance(offsetted, segments) < abs(distance)*(1 - 1e-6) - 1e-9:  # it's crossed itself, somewhere
+            return None
+        return offsetted
+        
+    @staticmethod
+    def _convex(segments):
+        # if the closed lines & arcs turn the same way all round
+        turns = set()
+        tangents = [Inksnek._segment_tangents(segment) for segment in segments]
+        for (start, end), (after, following) in zip(tangents, tangents[1:] + tangents[:1]):
+            turn = end[0]*after[1] - end[1]*after[0]
+            if abs(turn) > 1e-9:
+                turns.add(turn > 0)
+        for segment in segments:
+            if segment[0] == "A":
+                turns.add(segment[5] > 0)
+        return len(turns) <= 1
+        
+    @staticmethod
+    def _clearance(offsetted, segments):
+        # how near the offset lines & arcs come to those they're offset from, as the nearest of each's points to the others
+        # (starts, middles & every eighth of a turn of an arc), or 0 if their lines cross
+        def lines(segments):
+            return np.array([segment[1:] for segment in segments if segment[0] == "L"]).reshape(-1, 4)
+        ours, theirs = lines(offsetted), lines(segments)
+        if len(ours) and len(theirs):
+            a, b, c, d = ours[:, None, :2], ours[:, None, 2:], theirs[None, :, :2], theirs[None, :, 2:]
+            def side(p, q, r):
+                return np.sign((q[..., 0] - p[..., 0])*(r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1])*(r[..., 0] - p[..., 0]))
+            if ((side(a, b, c)*side(a, b, d) < 0) & (side(c, d, a)*side(c, d, b) < 0)).any():
+                return 0.0
+        return min(Inksnek._nearest(Inksnek._clearance_points(offsetted), segments),
+                   Inksnek._nearest(Inksnek._clearance_points(segments), offsetted))
+        
+    @staticmethod
+    def _clearance_points(segments):
+        # the lines' starts & middles, & points along the arcs, for _clearance
+        points = []
+        for segment in segments:
+            start, end = Inksnek._segment_ends(segment)
+            if segment[0] == "A":
+                cx, cy, radius, angle, delta = segment[1:]
+                steps = int(ceil(abs(delta)/(pi/4))) + 1
+                points += [(cx + radius*cos(angle + delta*step/steps), cy + radius*sin(angle + delta*step/steps)) for step in range(steps)]
+            else:
+                points += [start, ((start[0] + end[0])/2, (start[1] + end[1])/2)]
+        return np.array(points)
+        
+    @staticmethod
+    def _nearest(points, segments):
+        # the distance from the nearest of the points to the nearest of the lines & arcs
+        lines = np.array([segment[1:] for segment in segments if segment[0] == "L"]).reshape(-1, 4)
+        arcs = np.array([segment[1:] for segment in segments if segment[0] == "A"]).reshape(-1, 5)
+        nearest = np.inf
+        if len(lines):
+            start, along = lines[:, :2], lines[:, 2:] - lines[:, :2]
+            t = np.clip(np.einsum("pij,ij->pi", points[:, None] - start, along)/np.maximum((along*along).sum(axis=1), 1e-30), 0, 1)
+            nearest = np.hypot(*(points[:, None] - start - t[..., None]*along).transpose(2, 0, 1)).min()
+        if len(arcs):
+            centre, radius, angle, delta = arcs[:, :2], arcs[:, 2], arcs[:, 3], arcs[:, 4]
+            offset = points[:, None] - centre
+            within = (np.sign(delta)*(np.arctan2(offset[..., 1], offset[..., 0]) - angle)) % (2*pi) <= np.abs(delta) + 1e-9
+            ends = [centre + radius[:, None]*np.column_stack((np.cos(at), np.sin(at))) for at in (angle, angle + delta)]
+            distances = np.where(within, np.abs(np.hypot(offset[..., 0], offset[..., 1]) - radius),
+                                 np.minimum(*[np.hypot(*(points[:, None] - end).transpose(2, 0, 1)) for end in ends]))
+            nearest = min(nearest, distances.min())
+        return nearest
+        
+    @staticmethod
+    def _offset_join(segment, following, corner, offset, adjacent):
+        # (end, start, corner) where the offset segment ends and the one following it starts, and what joins them, if anything.
+        # None if they overlap but don't cross
+        end, start = Inksnek._segment_ends(segment)[1], Inksnek._segment_ends(following)[0]
+        if hypot(end[0] - start[0], end[1] - start[1]) < 1e-9:  # they still meet, eg a line & the arc it's a tangent to
+            return end, end, None
+        (ax, ay), (bx, by) = Inksnek._segment_tangents(segment)[1], Inksnek._segment_tangents(following)[0]
+        if offset*(ax*by - ay*bx) > 0:  # turning away from the offset side, they part
+            if not adjacent:
+                return end, start, ("L",) + end + start
+            angle = atan2(end[1] - corner[1], end[0] - corner[0])
+            delta = (atan2(start[1] - corner[1], start[0] - corner[0]) - angle) % (2*pi)
+            return end, start, ("A", corner[0], corner[1], abs(offset), angle, delta if offset > 0 else delta - 2*pi)
+        near = corner if adjacent else ((end[0] + start[0])/2, (end[1] + start[1])/2)
+        crossing = Inksnek._crossing(segment, following, near)
+        if crossing is None:
+            if ax*bx + ay*by > 1 - 1e-9:  # on in the same direction, with a gap or a step between
+                return end, start, ("L",) + end + start
+            return None
+        return crossing, crossing, None
+        
+    @staticmethod
+    def _segment_tangents(segment):
+        # the line's, or arc's, direction at its start & its end, unit vectors
+        if segment[0] == "L":
+            x0, y0, x1, y1 = segment[1:]
+            length = hypot(x1 - x0, y1 - y0)
+            return (((x1 - x0)/length, (y1 - y0)/length),)*2
+        cx, cy, radius, angle, delta = segment[1:]
+        way = 1 if delta > 0 else -1
+        return tuple((-way*sin(at), way*cos(at)) for at in (angle, angle + delta))
+        
+    @staticmethod
+    def _crossing(segment, other, near):
+        # where the segment's line (or circle) crosses the other's, the crossing nearest near, None if they don't
+        if segment[0] == "A" and other[0] == "L":
+            segment, other = other, segment
+        points = []
+        if segment[0] == "L" and other[0] == "L":
+            x0, y0, x1, y1 = segment[1:]
+            x2, y2, x3, y3 = other[1:]
+            dx, dy, ex, ey = x1 - x0, y1 - y0, x3 - x2, y3 - y2
+            denominator = dx*ey - dy*ex
+            if abs(denominator) > 1e-12*hypot(dx, dy)*hypot(ex, ey):
+                t = ((x2 - x0)*ey - (y2 - y0)*ex)/denominator
+                points.append((x0 + t*dx, y0 + t*dy))
+        elif segment[0] == "L":
+            x0, y0, x1, y1 = segment[1:]
+            cx, cy, radius = other[1:4]
+            dx, dy, fx, fy = x1 - x0, y1 - y0, x0 - cx, y0 - cy
+            a, b, c = dx*dx + dy*dy, 2*(fx*dx + fy*dy), fx*fx + fy*fy - radius*radius
+            discriminant = b*b - 4*a*c
+            if discriminant >= 0:
+                for t in ((-b - sqrt(discriminant))/(2*a), (-b + sqrt(discriminant))/(2*a)):
+                    points.append((x0 + t*dx, y0 + t*dy))
+        else:
+            (x0, y0, r0), (x1, y1, r1) = segment[1:4], other[1:4]
+            d = hypot(x1 - x0, y1 - y0)
+            if 1e-12 < d <= r0 + r1 and d >= abs(r0 - r1):
+                a = (r0*r0 - r1*r1 + d*d)/(2*d)
+                h = sqrt(max(r0*r0 - a*a, 0.0))
+                mx, my = x0 + a*(x1 - x0)/d, y0 + a*(y1 - y0)/d
+                points += [(mx - h*(y1 - y0)/d, my + h*(x1 - x0)/d), (mx + h*(y1 - y0)/d, my - h*(x1 - x0)/d)]
+        if not points:
+            return None
+        return min(points, key=lambda point: hypot(point[0] - near[0], point[1] - near[1]))
+        
+    @staticmethod
+    def _trimmed(segment, start, end):
+        # the offset line, or arc, from start to end, None if that turns it back on itself
+        if segment[0] == "L":
+            x0, y0, x1, y1 = segment[1:]
+            if (end[0] - start[0])*(x1 - x0) + (end[1] - start[1])*(y1 - y0) <= 1e-12:
+                return None
+            return ("L",) + tuple(start) + tuple(end)
+        cx, cy, radius, angle, delta = segment[1:]
+        angle = atan2(start[1] - cy, start[0] - cx)
+        sweep = (atan2(end[1] - cy, end[0] - cx) - angle) % (2*pi)
+        if delta < 0:
+            sweep = (2*pi - sweep) % (2*pi)
+        if sweep < 1e-12 or sweep > abs(delta) + (2*pi - abs(delta))/2:  # round past its start, it's turned back
+            return None
+        return ("A", cx, cy, radius, angle, sweep if delta > 0 else -sweep)
+        
+    _pass_order = ("light_fill", "medium_fill", "heavy_fill", "fill", "light_etch", "medium_etch", "heavy_etch", "etch", "cut")
+        
+    def _laser_elems(self, group, transform):
+        # (elem, its transform to document coordinates) for the paths & circles in the group the laser draws, in order
+        for child in group:
+            if child.tag == Inksnek._g_tag:
+                yield from self._laser_elems(child, transform @ child.transform if "transform" in child.attrib else transform)
+            elif isinstance(child, (PathElement, Circle)) and not self.intern_style(child.attrib.get("style", "")).is_ignore:
+                yield child, (transform @ child.transform if "transform" in child.attrib else transform)
+        
+    @staticmethod
+    def _measure(elem, transform, fill):
+        # (length, area, starts, ends) of the path or circle, in document units: the length drawn, the area enclosed (if fill),
+        # and where each part drawn starts & ends.  Circular arcs are measured exactly, other curves along 16 steps
+        a, b, c, d, e, f = transform.to_hexad()
+        scale = sqrt(abs(a*d - b*c))
+        similar = abs(a*a + b*b - scale*scale) < 1e-9 and abs(a*c + b*d) < 1e-9  # no skew or stretch
+        def document(x, y):
+            return a*x + c*y + e, b*x + d*y + f
+        if isinstance(elem, Circle):
+            x, y, radius = float(elem.attrib.get("cx", 0)), float(elem.attrib.get("cy", 0)), float(elem.attrib.get("r", 0))
+            if similar:
+                start = document(x + radius, y)
+                return 2*pi*radius*scale, pi*(radius*scale)**2 if fill else 0.0, [start], [start]
+            path = elem.path
+        else:
+            path = Inksnek._drawn(elem.path)
+        if not similar:
+            path, scale = path.transform(transform), 1.0
+            a, b, c, d, e, f = 1.0, 0.0, 0.0, 1.0, 0.0, 0.0
+        length, area, starts, ends = 0.0, 0.0, [], []
+        at = start = None
+        drawn = False
+        for segment, point in zip(path.to_non_shorthand(), path.end_points):
+            letter, point = segment.letter, (point[0], point[1]) if segment.letter != "Z" else start
+            if letter == "M" or at is None:  # a path without a move first starts where that ends, as inkex has it
+                if drawn:
+                    ends.append(at)
+                    area += at[0]*start[1] - start[0]*at[1]
+                at = start = point
+                drawn = False
+                continue
+            if not drawn:
+                starts.append(at)
+                drawn = True
+            if letter == "A" and point == at:  # draws nothing
+                continue
+            if letter == "A" and segment.args[0] == segment.args[1]:
+                arc = Inksnek._arc_segment(at, segment.args[0], segment.args[3], segment.args[4], point)
+                cx, cy, radius, angle, delta = arc[1:]
+                length += radius*abs(delta)
+                area += cx*(point[1] - at[1]) - cy*(point[0] - at[0]) + radius*radius*delta
+            elif letter in "ACQ":
+                curves = segment.to_curves(inkex.Vector2d(at), inkex.Vector2d(at)) if letter == "A" else [segment]
+                for curve in curves:
+                    points = np.array(at + tuple(curve.args)).reshape(-1, 2)
+                    t = np.linspace(0.0, 1.0, 17)[:, None]
+                    if len(points) == 3:
+                        polyline = (1 - t)**2*points[0] + 2*(1 - t)*t*points[1] + t**2*points[2]
+                    else:
+                        polyline = (1 - t)**3*points[0] + 3*(1 - t)**2*t*points[1] + 3*(1 - t)*t**2*points[2] + t**3*points[3]
+                    length += float(np.hypot(*np.diff(polyline, axis=0).T).sum())
+                    area += float(np.sum(polyline[:-1, 0]*polyline[1:, 1] - polyline[1:, 0]*polyline[:-1, 1]))
+                    at = tuple(points[-1])
+            else:  # a line, or the close's
+                length += hypot(point[0] - at[0], point[1] - at[1])
+                area += at[0]*point[1] - point[0]*at[1]
+            at = point
+        if drawn:
+            ends.append(at)
+            area += at[0]*start[1] - start[0]*at[1]
+        return length*scale, abs(area)/2*scale*scale if fill else 0.0, [document(*point) for point in starts], [document(*point) for point in ends]
+        
+    def _prune_groups(self, group):
+        # remove empty sub-groups, depth first. returns True if the group is now empty itself
+        for child in list(group.iterchildren(Inksnek._g_tag)):  # only the groups, not a proxy for every element
+            if self._prune_groups(child):
+                group.remove(child)
+        return len(group) == 0
+        
+    def _instancing(self):
+        # instancing, or if it's not set, the mode's default: not for the laser, in FINAL mode, which may not understand <use>s
+        return self.mode != Inksnek.FINAL if self.instancing is None else self.instancing
+        
+    def _add_instance(self, group, key, x, y, make):
+        # add make(x, y) to the group, unless it has been seen before (by key), in which case add a <use> of a prototype.
+        # the first is added as-is, the second moves a prototype, make(0, 0), into <defs>, and replaces the first with a <use> too,
+        # so the element returned for the first is then no longer in the document.  x & y are in document units
+        proto = self._instances.get(key)
+        if proto is None:
+            elem = group.add(make(x, y))
+            self._instances[key] = (elem, x, y)
+            return elem
+        if isinstance(proto, tuple):
+            first, first_x, first_y = proto
+            proto = self._add_prototype(make(*self._origin))
+            self._instances[key] = proto
+            parent = first.getparent()
+            if parent is not None:
+                parent.replace(first, self._use(proto, first_x, first_y))
+        return group.add(self._use(proto, x, y))
+        
+    def _add_prototype(self, elem):
+        svg = self._Effect.svg
+        defs = svg.defs
+        self._declare_xlink(svg)
+        elem_id = "inksnek%i" % len(defs)
+        while svg.getElementById(elem_id) is not None:
+            elem_id += "_"
+        elem.set("id", elem_id)
+        return defs.add(elem)
+        
+    def _declare_xlink(self, svg):
+        # declare xlink once, at the top, rather than on every <use>
+        self._declare_namespace(svg, "xlink", Inksnek._xlink_ns, "href")
+        
+    def _declare_namespace(self, svg, prefix, ns, attr):
+        if ns not in svg.nsmap.values():
+            defs = svg.defs
+            defs.set("{%s}%s" % (ns, attr), "")
+            inkex.etree.cleanup_namespaces(svg, top_nsmap={prefix:ns})
+            del defs.attrib["{%s}%s" % (ns, attr)]
+        
+    def _use(self, proto, x, y):
+        use = inkex.Use()
+        use.set("xlink:href", "#" + proto.get("id"))
+        use.set("x", Inksnek._ord_format_str % x)
+        use.set("y", Inksnek._ord_format_str % y)
+        return use
+        
+    def _expand_uses(self, group, protos):
+        for child in list(group):
+            if isinstance(child, inkex.Use) and child.get("xlink:href") in protos:
+                x, y = float(child.get("x")), float(child.get("y"))
+                copy = protos[child.get("xlink:href")].copy()
+                copy.set("id", None)
+                if isinstance(copy, Circle):
+                    copy.center = (copy.center.x + x, copy.center.y + y)
+                elif isinstance(copy, PathElement):
+                    copy.set("d", str(copy.path.translate(x, y)))
+                else:
+                    copy.transform = inkex.Transform(translate=(x, y)) @ copy.transform
+                    self._expand_uses(copy, protos)
+                group.replace(child, copy)
+            elif isinstance(child, Group):
+                self._expand_uses(child, protos)
+        
+     
+    @property
+    def units(self):
+        return self._units
+        
+    @units.setter
+    def units(self, units): # changing units picks up the (cached) factors for them
+        self._units = units
+        self._unit_factors = self._uu_factors(units)
+        
+    def _uu_factors(self, units):
+        # the (from, to) factors unittouu converts "user units" to inkscape internal with, value*from/to, looked up once per unit.
+        # Multiplied & divided in that order, the coordinates round as unittouu's do
+        factors = self._uu_scales.get(units)
+        if factors is None:
+            conversions = inkex.units.CONVERSIONS
+            factors = self._uu_scales[units] = (conversions.get(units, 0.0), conversions.get(self._Effect.svg.unit, conversions["px"]))
+        return factors
+        
+    def _uu_scale(self, units): # scale from "user units" to inkscape internal
+        scale_from, scale_to = self._uu_factors(units)
+        return scale_from/scale_to
+        
     def _length(self, d, units = None): # transform distance from "user units" to inkscape internal
-        if units is None:
-            units = self.units
-        uud = self._Effect.svg.unittouu(str(d) + units)
-        return uud
+        scale_from, scale_to = self._unit_factors if units is None else self._uu_factors(units)
+        return d*scale_from/scale_to
         
     def _x_coord(self, x): # transform x-coord from "user units" to inkscape internal
-        uux = self._length(x)
-        return uux
+        scale_from, scale_to = self._unit_factors
+        return x*scale_from/scale_to
         
     def _y_coord(self, y): # transform y-coord from "user units" to inkscape internal
-        uuy = -self._length(y)  # y increases DOWN
-        return uuy
+        scale_from, scale_to = self._unit_factors
+        return -(y*scale_from/scale_to)  # y increases DOWN
         
     def _xy_coord(self, x, y = None): # transform coords from "user units" to inkscape internal
+        scale_from, scale_to = self._unit_factors
         if y is None: # expect a tuple:
-            self._last_xy = (self._x_coord(x[0]), self._y_coord(x[1]))
+            self._last_xy = (x[0]*scale_from/scale_to, -(x[1]*scale_from/scale_to))
         else:
-            self._last_xy = (self._x_coord(x), self._y_coord(y))
+            self._last_xy = (x*scale_from/scale_to, -(y*scale_from/scale_to))
         return self._last_xy
         
     def _ignore(self, style):
         # Cutting service may not ignore N/A colours, so don't add things with that style if FINAL (or REAL)
-        return (self.mode == Inksnek.FINAL or self.mode == Inksnek.REAL or self.mode == Inksnek.PROTO) and style.find(Inksnek._ignore_colour) != -1
+        return self._omit_ignore and self.intern_style(style).is_ignore
         
     _cut_colour        = "#0000FF"
     _light_etch_colour  = "#FF00FF"
@@ -484,6 +2967,20 @@ class Inksnek:
     _light_fill_opacity  = "1"
     _medium_fill_opacity = "1"
     _heavy_fill_opacity  = "1"
+    _default_palette = {name:value for name, value in locals().items() if name.startswith("_") and name.endswith(("_colour", "_opacity"))}
+    
+    _xlink_ns = "http://www.w3.org/1999/xlink"
+    _svg_ns = "http://www.w3.org/2000/svg"
+    _inkscape_ns = "http://www.inkscape.org/namespaces/inkscape"
+    _g_tag = "{%s}g" % _svg_ns
+    _xml_attr_special = re.compile('[&<>"\t\n\r]').search
+    _xml_attr_escapes = str.maketrans({"&":"&amp;", "<":"&lt;", ">":"&gt;", '"':"&quot;", "\t":"&#9;", "\n":"&#10;", "\r":"&#13;"})
+    _xml_text_escapes = str.maketrans({"&":"&amp;", "<":"&lt;", ">":"&gt;", "\r":"&#13;"})
+    
+    _geometry_magic = b"INKSNEKG"  # see save_geometry
+    _geometry_setup = ("template_number", "template_width", "template_height", "template_margin", "material", "material_thickness", "units", "mode", "kerf")
+    _path_number_re = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+    _skeleton_code_re = re.compile(r"(\d\.?|r)")
     
     _ord_format_str     = "%.3f"    # 3dps
     _coord_format_str   = _ord_format_str+","+_ord_format_str
@@ -515,9 +3012,240 @@ class Inksnek:
                 
                 0x1BEC9000,0x4BE1B000,0x3CE1C000,0x1EB4E000,0x69B49000,0x3CFDB000,0x7DBC9800] # 0x7F-0x85=diamond, left-, right-, up-, down-arrows, degree, alt-5
     _strokes_last_char = '\x85'
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _glyph(strokes):
+        # decode the strokes for a character (see above) into the normalised moves & draws annotation_path emits, returns
+        # (scale_y, shift, ops, last).  scale_y is 1 or 0.5; shift is the drop: none, half or quarter height (0, 1, 2);
+        # ops are ("M"|"L", x, y) moves/draws to grid nodes, ("0",) the inserted move 0, ("C",) a move to the centre,
+        # ("D",) a move to the middle dot and ("B",) a box/dot; last is the (x, y) grid node visited last, None if the centre
+        scale_y, shift, ops = 1.0, 0, []
+        box, prev = False, None
+        if (strokes & 0x0F) <= 0x07:  # ends with a move, special values
+            if (strokes & 0x03) == 0x01:
+                scale_y = 0.5 # half vertical scale
+            elif (strokes & 0x03) == 0x02:
+                shift = 1 # drop half height
+            elif (strokes & 0x03) == 0x03:
+                shift = 2 # drop quarter height
+            if (strokes & 0x04) == 0x04: # middle dot
+                ops.append(("D",))
+                box = True
+            strokes &= 0xFFFFFFF0 # clear it
+        for cmd in range(8):
+            if box:
+                ops.append(("B",))
+                box = False
+            nibble = (strokes & 0xF0000000) >> 28
+            strokes <<= 4
+            node_idx = nibble & 0x07
+            last = ((0x21020210 >> node_idx*4) & 0x0F, (0x22211000 >> node_idx*4) & 0x0F)
+            if nibble & 0x08:  # high bit=draw
+                if cmd == 0:  ops.append(("0",))  # start with a draw: insert a move 0
+                ops.append(("L",) + last)
+                box = not prev is None and node_idx == (prev & 0x07)
+            else:
+                if prev == nibble and nibble == 0:  last = None # 0,0=centre
+                if strokes == 0:  break # ignore *trailing* 0's
+                ops.append(("M",) + last if last else ("C",))
+            prev = nibble
+        return scale_y, shift, tuple(ops), last
+    
+    def _shape_builder(self, x, y, scale_x, scale_y, shape):
+        # shape_to_path, as a PathBuilder
+        path = self.path_builder()
+        for node in shape:
+          if len(node) == 2:
+            path.line_to(x + node[0]*scale_x, y + node[1]*scale_y)
+          elif len(node) == 1:
+            path.move_to(x + node[0][0]*scale_x, y + node[0][1]*scale_y)
+          elif len(node) == 0:
+            path.close()
+        return path
                                   
                  
         
+class SceneGroup:
+    # the design as a tree of nodes, each add_* makes one.  When recording (see Inksnek.recording) they are kept, to emit()
+    # in any mode(s) later, when retained, until finish(), otherwise the element is made straight away.  Coordinates are in document units.
+    # Nodes are __slots__ classes, a big design has a lot of them
+    # a group with no transform is just its children, unless it's a <use>.
+    # instance is (key, x, y, style) for a group which can be a <use>, see add_perf_board (style is None if its children have several, see add_polar_array)
+    __slots__ = ("transform", "instance", "label", "children")
+    def __init__(self, transform, instance = None, label = None):
+        self.transform = transform
+        self.instance = instance
+        self.label = label
+        self.children = []
+        
+class ScenePath:
+    # instance is (the path made at the origin, x, y) for a shape, which can be a <use>
+    __slots__ = ("d", "style", "instance")
+    def __init__(self, d, style, instance = None):
+        self.d = d
+        self.style = style
+        self.instance = instance
+        
+class SceneCircle:
+    __slots__ = ("x", "y", "radius", "style")
+    def __init__(self, x, y, radius, style):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.style = style
+        
+class SceneText:
+    # tstyle is the font etc, the style is added to it
+    __slots__ = ("x", "y", "tstyle", "text", "style")
+    def __init__(self, x, y, tstyle, text, style):
+        self.x = x
+        self.y = y
+        self.tstyle = tstyle
+        self.text = text
+        self.style = style
+        
+class InksnekTransform(inkex.Transform):
+    # a group's transformation, as a matrix, see Inksnek.translate_group etc.  + composes them (as it did when they were
+    # strings), with each other or SVG transform strings, left to right
+    @classmethod
+    def identity(cls):  # quicker than InksnekTransform()
+        return cls(1 + 0j, 0j, 0j)
+        
+    @classmethod
+    def of(cls, transform):  # transform (an inkex.Transform) as an InksnekTransform
+        return cls(transform.arg1, transform.arg2, transform.arg3)
+        
+    def __add__(self, other):
+        return InksnekTransform.of(self @ other)
+        
+    def __radd__(self, other):
+        return InksnekTransform.of(inkex.Transform(other) @ self)
+        
+class InksnekStyle(str):
+    # a style string, as inkex writes it, with what inksnek needs to know about it worked out once. see Inksnek.intern_style
+    def __new__(cls, style, ignore_colour, cut_colour, role = None):
+        attrs = inkex.Style(style)
+        self = str.__new__(cls, str(attrs))
+        self.attrs = tuple(attrs.items())  # (name, value) pairs
+        self.role = role  # for the predefined styles: "cut", "light_etch", ... "heavy_fill", "ignore"
+        stroke, fill = attrs.get("stroke", "none"), attrs.get("fill", "none")
+        if role is None:
+            self.is_ignore = style.find(ignore_colour) != -1  # not for the laser
+            self.is_cut = stroke == cut_colour
+            self.is_fill = fill != "none"
+        else:  # the colours may be the same, eg all black when PRINTing
+            self.is_ignore = role == "ignore"
+            self.is_cut = role == "cut"
+            self.is_fill = role.endswith("_fill")
+        self.colour = stroke if stroke != "none" else fill  # the colour the laser sees
+        return self
+        
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError("InksnekStyle is immutable")
+        str.__setattr__(self, name, value)
+        
+class PathBuilder:
+    # Builds a path without string concatenation (which is quadratic for long paths).
+    # Has the same vocabulary as the Inksnek.path_* methods, each returns the builder so calls can be chained.
+    # Commands are recorded as keys into _templates plus a flat buffer of their (inkscape internal) numbers,
+    # the "d" string is formatted once, by d(). add_path accepts a PathBuilder directly.
+    # Strings (eg from the path_* methods) can be appended with +=
+    def __init__(self, inksnek):
+        self._inksnek = inksnek
+        self._cmds = []           # _templates keys, or literal (escaped) strings
+        self._args = array('d')
+        self._last_xy = (0, 0)
+
+    _templates = {
+        'M':"M"+Inksnek._coord_format_str, 'L':"L"+Inksnek._coord_format_str, 'm':"m"+Inksnek._coord_format_str, 'l':"l"+Inksnek._coord_format_str,
+        'H':"H"+Inksnek._ord_format_str,   'V':"V"+Inksnek._ord_format_str,   'h':"h"+Inksnek._ord_format_str,   'v':"v"+Inksnek._ord_format_str,
+        'a':"a %.3f %.3f 0 0 %i %.3f %.3f", # round_by: r r sweep x y
+        'A':"A %.3f %.3f 0 %i %i %.3f %.3f", # arc: r r large sweep x y
+        'z':"z"}
+
+    # x and y or a tuple with (x, y)
+    def move_to(self, x, y = None):  return self._append_xy('M', x, y)
+    def line_to(self, x, y = None):  return self._append_xy('L', x, y)
+    def move_by(self, x, y = None):  return self._append_xy('m', x, y)
+    def line_by(self, x, y = None):  return self._append_xy('l', x, y)
+    
+    def horz_to(self, h):            return self._append('H', (self._inksnek._x_coord(h),))
+    def vert_to(self, v):            return self._append('V', (self._inksnek._y_coord(v),))
+    def horz_by(self, h):            return self._append('h', (self._inksnek._x_coord(h),))
+    def vert_by(self, v):            return self._append('v', (self._inksnek._y_coord(v),))
+    
+    def round_by(self, x, y, R):     # see Inksnek.path_round_by
+      if R == 0.0:
+        return self
+      r = self._inksnek._length(abs(R))
+      return self._append('a', (r, r, R > 0) + self._inksnek._xy_coord(x, y))
+    
+    def arrow_to(self, x, y, length): # see Inksnek.path_arrow_to
+        ink = self._inksnek
+        prev = self._last_xy
+        self.line_to(x, y)
+        this = self._last_xy
+        angle = pi - atan2(this[1] - prev[1], this[0] - prev[0])
+        head_angle = atan2(1.0, 3.0)   # 3:1 ratio
+        self.line_by(ink.polar_to_rectangular(ink._length(length), ink.radians_to_degrees(angle + head_angle)))
+        self.move_to(x, y)
+        self.line_by(ink.polar_to_rectangular(ink._length(length), ink.radians_to_degrees(angle - head_angle)))
+        return self.move_to(x, y)
+    
+    def close(self):                 return self._append('z', ())
+    
+    def d(self): # the path as a string
+        templates = self._templates
+        return "".join([templates.get(cmd, cmd) for cmd in self._cmds]) % tuple(self._args)
+        
+    def __str__(self):
+        return self.d()
+        
+    def __len__(self): # number of commands
+        return len(self._cmds)
+        
+    def __iadd__(self, other): # append another builder or a path string
+        if isinstance(other, PathBuilder):
+            self._cmds += other._cmds
+            self._args += other._args
+            self._last_xy = other._last_xy
+        elif other:
+            self._cmds.append(other.replace("%", "%%"))
+            self._last_xy = self._inksnek._last_xy
+        return self
+        
+    def _append(self, cmd, args):
+        self._cmds.append(cmd)
+        self._args.extend(args)
+        return self
+        
+    def _append_xy(self, cmd, x, y):
+        self._last_xy = self._inksnek._xy_coord(x, y)
+        self._cmds.append(cmd)
+        self._args.extend(self._last_xy)
+        return self
+
+        
+_current_inksnek = ContextVar("inksnek")
+
+@contextmanager
+def new_inksnek():
+    # a new, independent, Inksnek which Inksnek.current() returns inside the with-block, in this thread (or asyncio task) only.
+    # to render designs concurrently, one per thread, each binding ink = inksnek.current(): with new_inksnek(): MyDesign().run(...)
+    instance = Inksnek()
+    token = _current_inksnek.set(instance)
+    try:
+        yield instance
+    finally:
+        _current_inksnek.reset(token)
+        
 # global instance  
 inksnek = Inksnek()
 
+if __name__ == '__main__':
+    # headless, without Inkscape, see inksnek_render.py.  For example: python -m inksnek render design.py --mode FINAL --out out.svg
+    import inksnek_render
+    sys.exit(inksnek_render.main())
+
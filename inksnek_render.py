@@ -0,0 +1,450 @@
+#! /usr/bin/env python
+'''
+Headless rendering of inksnek designs, without Inkscape
+
+    python -m inksnek render design.py --mode FINAL --out out.svg
+    python -m inksnek render design.py --compress 6 --geometry
+    python -m inksnek emit design.geom --mode REAL
+    python -m inksnek sweep samples/box.py --grid box_internal_width=100,110,120 --grid box_material_thickness=3,6 --out sweep
+
+A blank document (a4_template.svg, a3_template.svg or a custom size) is created, the design's effect() is run on it
+and the SVG is written.  Several designs can be rendered by one process, --out is then a directory.
+The design file is run as the extension hooks run it, its Effect class is MyDesign unless --design-class says otherwise.
+An .svgz file, or --compress, is gzipped.  --geometry also writes the design's nodes to design.geom (see
+Inksnek.save_geometry), which emit renders again, in any mode, without the design.
+--estimate writes the FINAL mode's estimated job time, lengths, pierces etc to design.job.json (see Inksnek.estimate_job).
+
+A sweep renders variants of a design, each a set of attribute overrides, in a pool of processes, into a directory
+with a manifest.json listing the variants, their files and any errors.  An overridden attribute keeps its value
+whatever the design sets it to, see with_overrides.
+
+'''
+
+import argparse
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+import inkex
+from inksnek import Inksnek, inksnek as _global_inksnek
+
+MODES = {"DEVEL":Inksnek.DEVEL, "FINAL":Inksnek.FINAL, "REAL":Inksnek.REAL, "PRINT":Inksnek.PRINT, "PROTO":Inksnek.PROTO}
+
+_home = os.path.dirname(os.path.abspath(sys.modules[Inksnek.__module__].__file__))
+_templates = {"A4":"a4_template.svg", "A3":"a3_template.svg"}
+_custom_template = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="%gmm" height="%gmm" viewBox="0 0 %g %g" version="1.1" id="svg1"
+   xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+   xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+   xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg">
+  <sodipodi:namedview id="namedview1" inkscape:document-units="mm" />
+  <defs id="defs1" />
+  <g inkscape:label="Layer 1" inkscape:groupmode="layer" id="layer1" />
+</svg>
+'''
+
+def parse_mode(mode):
+    # a design mode from its name ("FINAL") or number ("1")
+    if mode.isdigit() and int(mode) in MODES.values():
+        return int(mode)
+    try:
+        return MODES[mode.upper()]
+    except KeyError:
+        raise argparse.ArgumentTypeError("mode must be one of %s, not %r" % (", ".join(MODES), mode))
+
+def parse_modes(modes):
+    # a list of modes, "FINAL,REAL" or "ALL"
+    if modes.upper() == "ALL":
+        return list(MODES.values())
+    return [parse_mode(mode.strip()) for mode in modes.split(",")]
+
+@lru_cache(maxsize=None)
+def template_svg(template):
+    # the blank document, as bytes: "A4", "A3" or a custom "WIDTHxHEIGHT", in mm
+    name = template.upper()
+    if name in _templates:
+        with open(os.path.join(_home, _templates[name]), "rb") as f:
+            return f.read()
+    try:
+        width, height = (float(size) for size in name.split("X"))
+    except ValueError:
+        raise ValueError("template must be A4, A3 or WIDTHxHEIGHT (in mm), not %r" % template)
+    return (_custom_template % (width, height, width, height)).encode("utf-8")
+
+def load_design(path, class_name = "MyDesign"):
+    # run the design file, as the extension hooks do (but not its __main__), and return its Effect class
+    path = os.path.abspath(path)
+    design_dir = os.path.dirname(path)
+    if design_dir not in sys.path:
+        sys.path.insert(0, design_dir)  # for anything the design imports from alongside it
+    with open(path, "rb") as f:
+        code = compile(f.read(), path, "exec")
+    namespace = {"__name__":"inksnek_design", "__file__":path}
+    exec(code, namespace)
+    if class_name not in namespace:
+        raise ValueError("%s does not define %s" % (path, class_name))
+    return namespace[class_name]
+
+@contextmanager
+def compressed(out, compression = None):
+    # out, or a gzip stream writing to it: compression is the level, 0-9, by default 9 for an .svgz file and none otherwise.
+    # The gzip header has no time in it, so the same design gives the same bytes.  A file is removed if the design fails
+    if compression is None and isinstance(out, str) and out.lower().endswith(".svgz"):
+        compression = 9
+    if compression is None:
+        yield out
+        return
+    if isinstance(out, str):
+        try:
+            with open(out, "wb") as f, gzip.GzipFile(None, "wb", compression, f, 0) as stream:
+                yield stream
+        except BaseException:
+            os.remove(out)
+            raise
+    else:
+        with gzip.GzipFile(None, "wb", compression, out, 0) as stream:
+            yield stream
+
+_global_lock = threading.RLock()  # held while the global inksnek renders a design, see _fresh_inksnek
+
+@contextmanager
+def _fresh_inksnek():
+    # the Inksnek the design uses, Inksnek.current() (the global inksnek, unless in new_inksnek()), as new for each render.
+    # Renders on the global one take turns, as they'd clash otherwise: to render at once, in threads, each render must be
+    # in its own new_inksnek(), its design using inksnek.current()
+    instance = Inksnek.current()
+    if instance is not _global_inksnek:
+        instance.__init__()
+        yield instance
+        return
+    with _global_lock:
+        instance.__init__()
+        yield instance
+
+def render(design, out, mode = None, template = "A4", *, args = (), retained = False, streaming = False, flatten = False, minimise = False,
+           precision = None, compression = None, geometry = None, order = False, dedupe = False, stitch = False, estimate = None, hatch = False,
+           kerf = False):
+    # render the design, an inkex.Effect class, to out, a file name or binary stream, with a fresh Inksnek.current()
+    # mode, if not None, is used instead of the one the design passes to setup().  The rest are by name only:
+    # args are the design's own options, if any
+    # retained builds the design in one pass at the end, straight to out, see Inksnek.retained
+    # streaming writes it to out as it's added, see Inksnek.streaming
+    # flatten bakes the groups' transforms into the elements, see Inksnek.flatten
+    # minimise writes the paths as briefly as they can be, to precision decimal places if given, see Inksnek.minimise_path
+    # compression gzips out, see compressed.  geometry, a file name or binary stream, gets the design's nodes, see Inksnek.save_geometry
+    # order reorders the cuts, in FINAL mode, for less travel, see Inksnek.order_cuts
+    # dedupe removes what's cut twice, in FINAL mode, see Inksnek.remove_duplicate_cuts
+    # stitch joins up the paths which meet, in FINAL mode, for fewer pierces, see Inksnek.stitch_paths
+    # estimate, a file name or text stream, gets the job's time etc as JSON, in FINAL mode (null otherwise), see Inksnek.estimate_job
+    # hatch makes the fills lines, in FINAL mode, for a vector etch rather than a raster one, see Inksnek.hatch_fills
+    # kerf offsets the closed cuts by half the material's kerf, in FINAL mode, so the parts are the size drawn, see Inksnek.compensate_kerf
+    if geometry is not None and streaming:
+        raise ValueError("a streamed design isn't kept, it has no geometry to save")
+    effect = design()
+    effect.parse_arguments(list(args))
+    effect.options.input_file = io.BytesIO(template_svg(template))
+    with _fresh_inksnek() as inksnek, compressed(out, compression) as out:
+        effect.options.output = out
+        inksnek.mode_override = mode
+        inksnek.retained = retained
+        inksnek.streaming = streaming
+        inksnek.flattening = flatten
+        inksnek.ordering = order
+        inksnek.deduplicating = dedupe
+        inksnek.stitching = stitch
+        inksnek.hatching = hatch
+        inksnek.compensating = kerf
+        inksnek.estimating = estimate is not None
+        inksnek.minimising = minimise
+        inksnek.path_precision = precision
+        inksnek.recording = geometry is not None
+        if retained or streaming:
+            inksnek.output = out  # written by inksnek, finish() completes it
+        try:
+            effect.load_raw()
+            result = effect.effect()
+            if geometry is not None:  # recorded, then emitted in the mode it was set up in
+                inksnek.save_geometry(geometry)
+                inksnek.emit(inksnek.mode)
+            inksnek.finish()  # in case the design doesn't
+            if inksnek.output is None:
+                effect.save_raw(result)
+            _write_estimate(inksnek, estimate)
+        except BaseException:
+            inksnek.abandon()  # a streamed design's file, part written
+            raise
+        finally:
+            effect.clean_up()
+
+def render_modes(design, outs, template = "A4", *, args = (), flatten = False, minimise = False, precision = None, compression = None,
+                 geometry = None, order = False, dedupe = False, stitch = False, estimate = None, hatch = False, kerf = False):
+    # render the design in several modes, running it just once: outs is {mode:out}, see render & Inksnek.recording.
+    # The options are by name only, as for render
+    effect = design()
+    effect.parse_arguments(list(args))
+    with _fresh_inksnek() as inksnek:
+        inksnek.recording = True
+        inksnek.flattening = flatten
+        inksnek.ordering = order
+        inksnek.deduplicating = dedupe
+        inksnek.stitching = stitch
+        inksnek.hatching = hatch
+        inksnek.compensating = kerf
+        inksnek.estimating = estimate is not None
+        inksnek.minimising = minimise
+        inksnek.path_precision = precision
+        try:
+            effect.options.input_file = io.BytesIO(template_svg(template))
+            effect.load_raw()
+            result = effect.effect()
+            if geometry is not None:
+                inksnek.save_geometry(geometry)
+            _emit_modes(inksnek, effect, result, outs, template, compression)
+            _write_estimate(inksnek, estimate)
+        finally:
+            effect.clean_up()
+
+def render_geometry(source, outs, template = "A4", *, flatten = False, compression = None, order = False, dedupe = False,
+                    stitch = False, estimate = None, hatch = False, kerf = False):
+    # render the design Inksnek.save_geometry wrote to source (a file name or binary stream), without the design, in each
+    # mode: outs is {mode:out}, see render_modes.  The template should be the one it was rendered with.  The options are
+    # by name only, as for render
+    effect = _Document()
+    effect.parse_arguments([])
+    with _fresh_inksnek() as inksnek:
+        inksnek.flattening = flatten
+        inksnek.ordering = order
+        inksnek.deduplicating = dedupe
+        inksnek.stitching = stitch
+        inksnek.hatching = hatch
+        inksnek.compensating = kerf
+        inksnek.estimating = estimate is not None
+        try:
+            effect.options.input_file = io.BytesIO(template_svg(template))
+            effect.load_raw()
+            inksnek.load_geometry(effect, source)
+            _emit_modes(inksnek, effect, None, outs, template, compression)
+            _write_estimate(inksnek, estimate)
+        finally:
+            effect.clean_up()
+
+class _Document(inkex.EffectExtension):
+    # just the document, for render_geometry
+    def effect(self):
+        pass
+
+def _emit_modes(inksnek, effect, result, outs, template, compression):
+    for mode, out in outs.items():
+        with compressed(out, compression) as out:
+            effect.options.input_file = io.BytesIO(template_svg(template))  # a fresh document for each
+            effect.options.output = out
+            effect.load_raw()
+            inksnek._Effect = effect
+            inksnek.emit(inksnek.mode if mode is None else mode)  # None for the mode it was set up in
+            effect.save_raw(result)
+
+def _write_estimate(inksnek, estimate):
+    # the FINAL mode's Inksnek.estimate, as JSON, to estimate (a file name or text stream), if given
+    if estimate is None:
+        return
+    if isinstance(estimate, str):
+        with open(estimate, "w") as f:
+            json.dump(inksnek.estimate, f, indent=1)
+    else:
+        json.dump(inksnek.estimate, estimate, indent=1)
+
+def with_overrides(design, overrides):
+    # a subclass of the design class whose attributes named in overrides (a dict) have those values,
+    # before effect() sets them and after, whatever it sets them to
+    if not overrides:
+        return design
+    def __setattr__(self, name, value):
+        super(variant, self).__setattr__(name, overrides.get(name, value))
+    variant = type(design.__name__, (design,), dict(overrides, __setattr__=__setattr__))
+    return variant
+
+def grid(**values):
+    # every combination of the values, as a list of overrides, eg grid(width=[100, 110], thickness=[3, 6]) gives 4
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+@lru_cache(maxsize=None)
+def _cached_design(path, class_name):
+    return load_design(path, class_name)  # once per process
+
+def _render_variant(path, class_name, index, overrides, out, mode, template):
+    # render one variant, in a worker process. returns its manifest entry, with the error rather than raising it
+    entry = {"index":index, "overrides":overrides, "file":os.path.basename(out), "seconds":None, "error":None}
+    start = time.perf_counter()
+    try:
+        render(with_overrides(_cached_design(path, class_name), overrides), out, mode, template)
+    except Exception:
+        entry["error"] = traceback.format_exc()
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+def sweep(path, variants, out_dir, mode = None, template = "A4", workers = None, class_name = "MyDesign", progress = None):
+    # render the design file once for each variant (a dict of attribute overrides) into out_dir, using a pool of
+    # workers processes (one per CPU by default, 1 renders in this process). writes out_dir/manifest.json and returns it.
+    # progress, if given, is called with (done, total, entry) as each variant finishes
+    path = os.path.abspath(path)
+    os.makedirs(out_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+    jobs = [(path, class_name, index, dict(overrides), os.path.join(out_dir, "%s_%03i.svg" % (name, index)), mode, template)
+            for index, overrides in enumerate(variants)]
+    entries = []
+    if workers == 1:
+        for job in jobs:
+            entries.append(_render_variant(*job))
+            if progress:  progress(len(entries), len(jobs), entries[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(_render_variant, *job) for job in jobs]):
+                entries.append(future.result())
+                if progress:  progress(len(entries), len(jobs), entries[-1])
+    entries.sort(key=lambda entry: entry["index"])
+    manifest = {"design":path, "mode":mode, "template":template, "variants":entries,
+                "failed":sum(1 for entry in entries if entry["error"])}
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def _parse_value(text):
+    # numbers, true/false etc as JSON, anything else is a string
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def _parse_grid(text):
+    # "name=v1,v2,..." to (name, [values])
+    name, _, values = text.partition("=")
+    if not name or not values:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE,VALUE..., not %r" % text)
+    return name.strip(), [_parse_value(value.strip()) for value in values.split(",")]
+
+def _report(done, total, entry):
+    status = "FAILED" if entry["error"] else "%.0f ms" % (entry["seconds"]*1000.0)
+    sys.stderr.write("[%i/%i] %s %s %s\n" % (done, total, entry["file"], json.dumps(entry["overrides"]), status))
+    if entry["error"]:
+        sys.stderr.write(entry["error"])
+
+def _sweep_command(options):
+    variants = grid(**dict(options.grid)) if options.grid else []
+    if options.variants:
+        with open(options.variants) as f:
+            variants += json.load(f)
+    if not variants:
+        variants = [{}]
+    manifest = sweep(options.design, variants, options.out, options.mode, options.template, options.jobs, options.design_class,
+                     None if options.quiet else _report)
+    return 1 if manifest["failed"] else 0
+
+def _render_command(options):
+    several = len(options.designs) > 1
+    out_dir = options.out if several or (options.out and os.path.isdir(options.out)) else None
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    failures = 0
+    for path in options.designs:
+        name = os.path.splitext(os.path.basename(path))[0] + (".svg" if options.compress is None else ".svgz")
+        out = os.path.join(out_dir, name) if out_dir else (options.out or name)
+        geometry = os.path.splitext(out)[0] + ".geom" if options.geometry else None
+        estimate = os.path.splitext(out)[0] + ".job.json" if options.estimate else None
+        try:
+            design = load_design(path, options.design_class)
+            if options.mode is not None and len(options.mode) > 1:  # the design is run once, see render_modes
+                render_modes(design, _mode_outs(out, options.mode), options.template, args=options.args, flatten=options.flatten,
+                             minimise=options.minimise, precision=options.precision, compression=options.compress, geometry=geometry,
+                             order=options.order, dedupe=options.dedupe, stitch=options.stitch, estimate=estimate, hatch=options.hatch,
+                             kerf=options.kerf)
+            else:
+                render(design, out, options.mode and options.mode[0], options.template, args=options.args, retained=options.retained,
+                       streaming=options.streaming, flatten=options.flatten, minimise=options.minimise, precision=options.precision,
+                       compression=options.compress, geometry=geometry, order=options.order, dedupe=options.dedupe, stitch=options.stitch,
+                       estimate=estimate, hatch=options.hatch, kerf=options.kerf)
+        except Exception:
+            failures += 1
+            sys.stderr.write("%s: failed\n" % path)
+            traceback.print_exc()
+    return 1 if failures else 0
+
+def _mode_outs(out, modes):
+    # {mode:out} for several modes, out.svg becomes out_FINAL.svg etc
+    names = {value:name for name, value in MODES.items()}
+    root, ext = os.path.splitext(out)
+    return {mode:"%s_%s%s" % (root, names[mode], ext) for mode in modes}
+
+def _emit_command(options):
+    out = options.out or os.path.splitext(options.geometry)[0] + (".svg" if options.compress is None else ".svgz")
+    modes = options.mode or [None]
+    estimate = os.path.splitext(out)[0] + ".job.json" if options.estimate else None
+    render_geometry(options.geometry, _mode_outs(out, modes) if len(modes) > 1 else {modes[0]:out}, options.template, flatten=options.flatten,
+                    compression=options.compress, order=options.order, dedupe=options.dedupe, stitch=options.stitch, estimate=estimate,
+                    hatch=options.hatch, kerf=options.kerf)
+    return 0
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog="python -m inksnek", description="Render inksnek designs without Inkscape")
+    commands = parser.add_subparsers(dest="command", required=True)
+    render_parser = commands.add_parser("render", help="render design(s) to SVG")
+    render_parser.add_argument("designs", nargs="+", metavar="design.py")
+    render_parser.add_argument("--mode", type=parse_modes, help="DEVEL, FINAL, REAL, PRINT or PROTO, instead of the design's. "
+                               "Several (FINAL,REAL) or ALL are written to design_FINAL.svg etc")
+    render_parser.add_argument("--template", default="A4", help="A4 (the default), A3 or WIDTHxHEIGHT in mm")
+    render_parser.add_argument("--out", help="the SVG file (default design.svg), a directory if there are several designs")
+    render_parser.add_argument("--design-class", default="MyDesign", help="the design's inkex.Effect class (default MyDesign)")
+    render_parser.add_argument("--retained", action="store_true", help="build the elements in one pass at the end, quicker for big designs")
+    render_parser.add_argument("--streaming", action="store_true", help="write the design as it's added, for huge designs, see inksnek.group()")
+    render_parser.add_argument("--flatten", action="store_true", help="bake the groups' transforms into the elements, and remove the groups without a label")
+    render_parser.add_argument("--order", action="store_true", help="reorder the cuts in FINAL mode, so the laser head travels less")
+    render_parser.add_argument("--dedupe", action="store_true", help="remove what's cut twice in FINAL mode, as where parts share an edge")
+    render_parser.add_argument("--stitch", action="store_true", help="join up the paths which meet in FINAL mode, so there are fewer pierces")
+    render_parser.add_argument("--hatch", action="store_true", help="etch the fills as lines in FINAL mode, quicker than rastering them, see hatch_pitch")
+    render_parser.add_argument("--kerf", action="store_true", help="offset the closed cuts in FINAL mode, by half the kerf, outlines out & holes in, see material_kerf")
+    render_parser.add_argument("--estimate", action="store_true", help="estimate the job's time etc in FINAL mode, into design.job.json, see material_profiles")
+    render_parser.add_argument("--minimise", action="store_true", help="write the paths as briefly as they can be, see --precision")
+    render_parser.add_argument("--precision", type=int, metavar="PLACES", help="the decimal places --minimise keeps (default 3, 2 for card & wood)")
+    render_parser.add_argument("--compress", type=int, choices=range(10), metavar="LEVEL", help="gzip the SVG, at LEVEL 0-9, as design.svgz (.svgz files are gzipped anyway)")
+    render_parser.add_argument("--geometry", action="store_true", help="write the design's nodes to design.geom too, for emit")
+    render_parser.add_argument("--arg", dest="args", action="append", default=[], metavar="ARG", help="pass an option to the design, eg --arg=--size=3")
+    emit_parser = commands.add_parser("emit", help="render a design saved with render --geometry, without the design")
+    emit_parser.add_argument("geometry", metavar="design.geom")
+    emit_parser.add_argument("--mode", type=parse_modes, help="the mode(s), as for render, instead of the one it was rendered in")
+    emit_parser.add_argument("--template", default="A4", help="the template it was rendered with, A4 (the default), A3 or WIDTHxHEIGHT in mm")
+    emit_parser.add_argument("--out", help="the SVG file (default design.svg)")
+    emit_parser.add_argument("--flatten", action="store_true", help="bake the groups' transforms into the elements, and remove the groups without a label")
+    emit_parser.add_argument("--order", action="store_true", help="reorder the cuts in FINAL mode, so the laser head travels less")
+    emit_parser.add_argument("--dedupe", action="store_true", help="remove what's cut twice in FINAL mode, as where parts share an edge")
+    emit_parser.add_argument("--stitch", action="store_true", help="join up the paths which meet in FINAL mode, so there are fewer pierces")
+    emit_parser.add_argument("--hatch", action="store_true", help="etch the fills as lines in FINAL mode, quicker than rastering them, see hatch_pitch")
+    emit_parser.add_argument("--kerf", action="store_true", help="offset the closed cuts in FINAL mode, by half the kerf, outlines out & holes in, see material_kerf")
+    emit_parser.add_argument("--estimate", action="store_true", help="estimate the job's time etc in FINAL mode, into design.job.json, see material_profiles")
+    emit_parser.add_argument("--compress", type=int, choices=range(10), metavar="LEVEL", help="gzip the SVG, at LEVEL 0-9, as design.svgz")
+    sweep_parser = commands.add_parser("sweep", help="render variants of a design, in parallel")
+    sweep_parser.add_argument("design", metavar="design.py")
+    sweep_parser.add_argument("--grid", type=_parse_grid, action="append", metavar="NAME=VALUE,VALUE...", help="sweep an attribute, every combination is rendered")
+    sweep_parser.add_argument("--variants", metavar="variants.json", help="a JSON list of {name:value} overrides, as well as any --grid")
+    sweep_parser.add_argument("--mode", type=parse_mode, help="DEVEL, FINAL, REAL, PRINT or PROTO, instead of the design's")
+    sweep_parser.add_argument("--template", default="A4", help="A4 (the default), A3 or WIDTHxHEIGHT in mm")
+    sweep_parser.add_argument("--out", default="sweep", help="the directory for the SVGs and manifest.json (default sweep)")
+    sweep_parser.add_argument("--jobs", type=int, help="worker processes, one per CPU by default")
+    sweep_parser.add_argument("--design-class", default="MyDesign", help="the design's inkex.Effect class (default MyDesign)")
+    sweep_parser.add_argument("--quiet", action="store_true", help="no progress")
+    options = parser.parse_args(argv)
+    if options.command == "sweep":
+        return _sweep_command(options)
+    if options.command == "emit":
+        return _emit_command(options)
+    return _render_command(options)
+
+if __name__ == '__main__':
+    sys.exit(main())
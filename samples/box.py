@@ -64,9 +64,9 @@ class MyDesign(inkex.Effect):
 
     def add_access_annotation(self, group, X, Y, radius):
         # draw an arrow
-        path = inksnek.path_start()
-        path += inksnek.path_move_to(X+4.5*radius, Y-4.5*radius)
-        path += inksnek.path_arrow_to(X+1.5*radius, Y-1.5*radius, radius)
+        path = inksnek.path_builder()
+        path.move_to(X+4.5*radius, Y-4.5*radius)
+        path.arrow_to(X+1.5*radius, Y-1.5*radius, radius)
         inksnek.add_path(group, path, self.etch)
           
     
@@ -125,7 +125,7 @@ class MyDesign(inkex.Effect):
         box = inksnek.add_group(inksnek.top_group, inksnek.translate_group(at_x, at_y) + inksnek.rotate_group(rotation))
 
         #####################   top
-        top = inksnek.add_group(box, inksnek.translate_group(0, 0))
+        top = inksnek.add_group(box, inksnek.translate_group(0, 0), "top")
         if self.show_guides:
           inksnek.add_rect(top, self.box_material_thickness, self.box_material_thickness, self.box_internal_width, self.box_internal_depth, inksnek.ignore_style)
           inksnek.add_rect(top, 0, 0, self.box_external_width, self.box_external_depth, inksnek.ignore_style)
@@ -134,38 +134,38 @@ class MyDesign(inkex.Effect):
         
         tab_size = self.box_material_thickness*2
         # bottom
-        path  = inksnek.path_move_to(0, 0)
-        path += inksnek.path_line_to(tab_size, 0)
-        path += inksnek.path_line_to(tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, 0)
-        path += inksnek.path_line_to(self.box_external_width, 0)
+        path = inksnek.path_builder().move_to(0, 0)
+        path.line_to(tab_size, 0)
+        path.line_to(tab_size, self.box_material_thickness)
+        path.line_to(self.box_external_width - tab_size, self.box_material_thickness)
+        path.line_to(self.box_external_width - tab_size, 0)
+        path.line_to(self.box_external_width, 0)
        
         # right
-        path += inksnek.path_line_to(self.box_external_width, tab_size)
-        path += inksnek.path_line_to(self.box_external_width - self.box_material_thickness, tab_size)
-        path += inksnek.path_line_to(self.box_external_width - self.box_material_thickness, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_depth)
+        path.line_to(self.box_external_width, tab_size)
+        path.line_to(self.box_external_width - self.box_material_thickness, tab_size)
+        path.line_to(self.box_external_width - self.box_material_thickness, self.box_external_depth - tab_size)
+        path.line_to(self.box_external_width, self.box_external_depth - tab_size)
+        path.line_to(self.box_external_width, self.box_external_depth)
         
         #top
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_external_depth)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_external_depth - self.box_material_thickness)
-        path += inksnek.path_line_to(tab_size, self.box_external_depth - self.box_material_thickness)
-        path += inksnek.path_line_to(tab_size, self.box_external_depth)
-        path += inksnek.path_line_to(0, self.box_external_depth)
+        path.line_to(self.box_external_width - tab_size, self.box_external_depth)
+        path.line_to(self.box_external_width - tab_size, self.box_external_depth - self.box_material_thickness)
+        path.line_to(tab_size, self.box_external_depth - self.box_material_thickness)
+        path.line_to(tab_size, self.box_external_depth)
+        path.line_to(0, self.box_external_depth)
         
         # left
-        path += inksnek.path_line_to(0, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_material_thickness, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_material_thickness, tab_size)
-        path += inksnek.path_line_to(0, tab_size)
+        path.line_to(0, self.box_external_depth - tab_size)
+        path.line_to(self.box_material_thickness, self.box_external_depth - tab_size)
+        path.line_to(self.box_material_thickness, tab_size)
+        path.line_to(0, tab_size)
 
-        path += inksnek.path_close()
+        path.close()
         inksnek.add_path(top, path, inksnek.cut_style)
 
         #####################   front
-        front = inksnek.add_group(box, inksnek.translate_group(0, -self.box_external_height + self.box_material_thickness))
+        front = inksnek.add_group(box, inksnek.translate_group(0, -self.box_external_height + self.box_material_thickness), "front")
         if self.show_guides:
           inksnek.add_rect(front, self.box_material_thickness, self.box_material_thickness, self.box_internal_width, self.box_internal_height, inksnek.ignore_style)
           inksnek.add_rect(front, 0, 0, self.box_external_width, self.box_external_height, inksnek.ignore_style)
@@ -173,27 +173,27 @@ class MyDesign(inkex.Effect):
           inksnek.add_annotation(front, self.label_offset, self.label_offset, "F", self.label_size, inksnek.ignore_style)
         
         # bottom
-        path  = inksnek.path_move_to(0, self.box_material_thickness)
-        path += inksnek.path_line_to(tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(tab_size, 0)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, 0)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width, self.box_material_thickness)
+        path = inksnek.path_builder().move_to(0, self.box_material_thickness)
+        path.line_to(tab_size, self.box_material_thickness)
+        path.line_to(tab_size, 0)
+        path.line_to(self.box_external_width - tab_size, 0)
+        path.line_to(self.box_external_width - tab_size, self.box_material_thickness)
+        path.line_to(self.box_external_width, self.box_material_thickness)
 
         # right
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_height - self.box_material_thickness)
+        path.line_to(self.box_external_width, self.box_external_height - self.box_material_thickness)
 
         # top (inherited from cutting bottom of top face)
-        path += inksnek.path_move_to(0, self.box_external_height - self.box_material_thickness)
+        path.move_to(0, self.box_external_height - self.box_material_thickness)
 
         # left
-        path += inksnek.path_line_to(0, self.box_material_thickness)
+        path.line_to(0, self.box_material_thickness)
         
-        path += inksnek.path_close()
+        path.close()
         inksnek.add_path(front, path, inksnek.cut_style)
 
         #####################   back
-        back = inksnek.add_group(box, inksnek.translate_group(0, self.box_external_depth - self.box_material_thickness))
+        back = inksnek.add_group(box, inksnek.translate_group(0, self.box_external_depth - self.box_material_thickness), "back")
         if self.show_guides:
           inksnek.add_rect(back, self.box_material_thickness, self.box_material_thickness, self.box_internal_width, self.box_internal_height, inksnek.ignore_style)
           inksnek.add_rect(back, 0, 0, self.box_external_width, self.box_external_height, inksnek.ignore_style)
@@ -201,37 +201,37 @@ class MyDesign(inkex.Effect):
           inksnek.add_annotation(back, self.label_offset, self.label_offset, "B", self.label_size, inksnek.ignore_style)
 
         # left
-        path  = inksnek.path_move_to(0, self.box_material_thickness)
-        path += inksnek.path_vert_by((self.box_internal_height - tab_size)/2.0)
-        path += inksnek.path_horz_by(self.box_material_thickness);
-        path += inksnek.path_vert_by(tab_size);
-        path += inksnek.path_horz_by(-self.box_material_thickness);
-        path += inksnek.path_vert_by((self.box_internal_height - tab_size)/2.0)
-        path += inksnek.path_line_to(self.box_material_thickness, self.box_external_height - self.box_material_thickness)        
-        path += inksnek.path_line_to(tab_size, self.box_external_height - self.box_material_thickness)
+        path = inksnek.path_builder().move_to(0, self.box_material_thickness)
+        path.vert_by((self.box_internal_height - tab_size)/2.0)
+        path.horz_by(self.box_material_thickness);
+        path.vert_by(tab_size);
+        path.horz_by(-self.box_material_thickness);
+        path.vert_by((self.box_internal_height - tab_size)/2.0)
+        path.line_to(self.box_material_thickness, self.box_external_height - self.box_material_thickness)        
+        path.line_to(tab_size, self.box_external_height - self.box_material_thickness)
         
         # top
-        path += inksnek.path_line_to(tab_size, self.box_external_height)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_external_height)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_external_height - self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_height - self.box_material_thickness)
+        path.line_to(tab_size, self.box_external_height)
+        path.line_to(self.box_external_width - tab_size, self.box_external_height)
+        path.line_to(self.box_external_width - tab_size, self.box_external_height - self.box_material_thickness)
+        path.line_to(self.box_external_width, self.box_external_height - self.box_material_thickness)
         
         # right
-        path += inksnek.path_vert_by(-(self.box_internal_height - tab_size)/2.0)
-        path += inksnek.path_horz_by(-self.box_material_thickness);
-        path += inksnek.path_vert_by(-tab_size);
-        path += inksnek.path_horz_by(+self.box_material_thickness);
-        path += inksnek.path_vert_by(-(self.box_internal_height - tab_size)/2.0)
+        path.vert_by(-(self.box_internal_height - tab_size)/2.0)
+        path.horz_by(-self.box_material_thickness);
+        path.vert_by(-tab_size);
+        path.horz_by(+self.box_material_thickness);
+        path.vert_by(-(self.box_internal_height - tab_size)/2.0)
 
         # bottom (inherited)
-        path += inksnek.path_move_to(0, self.box_material_thickness)
+        path.move_to(0, self.box_material_thickness)
 
         inksnek.add_path(back, path, inksnek.cut_style)
 
         #####################  
         foot_size = 0
         #####################  left
-        left = inksnek.add_group(box, inksnek.translate_group(self.box_material_thickness - self.box_external_depth, self.box_external_depth - self.box_material_thickness))
+        left = inksnek.add_group(box, inksnek.translate_group(self.box_material_thickness - self.box_external_depth, self.box_external_depth - self.box_material_thickness), "left")
         if self.show_guides:
           inksnek.add_rect(left, self.box_material_thickness, self.box_material_thickness, self.box_internal_depth, self.box_internal_height, inksnek.ignore_style)
           inksnek.add_rect(left, 0, 0, self.box_external_depth, self.box_external_height, inksnek.ignore_style)
@@ -239,27 +239,27 @@ class MyDesign(inkex.Effect):
           inksnek.add_annotation(left, self.label_offset, self.label_offset, "L", self.label_size, inksnek.ignore_style)
         
         # bottom
-        path  = inksnek.path_move_to(self.box_external_depth - self.box_material_thickness, self.box_material_thickness)
-        path += inksnek.path_horz_by(-self.box_material_thickness)
-        path += inksnek.path_vert_by(-self.box_material_thickness)
-        path += inksnek.path_horz_by(-(self.box_external_depth - tab_size - self.box_material_thickness*2.0))
-        path += inksnek.path_vert_by(+self.box_material_thickness)
-        path += inksnek.path_horz_by(-self.box_material_thickness)
+        path = inksnek.path_builder().move_to(self.box_external_depth - self.box_material_thickness, self.box_material_thickness)
+        path.horz_by(-self.box_material_thickness)
+        path.vert_by(-self.box_material_thickness)
+        path.horz_by(-(self.box_external_depth - tab_size - self.box_material_thickness*2.0))
+        path.vert_by(+self.box_material_thickness)
+        path.horz_by(-self.box_material_thickness)
         
         # left
-        path += inksnek.path_vert_by(self.box_external_height - self.box_material_thickness*2.0)
+        path.vert_by(self.box_external_height - self.box_material_thickness*2.0)
 
         # top
-        path += inksnek.path_horz_by(+self.box_material_thickness)
-        path += inksnek.path_vert_by(self.box_material_thickness + foot_size);
-        path += inksnek.path_horz_by(self.box_external_depth - tab_size - self.box_material_thickness*2.0)
-        path += inksnek.path_vert_by(-self.box_material_thickness - foot_size);
-        path += inksnek.path_horz_by(+self.box_material_thickness)
+        path.horz_by(+self.box_material_thickness)
+        path.vert_by(self.box_material_thickness + foot_size);
+        path.horz_by(self.box_external_depth - tab_size - self.box_material_thickness*2.0)
+        path.vert_by(-self.box_material_thickness - foot_size);
+        path.horz_by(+self.box_material_thickness)
 
         inksnek.add_path(left, path, inksnek.cut_style)
 
         #####################   right
-        right = inksnek.add_group(box, inksnek.translate_group(self.box_external_width - self.box_material_thickness, self.box_external_depth - self.box_material_thickness))
+        right = inksnek.add_group(box, inksnek.translate_group(self.box_external_width - self.box_material_thickness, self.box_external_depth - self.box_material_thickness), "right")
         if self.show_guides:
           inksnek.add_rect(right, self.box_material_thickness, self.box_material_thickness, self.box_internal_depth, self.box_internal_height, inksnek.ignore_style)
           inksnek.add_rect(right, 0, 0, self.box_external_depth, self.box_external_height, inksnek.ignore_style)
@@ -267,27 +267,27 @@ class MyDesign(inkex.Effect):
           inksnek.add_annotation(right, self.label_offset, self.label_offset, "R", self.label_size, inksnek.ignore_style)
         
         # bottom
-        path  = inksnek.path_move_to(self.box_material_thickness, self.box_material_thickness)
-        path += inksnek.path_horz_by(self.box_material_thickness)
-        path += inksnek.path_vert_by(-self.box_material_thickness)
-        path += inksnek.path_horz_by(self.box_external_depth - tab_size - self.box_material_thickness*2.0)
-        path += inksnek.path_vert_by(self.box_material_thickness)
-        path += inksnek.path_horz_by(self.box_material_thickness)
+        path = inksnek.path_builder().move_to(self.box_material_thickness, self.box_material_thickness)
+        path.horz_by(self.box_material_thickness)
+        path.vert_by(-self.box_material_thickness)
+        path.horz_by(self.box_external_depth - tab_size - self.box_material_thickness*2.0)
+        path.vert_by(self.box_material_thickness)
+        path.horz_by(self.box_material_thickness)
         
         # right
-        path += inksnek.path_vert_by(self.box_external_height - self.box_material_thickness*2.0)
+        path.vert_by(self.box_external_height - self.box_material_thickness*2.0)
 
         # top
-        path += inksnek.path_horz_by(-self.box_material_thickness)
-        path += inksnek.path_vert_by(self.box_material_thickness + foot_size);
-        path += inksnek.path_horz_by(-(self.box_external_depth - tab_size - self.box_material_thickness*2.0))
-        path += inksnek.path_vert_by(-self.box_material_thickness - foot_size);
-        path += inksnek.path_horz_by(-self.box_material_thickness)
+        path.horz_by(-self.box_material_thickness)
+        path.vert_by(self.box_material_thickness + foot_size);
+        path.horz_by(-(self.box_external_depth - tab_size - self.box_material_thickness*2.0))
+        path.vert_by(-self.box_material_thickness - foot_size);
+        path.horz_by(-self.box_material_thickness)
 
         inksnek.add_path(right, path, inksnek.cut_style)
 
         #####################        
-        bottom = inksnek.add_group(box, inksnek.translate_group(0, - self.box_external_depth + self.box_material_thickness + -self.box_external_height + self.box_material_thickness))
+        bottom = inksnek.add_group(box, inksnek.translate_group(0, - self.box_external_depth + self.box_material_thickness + -self.box_external_height + self.box_material_thickness), "bottom")
         if self.show_guides:
           inksnek.add_rect(bottom, self.box_material_thickness, self.box_material_thickness, self.box_internal_width, self.box_internal_depth, inksnek.ignore_style)
           inksnek.add_rect(bottom, 0, 0, self.box_external_width, self.box_external_depth, inksnek.ignore_style)
@@ -295,29 +295,29 @@ class MyDesign(inkex.Effect):
           inksnek.add_annotation(bottom, self.label_offset, self.label_offset, "U", self.label_size, inksnek.ignore_style)
 
         # bottom
-        path  = inksnek.path_move_to(0, 0)
-        path += inksnek.path_line_to(tab_size, 0)
-        path += inksnek.path_line_to(tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, self.box_material_thickness)
-        path += inksnek.path_line_to(self.box_external_width - tab_size, 0)
-        path += inksnek.path_line_to(self.box_external_width, 0)
+        path = inksnek.path_builder().move_to(0, 0)
+        path.line_to(tab_size, 0)
+        path.line_to(tab_size, self.box_material_thickness)
+        path.line_to(self.box_external_width - tab_size, self.box_material_thickness)
+        path.line_to(self.box_external_width - tab_size, 0)
+        path.line_to(self.box_external_width, 0)
         
         # right
-        path += inksnek.path_line_to(self.box_external_width, tab_size)
-        path += inksnek.path_line_to(self.box_external_width - self.box_material_thickness, tab_size)
-        path += inksnek.path_line_to(self.box_external_width - self.box_material_thickness, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_external_width, self.box_external_depth)
+        path.line_to(self.box_external_width, tab_size)
+        path.line_to(self.box_external_width - self.box_material_thickness, tab_size)
+        path.line_to(self.box_external_width - self.box_material_thickness, self.box_external_depth - tab_size)
+        path.line_to(self.box_external_width, self.box_external_depth - tab_size)
+        path.line_to(self.box_external_width, self.box_external_depth)
         
         # top (inherited)
-        path += inksnek.path_move_to(0, self.box_external_depth)
+        path.move_to(0, self.box_external_depth)
         
         # left
-        path += inksnek.path_line_to(0, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_material_thickness, self.box_external_depth - tab_size)
-        path += inksnek.path_line_to(self.box_material_thickness, tab_size)
-        path += inksnek.path_line_to(0, tab_size)
-        path += inksnek.path_line_to(0, 0)
+        path.line_to(0, self.box_external_depth - tab_size)
+        path.line_to(self.box_material_thickness, self.box_external_depth - tab_size)
+        path.line_to(self.box_material_thickness, tab_size)
+        path.line_to(0, tab_size)
+        path.line_to(0, 0)
 
         inksnek.add_path(bottom, path, inksnek.cut_style)
         
@@ -367,3 +367,4 @@ class MyDesign(inkex.Effect):
         box_top_x = self.margin + self.box_external_depth
         box_top_y = inksnek.template_height - self.box_external_depth - self.box_external_height - self.margin
         self.add_box(box_top_x, box_top_y, 0)
+        inksnek.finish()
@@ -110,6 +110,7 @@ class MyDesign(inkex.Effect):
     self.add_plate(bottom_plate, True)
     top_plate = inksnek.add_group(inksnek.top_group, inksnek.translate_group(org_x, org_y + self.plate_height))
     self.add_plate(top_plate, False)
+    inksnek.finish()
 	
 
     
@@ -36,6 +36,8 @@ class MyDesign(inkex.Effect):
     design = inksnek.add_group(inksnek.top_group, inksnek.translate_group(0.5, 0.5))
     # add the plate
     self.add_plate(design, 0, 0);
+    # tidy up
+    inksnek.finish()
 
     
 if __name__ == '__main__':
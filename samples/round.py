@@ -127,6 +127,12 @@ class MyDesign(inkex.Effect):
                 rect2 = inksnek.polar_to_rectangular(self.outer_ring_r - 1.0, angle)
             inksnek.add_path(dial, inksnek.path_move_to(rect1)+inksnek.path_line_to(rect2), style)
   
+  def add_l_e_d_pair(self, pair_group, angle):
+    # LEDs either side of the centre
+    cut_style = inksnek.cut_style
+    inksnek.add_rect(pair_group, -self.ring_l_e_d_size/2.0, +self.ring_l_e_d_radius_inside, self.ring_l_e_d_size, self.ring_l_e_d_size, cut_style)
+    inksnek.add_rect(pair_group, -self.ring_l_e_d_size/2.0, -(self.ring_l_e_d_radius_inside + self.ring_l_e_d_size), self.ring_l_e_d_size, self.ring_l_e_d_size, cut_style)
+    
   def law_of_cosines(self, a, b, c):
     return inksnek.radians_to_degrees(acos(((a*a) + (b*b) - (c*c)) /
                                           (2.0*a*b)))
@@ -250,10 +256,8 @@ class MyDesign(inkex.Effect):
     dial = inksnek.add_group(inksnek.top_group, inksnek.translate_group(gap + front_width/2.0, gap + front_base_height)) # at centre of dial
     inksnek.add_X_marker(dial, 0, 0)
     cut_style = inksnek.cut_style
-    for pair in range(12):
-        pair_group = inksnek.add_group(dial, inksnek.rotate_group(pair*360.0/24.0))
-        inksnek.add_rect(pair_group, -self.ring_l_e_d_size/2.0, +self.ring_l_e_d_radius_inside, self.ring_l_e_d_size, self.ring_l_e_d_size, cut_style)
-        inksnek.add_rect(pair_group, -self.ring_l_e_d_size/2.0, -(self.ring_l_e_d_radius_inside + self.ring_l_e_d_size), self.ring_l_e_d_size, self.ring_l_e_d_size, cut_style)
+    # the LED pairs are all the same, just rotated, so they're <use>s of one
+    inksnek.add_polar_array(dial, 0.0, [pair*360.0/24.0 for pair in range(12)], self.add_l_e_d_pair)
         
     self.radial_labels(dial, inksnek.etch_style)
     inksnek.add_circle(dial, self.rotary_rect[0], self.rotary_rect[1], self.rotary_knob_radius, inksnek.ignore_style)
@@ -269,6 +273,7 @@ class MyDesign(inkex.Effect):
     inksnek.add_circle(dial, 0.0, 0.0, m3_radius, inksnek.cut_style)
     
     self.add_text_samples(inksnek.add_group(inksnek.top_group, inksnek.translate_group(gap + 1.5*front_width, gap + front_base_height)))# at centre of dial
+    inksnek.finish()
     
 if __name__ == '__main__':
     e = my_design()
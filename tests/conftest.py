@@ -0,0 +1,44 @@
+import io
+import os
+import sys
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+
+import pytest
+import inkex
+from inksnek import Inksnek
+
+_inch_template = b'''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg width="8in" height="10in" viewBox="0 0 8 10" version="1.1" id="svg1"
+   xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+   xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+   xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg">
+  <sodipodi:namedview id="namedview1" inkscape:document-units="in" />
+  <defs id="defs1" />
+  <g inkscape:label="Layer 1" inkscape:groupmode="layer" id="layer1" />
+</svg>
+'''
+
+class Design(inkex.Effect):
+    # runs build(self) as its effect(), on the document it's given
+    build = None
+    def effect(self):
+        self.build(self)
+
+def run_design(build, svg = None):
+    # run build(effect) as a design's effect() on svg (the A4 template by default), with a fresh inksnek, as render() does,
+    # returns the effect, its document loaded
+    import inksnek_render
+    effect = type("TestDesign", (Design,), {"build":staticmethod(build)})()
+    effect.parse_arguments([])
+    effect.options.input_file = io.BytesIO(inksnek_render.template_svg("A4") if svg is None else svg)
+    effect.options.output = io.BytesIO()
+    effect.load_raw()
+    with inksnek_render._fresh_inksnek():
+        effect.effect()
+    return effect
+
+@pytest.fixture
+def inch_template():
+    # a document in inches, 1 user unit to the inch
+    return _inch_template
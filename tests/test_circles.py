@@ -0,0 +1,40 @@
+from math import pi
+
+import numpy as np
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+_xs, _ys, _radii = [10.0, 20.5, 31.25], [15.0, 15.0, 40.0], [1.0, 2.5, 4.0]
+
+def _circles(draw, svg = None):
+    # draw(ink) circles.  Returns the circles', & paths', attributes, as the document has them
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        draw(inksnek)
+        inksnek.finish()
+    run_design(build, svg)
+    elems = list(inksnek.top_group.iter())
+    return [dict(elem.attrib) for elem in elems if elem.tag.endswith("circle")], [dict(elem.attrib) for elem in elems if elem.tag.endswith("path")]
+
+def test_as_add_circle(inch_template):
+    def one_by_one(ink):
+        for x, y, radius in zip(_xs, _ys, _radii):
+            ink.add_circle(ink.top_group, x, y, radius, ink.cut_style)
+        for x in _xs:
+            ink.add_circle(ink.top_group, x, 60.0, 1.5, ink.light_etch_style)
+    def at_once(ink):
+        ink.add_circles(ink.top_group, np.array(_xs), _ys, _radii, ink.cut_style)
+        ink.add_circles(ink.top_group, _xs, [60.0]*3, 1.5, ink.light_etch_style)  # one radius for all
+    for svg in (None, inch_template):
+        circles, paths = _circles(at_once, svg)
+        assert len(circles) == 6 and not paths
+        assert circles == _circles(one_by_one, svg)[0]
+
+def test_compound():
+    circles, paths = _circles(lambda ink: ink.add_holes(ink.top_group, _xs, _ys, _radii, compound = True))
+    assert len(paths) == 1 and not circles
+    assert paths[0]["style"] == str(inksnek.cut_style)
+    job = inksnek.estimate_job()
+    assert job["pierces"] == 3
+    assert job["length"] == pytest.approx(2*pi*sum(_radii), rel=1e-3)
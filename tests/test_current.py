@@ -0,0 +1,53 @@
+import io
+import threading
+
+import inkex
+from inksnek import Inksnek, inksnek, new_inksnek
+import inksnek_render
+
+
+class Holes(inkex.Effect):
+    # as many holes as it's told, with the Inksnek it's bound to
+    holes = 1
+    def effect(self):
+        ink = inksnek.current()
+        ink.setup(self, ink.A4, ink.WOOD, 3.0, "mm", ink.FINAL)
+        for hole in range(self.holes):
+            ink.add_circle(ink.top_group, 10.0 + hole*10.0, 10.0, 1.0 + hole, ink.cut_style)
+        ink.finish()
+
+def test_global_instance():
+    assert isinstance(inksnek, Inksnek)
+    assert Inksnek.current() is inksnek
+    with new_inksnek() as instance:
+        assert Inksnek.current() is instance and instance is not inksnek
+    assert Inksnek.current() is inksnek
+
+def test_concurrent_designs():
+    outs, barrier = {}, threading.Barrier(4)
+    def render(holes):
+        with new_inksnek():
+            barrier.wait()
+            outs[holes] = io.BytesIO()
+            inksnek_render.render(type("Holes%i" % holes, (Holes,), {"holes":holes}), outs[holes])
+    threads = [threading.Thread(target=render, args=(holes,)) for holes in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for holes, out in outs.items():
+        svg = inkex.load_svg(io.BytesIO(out.getvalue())).getroot()
+        assert len(svg.findall(".//{http://www.w3.org/2000/svg}circle")) == holes
+
+def test_concurrent_global_renders():
+    # renders on the global inksnek take turns
+    outs = {holes:io.BytesIO() for holes in range(1, 9)}
+    threads = [threading.Thread(target=inksnek_render.render, args=(type("Holes%i" % holes, (Holes,), {"holes":holes*20}), out))
+               for holes, out in outs.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for holes, out in outs.items():
+        svg = inkex.load_svg(io.BytesIO(out.getvalue())).getroot()
+        assert len(svg.findall(".//{http://www.w3.org/2000/svg}circle")) == holes*20
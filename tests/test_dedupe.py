@@ -0,0 +1,52 @@
+from math import pi
+
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+def _dedupe(draw, svg = None):
+    # draw(ink) a design's cuts, in mm, & remove the duplicates.  Returns the (segments, length) removed, length in mm,
+    # and the paths & circles left
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        draw(inksnek)
+    run_design(build, svg)
+    segments, length = inksnek.remove_duplicate_cuts()
+    left = [elem for elem in inksnek.top_group.iter() if elem.tag.endswith(("path", "circle"))]
+    return segments, length/inksnek._uu_scale("mm"), left
+
+def test_shared_edge():
+    def draw(ink):
+        ink.add_rect(ink.top_group, 10.0, 10.0, 10.0, 10.0, ink.cut_style)
+        ink.add_rect(ink.top_group, 20.0, 10.0, 10.0, 10.0, ink.cut_style)
+    segments, length, left = _dedupe(draw)
+    assert (segments, len(left)) == (1, 2)
+    assert length == pytest.approx(10.0)
+    assert inksnek.estimate_job()["length"] == pytest.approx(70.0)
+
+def test_exact_duplicate():
+    def draw(ink):
+        ink.add_circle(ink.top_group, 30.0, 30.0, 5.0, ink.cut_style)
+        ink.add_circle(ink.top_group, 30.0, 30.0, 5.0, ink.cut_style)
+    segments, length, left = _dedupe(draw)
+    assert (segments, len(left)) == (1, 1)
+    assert length == pytest.approx(2*pi*5.0)
+
+def test_arc_over_circle():
+    def draw(ink):
+        ink.add_circle(ink.top_group, 30.0, 30.0, 5.0, ink.cut_style)
+        ink.add_arc(ink.top_group, 30.0, 30.0, 5.0, 0.0, 90.0, ink.cut_style)
+    segments, length, left = _dedupe(draw)
+    assert (segments, len(left)) == (1, 1)
+    assert length == pytest.approx(pi*5.0/2)
+
+def test_tolerance_in_mm(inch_template):
+    # lines 0.005mm apart are the same cut, 0.005in apart they aren't, on either document
+    def draw(apart):
+        def lines(ink):
+            ink.add_line_by(ink.top_group, 10.0, 10.0, 50.0, 0.0, ink.cut_style)
+            ink.add_line_by(ink.top_group, 10.0, 10.0 + apart, 50.0, 0.0, ink.cut_style)
+        return lines
+    for svg in (None, inch_template):
+        assert _dedupe(draw(0.005), svg)[:2] == (1, pytest.approx(50.0, rel=1e-3))  # the inch document's coordinates rounded
+        assert _dedupe(draw(0.127), svg)[:2] == (0, 0.0)
@@ -0,0 +1,24 @@
+import pytest
+from inksnek import Inksnek, inksnek
+from conftest import run_design
+
+def _estimate(svg = None, units = "mm", thickness = 3.0):
+    # a 100mm square cut, with an etched line, estimated
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, thickness, units, inksnek.FINAL)
+        scale = 1.0 if units == "mm" else 1/25.4
+        inksnek.add_rect(inksnek.top_group, 10*scale, 10*scale, 100*scale, 100*scale, inksnek.cut_style)
+        inksnek.add_line_by(inksnek.top_group, 20*scale, 200*scale, 50*scale, 0.0, inksnek.etch_style)
+    run_design(build, svg)
+    return inksnek.estimate_job()
+
+def test_estimate_in_mm(inch_template):
+    mm, inch = _estimate(), _estimate(inch_template)
+    assert mm["length"] == pytest.approx(450.0, abs=0.01)
+    for key in ("thickness", "length", "pierces", "travel", "area", "seconds"):
+        assert inch[key] == pytest.approx(mm[key], rel=1e-3), key
+
+def test_estimate_thickness_in_design_units(inch_template):
+    mm, inch = _estimate(inch_template, thickness=3.175), _estimate(inch_template, "in", 0.125)
+    assert inch["thickness"] == pytest.approx(3.175)
+    assert inch["seconds"] == pytest.approx(mm["seconds"], rel=1e-3)
@@ -0,0 +1,7 @@
+def test_star_import():
+    names = {}
+    exec("from inksnek import *", names)
+    for name in ("Inksnek", "inksnek", "new_inksnek", "PathBuilder", "pi", "cos", "inkex", "PathElement"):
+        assert name in names, name
+    for name in ("bisect", "json", "os", "re", "struct", "array", "contextmanager", "ContextVar", "lru_cache", "np"):
+        assert name not in names, name
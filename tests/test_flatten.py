@@ -0,0 +1,30 @@
+import inkex
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+def _plates(effect):
+    # plates in groups in groups, one of them labelled
+    inksnek.setup(effect, inksnek.A4, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+    with inksnek.group(inksnek.top_group, inksnek.translate_group(20.0, 30.0)) as row:
+        for col in range(3):
+            with inksnek.group(row, inksnek.translate_group(col*40.0, 0.0) + inksnek.rotate_group(30.0)) as plate:
+                inksnek.add_rect(plate, 0.0, 0.0, 30.0, 20.0, inksnek.cut_style)
+                inksnek.add_circle(plate, 15.0, 10.0, 4.0, inksnek.cut_style)
+    with inksnek.group(inksnek.top_group, inksnek.translate_group(10.0, 100.0), "lid") as lid:
+        with inksnek.group(lid, inksnek.scale_group(2.0)) as inner:
+            inksnek.add_line_by(inner, 0.0, 0.0, 10.0, 5.0, inksnek.light_etch_style)
+    inksnek.finish()
+
+def test_flatten():
+    run_design(_plates)
+    group = inksnek.top_group
+    box, nodes, size = group.bounding_box(), sum(1 for _ in group.iter()), len(inkex.etree.tostring(group))
+    saved = inksnek.flatten()
+    assert saved == (nodes - sum(1 for _ in group.iter()), size - len(inkex.etree.tostring(group)))
+    assert saved[0] == 5  # the row, its 3 plates & the lid's inner group
+    assert [g.get("inkscape:label") for g in group.iter("{http://www.w3.org/2000/svg}g")][1:] == ["lid"]
+    assert all("transform" not in elem.attrib for elem in group.iter() if elem is not group)
+    assert len(list(group.iter("{http://www.w3.org/2000/svg}circle"))) == 3
+    after = group.bounding_box()
+    assert (after.left, after.top, after.right, after.bottom) == pytest.approx((box.left, box.top, box.right, box.bottom), abs=1e-3)
@@ -0,0 +1,27 @@
+import gzip
+
+from inksnek import Inksnek
+import inksnek_render
+from test_streaming import Plates
+
+def test_svgz(tmp_path):
+    svg, svgz = tmp_path / "plates.svg", tmp_path / "plates.svgz"
+    inksnek_render.render(Plates, str(svg))
+    inksnek_render.render(Plates, str(svgz))
+    first = svgz.read_bytes()
+    assert gzip.decompress(first) == svg.read_bytes()
+    inksnek_render.render(Plates, str(svgz))
+    assert svgz.read_bytes() == first  # no time in the header
+
+def test_geometry_rendered_again(tmp_path):
+    # the design's nodes, saved once, give what rendering it gives, in each mode
+    geometry = str(tmp_path / "plates.geom")
+    inksnek_render.render(Plates, str(tmp_path / "saved.svg"), geometry=geometry)
+    index, numbers = Inksnek.read_geometry(geometry)
+    assert [entry[0] for entry in index["entries"]] == ["g", "g", "c", "g", "c"]
+    assert len(numbers) == index["count"]
+    modes = (Inksnek.DEVEL, Inksnek.FINAL, Inksnek.PRINT)
+    inksnek_render.render_geometry(geometry, {mode:str(tmp_path / ("emitted%i.svg" % mode)) for mode in modes})
+    for mode in modes:
+        inksnek_render.render(Plates, str(tmp_path / ("rendered%i.svg" % mode)), mode)
+        assert (tmp_path / ("emitted%i.svg" % mode)).read_bytes() == (tmp_path / ("rendered%i.svg" % mode)).read_bytes()
@@ -0,0 +1,31 @@
+import json
+import os
+
+from inksnek import Inksnek, inksnek
+from conftest import run_design
+
+_chars = "".join(chr(code) for code in range(ord(" "), ord(Inksnek._strokes_last_char) + 1))
+_mixed = "Ab\x1bc\x1b\n\xf8xy\x0fz\x11q"  # underline, newline, italic, narrower, lower
+
+# annotation_path's output for each character, and for _mixed, from the decoder before the glyphs were cached (each
+# character's strokes decoded nibble by nibble, every call), see _golden
+with open(os.path.join(os.path.dirname(__file__), "glyphs_golden.json")) as f:
+    _golden = json.load(f)
+
+def _annotations():
+    def build(effect):
+        inksnek.setup(effect, inksnek.A4, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+    run_design(build)
+    paths = {ch:str(inksnek.annotation_path(12.5, 37.25, ch, 3.5)) for ch in _chars}
+    paths["mixed"] = str(inksnek.annotation_path(7.0, 116.0625, _mixed, 2.5, inksnek.CENTRE_ALIGN))
+    return paths
+
+def test_glyphs_match_the_old_decoder():
+    Inksnek._glyph.cache_clear()
+    assert _annotations() == _golden  # decoded
+    assert _annotations() == _golden  # from the cache
+
+def test_cached_glyphs_are_immutable():
+    _annotations()
+    for ch in _chars:
+        hash(Inksnek._glyph(Inksnek._strokes[ord(ch) - 32]))  # tuples all the way down, nothing a caller can change for the next
@@ -0,0 +1,24 @@
+from math import pi
+
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+def _hatch(svg = None):
+    # a 10mm square, light, & a 2mm radius circle, heavy, hatched.  Returns the (fills, lines), and the lines' length in mm
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        inksnek.add_rect(inksnek.top_group, 10.0, 10.0, 10.0, 10.0, inksnek.light_fill_style)
+        inksnek.add_circle(inksnek.top_group, 40.0, 15.0, 2.0, inksnek.heavy_fill_style)
+    run_design(build, svg)
+    return inksnek.hatch_fills(), inksnek.estimate_job()["length"]
+
+def test_hatch_lines_by_pitch():
+    (fills, lines), length = _hatch()
+    assert fills == 2
+    assert length == pytest.approx(100.0/0.4 + pi*2.0**2/0.1, rel=0.02)  # the areas over the pitches
+
+def test_hatch_pitch_in_mm(inch_template):
+    mm, inch = _hatch(), _hatch(inch_template)
+    assert inch[0] == mm[0]
+    assert inch[1] == pytest.approx(mm[1], rel=1e-3)
@@ -0,0 +1,23 @@
+from inksnek import Inksnek, inksnek
+from conftest import run_design
+
+def _uses(mode, instancing):
+    def build(effect):
+        inksnek.instancing = instancing
+        inksnek.setup(effect, inksnek.A4, inksnek.WOOD, 3.0, "mm", mode)
+        for x in (10.0, 20.0, 30.0):
+            inksnek.add_circle(inksnek.top_group, x, 10.0, 2.0, inksnek.cut_style)
+        inksnek.finish()
+    try:
+        effect = run_design(build)
+    finally:
+        inksnek.instancing = None
+    return len(effect.svg.findall(".//{http://www.w3.org/2000/svg}use"))
+
+def test_instancing_by_mode():
+    assert _uses(Inksnek.DEVEL, None) == 3
+    assert _uses(Inksnek.FINAL, None) == 0
+
+def test_instancing_kept_by_setup():
+    assert _uses(Inksnek.DEVEL, False) == 0
+    assert _uses(Inksnek.FINAL, True) == 3
@@ -0,0 +1,28 @@
+import pytest
+from inksnek import Inksnek, inksnek
+from conftest import run_design
+
+def test_default_kerf_in_document_units(inch_template):
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+    run_design(build, inch_template)
+    assert inksnek.kerf == pytest.approx(Inksnek.material_kerf[Inksnek.WOOD]/25.4)
+
+def test_explicit_kerf_in_design_units(inch_template):
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL, kerf = 0.3)
+    run_design(build, inch_template)
+    assert inksnek.kerf == pytest.approx(0.3/25.4)
+
+def test_compensate_kerf_offsets_by_half_the_kerf(inch_template):
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        inksnek.add_circle(inksnek.top_group, 50.0, 50.0, 10.0, inksnek.cut_style)
+        inksnek.add_circle(inksnek.top_group, 50.0, 50.0, 2.0, inksnek.cut_style)
+        inksnek.finish()
+        effect.result = inksnek.compensate_kerf()
+    effect = run_design(build, inch_template)
+    assert effect.result == (1, 1)
+    radii = sorted(float(circle.get("r")) for circle in effect.svg.iter("{http://www.w3.org/2000/svg}circle"))
+    half = Inksnek.material_kerf[Inksnek.WOOD]/2
+    assert radii == pytest.approx([(2.0 - half)/25.4, (10.0 + half)/25.4], abs = 1e-6)
@@ -0,0 +1,26 @@
+from inksnek import inksnek
+
+def _minimised(path):
+    return inksnek.minimise_path(path, 3)
+
+def test_collinear_lines_merged():
+    assert _minimised("M10,10 L20,10 L30,10 L40,10") == "M10,10H40"
+    assert _minimised("M10,10 L20,20 L30,30 L20,20") == "M10,10,30,30,20,20"  # not back the way it came
+
+def test_zero_length_draws_dropped():
+    assert _minimised("M10,10 L20,10 L20,10 L20,20") == "M10,10H20V20"
+    assert _minimised("M10,10 L20,10 A5,5 0 0 1 20,10 V20") == "M10,10H20V20"
+
+def test_closing_line_drawn_by_z():
+    assert _minimised("M10,10 L20,10 L20,20 L10,10 Z") == "M10,10H20V20z"
+    assert _minimised("M10,10 L20,10 L20,20 Z") == "M10,10H20V20z"
+
+def test_relative_or_absolute():
+    assert _minimised("M100,100 L101,101 L102,103") == "M100,100l1,1,1,2"
+    assert _minimised("M100.5,100.25 L10,10") == "M100.5,100.25,10,10"
+    assert _minimised("M1.23456,2 L3,4") == "M1.235,2,3,4"
+
+def test_smooth_curves_left_alone():
+    # a zero-length line or merged lines before an S or T would move its reflected control point
+    assert _minimised("M10,10 L20,10 S30,10 40,10 L40,10 L50,10") == "M10,10H20s10,0,20,0h0H50"
+    assert _minimised("M10,10 Q20,0 30,10 T50,10 L60,10 L70,10") == "M10,10Q20,0,30,10t20,0H60,70"
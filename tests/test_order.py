@@ -0,0 +1,51 @@
+import random
+
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+def _order(draw):
+    # draw(ink) a design & order it.  Returns the (before, after) travel, and the elements' tags & ids in their new order
+    def build(effect):
+        inksnek.setup(effect, inksnek.A4, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        draw(inksnek)
+    run_design(build)
+    travel = inksnek.order_cuts()
+    assert inksnek.order_cuts()[0] == pytest.approx(travel[1])  # as it's been ordered
+    return travel, list(inksnek.top_group)
+
+def test_insides_first():
+    def draw(ink):  # a plate with a hole, & a frame with a plate in it, the hole of which has a plate in it
+        ink.add_rect(ink.top_group, 10.0, 10.0, 40.0, 40.0, ink.cut_style).set("id", "plate")
+        ink.add_circle(ink.top_group, 30.0, 30.0, 10.0, ink.cut_style).set("id", "hole")
+        ink.add_rect(ink.top_group, 60.0, 10.0, 80.0, 80.0, ink.cut_style).set("id", "frame")
+        ink.add_rect(ink.top_group, 70.0, 20.0, 60.0, 60.0, ink.cut_style).set("id", "inner")
+        ink.add_circle(ink.top_group, 100.0, 50.0, 20.0, ink.cut_style).set("id", "inner hole")
+        ink.add_circle(ink.top_group, 100.0, 50.0, 5.0, ink.cut_style).set("id", "innermost")
+        ink.add_line_by(ink.top_group, 100.0, 100.0, 10.0, 0.0, ink.light_etch_style).set("id", "etch")
+    (before, after), elems = _order(draw)
+    ids = [elem.get("id") for elem in elems]
+    assert ids[0] == "etch"
+    for inside, outside in (("hole", "plate"), ("inner", "frame"), ("inner hole", "inner"), ("innermost", "inner hole")):
+        assert ids.index(inside) < ids.index(outside)
+    assert after < before
+
+def test_travel_never_increases():
+    def draw(ink):  # lines already in the best order, which nearest first & 2-opt don't find
+        for x1, y1, x2, y2 in ((9.0, 80.0, 9.0, 50.0), (55.0, 75.0, 48.0, 53.0), (36.0, 59.0, 99.0, 49.0)):
+            ink.add_line_to(ink.top_group, x1, y1, x2, y2, ink.cut_style)
+    (before, after), elems = _order(draw)
+    assert after == before
+    for seed in range(50):
+        rnd = random.Random(seed)
+        def draw(ink):  # lines, circles & rectangles anywhere, some inside others
+            for index in range(rnd.randint(2, 12)):
+                x, y, shape = rnd.uniform(0.0, 150.0), rnd.uniform(0.0, 250.0), rnd.random()
+                if shape < 0.3:
+                    ink.add_circle(ink.top_group, x, y, rnd.uniform(1.0, 20.0), ink.cut_style)
+                elif shape < 0.6:
+                    ink.add_rect(ink.top_group, x, y, rnd.uniform(1.0, 40.0), rnd.uniform(1.0, 40.0), ink.cut_style)
+                else:
+                    ink.add_line_to(ink.top_group, x, y, rnd.uniform(0.0, 150.0), rnd.uniform(0.0, 250.0), ink.cut_style)
+        (before, after), elems = _order(draw)
+        assert after <= before + 1e-9
@@ -0,0 +1,32 @@
+import pytest
+from inksnek import Inksnek, inksnek
+from conftest import run_design
+
+_angles = [0.0, 90.0, 135.0, 300.0]
+
+def _dial(mode, builder):
+    # a dial, at (50, 60), with builder's arms 20 out.  Returns the groups add_polar_array gave
+    arms = []
+    def build(effect):
+        inksnek.setup(effect, inksnek.A4, inksnek.WOOD, 3.0, "mm", mode)
+        with inksnek.group(inksnek.top_group, inksnek.translate_group(50.0, 60.0)) as dial:
+            arms.extend(inksnek.add_polar_array(dial, 20.0, _angles, builder))
+        inksnek.finish()
+    run_design(build)
+    return arms
+
+def test_arms_placed():
+    # a hole 5 further out on each arm is 25 out from the centre, at its angle
+    arms = _dial(Inksnek.FINAL, lambda arm, angle: inksnek.add_circle(arm, 0.0, 5.0, 1.0, inksnek.cut_style))
+    assert len(arms) == len(_angles)
+    inksnek.flatten()
+    holes = [(float(elem.get("cx")), -float(elem.get("cy"))) for elem in inksnek.top_group.iter() if elem.tag.endswith("circle")]
+    for (x, y), angle in zip(holes, _angles):
+        dx, dy = inksnek.polar_to_rectangular(25.0, angle)
+        assert (x, y) == (pytest.approx(50.0 + dx), pytest.approx(60.0 + dy))
+
+def test_same_arms_instanced():
+    _dial(Inksnek.DEVEL, lambda arm, angle: inksnek.add_rect(arm, -1.0, 0.0, 2.0, 4.0, inksnek.cut_style))
+    assert len(inksnek.top_group.findall(".//{http://www.w3.org/2000/svg}use")) == len(_angles)
+    _dial(Inksnek.DEVEL, lambda arm, angle: inksnek.add_rect(arm, -1.0, 0.0, 2.0, 4.0 + angle/90.0, inksnek.cut_style))
+    assert len(inksnek.top_group.findall(".//{http://www.w3.org/2000/svg}use")) == 0
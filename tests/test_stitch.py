@@ -0,0 +1,44 @@
+import pytest
+from inksnek import inksnek
+from conftest import run_design
+
+def _stitch(draw, svg = None):
+    # draw(ink) a design's paths, in mm, & stitch them.  Returns the (before, after) pierces, and the paths left
+    def build(effect):
+        inksnek.setup(effect, inksnek.CUSTOM, inksnek.WOOD, 3.0, "mm", inksnek.FINAL)
+        draw(inksnek)
+    run_design(build, svg)
+    pierces = inksnek.stitch_paths()
+    return pierces, [elem for elem in inksnek.top_group.iter() if elem.tag.endswith("path")]
+
+def test_touching_ends_joined():
+    def draw(ink):  # a zig-zag, its middle line drawn backwards, & a line off on its own
+        ink.add_line_to(ink.top_group, 10.0, 10.0, 20.0, 20.0, ink.cut_style)
+        ink.add_line_to(ink.top_group, 30.0, 10.0, 20.0, 20.0, ink.cut_style)
+        ink.add_line_to(ink.top_group, 30.0, 10.0, 40.0, 20.0, ink.cut_style)
+        ink.add_line_to(ink.top_group, 10.0, 50.0, 40.0, 50.0, ink.cut_style)
+    pierces, paths = _stitch(draw)
+    assert pierces == (4, 2)
+    assert len(paths) == 2
+    assert inksnek.estimate_job()["pierces"] == 2
+
+def test_styles_not_joined():
+    def draw(ink):
+        ink.add_line_to(ink.top_group, 10.0, 10.0, 20.0, 20.0, ink.cut_style)
+        ink.add_line_to(ink.top_group, 20.0, 20.0, 30.0, 10.0, ink.light_etch_style)
+        ink.add_line_to(ink.top_group, 30.0, 10.0, 40.0, 20.0, ink.cut_style)
+    pierces, paths = _stitch(draw)
+    assert pierces == (3, 3)
+    assert len(paths) == 3
+
+def test_tolerance_in_mm(inch_template):
+    # ends 0.005mm apart are joined, 0.005in apart they aren't, on either document (at an inch, so the inch document's
+    # 3 places don't move them apart)
+    def draw(apart):
+        def lines(ink):
+            ink.add_line_to(ink.top_group, 10.0, 10.0, 25.4, 10.0, ink.cut_style)
+            ink.add_line_to(ink.top_group, 25.4 + apart, 10.0, 40.0, 10.0, ink.cut_style)
+        return lines
+    for svg in (None, inch_template):
+        assert _stitch(draw(0.005), svg)[0] == (2, 1)
+        assert _stitch(draw(0.127), svg)[0] == (2, 2)
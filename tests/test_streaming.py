@@ -0,0 +1,83 @@
+import os
+import tracemalloc
+
+import pytest
+import inkex
+from inksnek import Inksnek
+import inksnek_render
+
+
+class Plates(inkex.Effect):
+    # two plates, the second added to the first after it's finished when broken is set
+    broken = False
+    def effect(self):
+        from inksnek import inksnek
+        inksnek.setup(self, Inksnek.A4, Inksnek.WOOD, 3.0, "mm", Inksnek.FINAL)
+        with inksnek.group(inksnek.top_group, inksnek.translate_group(0.0, 0.0)) as first:
+            inksnek.add_circle(first, 20.0, 20.0, 10.0, inksnek.cut_style)
+        with inksnek.group(inksnek.top_group, inksnek.translate_group(0.0, 0.0)) as second:
+            inksnek.add_circle(first if self.broken else second, 50.0, 20.0, 10.0, inksnek.cut_style)
+        inksnek.finish()
+
+class BrokenPlates(Plates):
+    broken = True
+
+def test_streamed_file_written(tmp_path):
+    out = str(tmp_path / "plates.svg")
+    inksnek_render.render(Plates, out, streaming=True)
+    assert os.listdir(str(tmp_path)) == ["plates.svg"]
+    assert len(inkex.load_svg(out).getroot().findall(".//{http://www.w3.org/2000/svg}circle")) == 2
+
+def test_failed_stream_leaves_output(tmp_path):
+    out = tmp_path / "plates.svg"
+    out.write_bytes(b"before")
+    with pytest.raises(ValueError):
+        inksnek_render.render(BrokenPlates, str(out), streaming=True)
+    assert os.listdir(str(tmp_path)) == ["plates.svg"]
+    assert out.read_bytes() == b"before"
+
+class Rows(inkex.Effect):
+    # rows of plates, each in its own group, noting the group transforms kept as each row's drawn
+    kept = []
+    def effect(self):
+        from inksnek import inksnek
+        inksnek.setup(self, Inksnek.A4, Inksnek.WOOD, 3.0, "mm", Inksnek.FINAL)
+        for row in range(20):
+            with inksnek.group(inksnek.top_group, inksnek.translate_group(0.0, row*10.0)) as plates:
+                for col in range(20):
+                    with inksnek.group(plates, inksnek.translate_group(col*10.0, 0.0)) as plate:
+                        inksnek.add_circle(plate, 5.0, 5.0, 4.0, inksnek.cut_style)
+                        assert inksnek.group_transform(plate) == inksnek.group_transform(inksnek.top_group) @ inksnek.translate_group(col*10.0, row*10.0)
+            self.kept.append(len(inksnek._group_transforms))
+        with pytest.raises(ValueError):
+            inksnek.group_transform(plate)  # written
+        inksnek.finish()
+
+def test_written_groups_forgotten(tmp_path):
+    out = str(tmp_path / "rows.svg")
+    inksnek_render.render(Rows, out, streaming=True)
+    assert Rows.kept == [1]*20  # only the top group's, not the 420 written
+    assert len(inkex.load_svg(out).getroot().findall(".//{http://www.w3.org/2000/svg}circle")) == 400
+
+class Grid(inkex.Effect):
+    # a plate in each of a grid of groups, each at a different place
+    groups = 0
+    def effect(self):
+        from inksnek import inksnek
+        inksnek.setup(self, Inksnek.A4, Inksnek.WOOD, 3.0, "mm", Inksnek.FINAL)
+        for index in range(self.groups):
+            with inksnek.group(inksnek.top_group, inksnek.translate_group(index % 100, index//100*0.01)) as plate:
+                inksnek.add_circle(plate, 5.0, 5.0, 4.0, inksnek.cut_style)
+        inksnek.finish()
+
+def test_streaming_memory_flat(tmp_path):
+    # the peak memory streaming 4x the groups takes is much the same, nothing's kept per group
+    peaks = []
+    for groups in (1000, 4000):
+        tracemalloc.start()
+        try:
+            inksnek_render.render(type("Grid%i" % groups, (Grid,), {"groups":groups}), str(tmp_path / "grid.svg"), streaming=True)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    assert peaks[1] < peaks[0]*1.5